@@ -3,9 +3,10 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(__file__))
 
-from src.main import app
+from src.main import app, init_database
 
 if __name__ == '__main__':
+    init_database(app)
     port = int(os.environ.get('PORT', 3000))
     app.run(host='0.0.0.0', port=port, debug=False)
 
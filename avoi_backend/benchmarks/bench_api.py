@@ -0,0 +1,338 @@
+"""End-to-end API benchmark: scripted shopper journeys against a real WSGI server.
+
+Starts the app on localhost with Werkzeug's threaded server, then runs virtual
+users that browse, search, add to cart, check out, view orders and subscribe
+to the newsletter. Reports throughput, p50/p95/p99 latency and SQL queries per
+request for every step, and can write the results as JSON so runs can be
+compared across commits.
+
+Usage:
+  python benchmarks/bench_api.py                       # small generated dataset
+  python benchmarks/bench_api.py --database /path/app.db --concurrency 16 --duration 60 --json run.json
+"""
+import argparse
+import contextlib
+import gzip
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g
+from sqlalchemy import event, select
+from werkzeug.serving import make_server
+from src.main import create_app
+from src.models.user import db, User
+from src.models.product import Product, ProductVariant
+from src.models.order import Address
+from src.services.currency_service import currency_service
+
+SEARCH_TERMS = ['serum', 'vitamin', 'cream', 'cleanser', 'shea', 'retinol', 'toner', 'mask', 'glow', 'aloe']
+DEFAULT_WEIGHTS = {'browse': 40, 'search': 20, 'cart': 15, 'checkout': 10, 'orders': 10, 'newsletter': 5}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def instrument(app):
+    """Expose the SQL statement count of each request in an X-Query-Count header"""
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        try:
+            g.bench_queries = g.get('bench_queries', 0) + 1
+        except RuntimeError:  # outside a request
+            pass
+
+    @app.after_request
+    def add_query_count(response):
+        response.headers['X-Query-Count'] = str(g.get('bench_queries', 0))
+        return response
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, step, latency_ms, status, queries):
+        with self.lock:
+            self.latencies[step].append(latency_ms)
+            self.statuses[step][status] += 1
+            if queries is not None:
+                self.queries[step].append(queries)
+
+
+class VirtualUser:
+    def __init__(self, host, port, recorder, fixtures, rng):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.fixtures = fixtures
+        self.rng = rng
+        self.token = None
+        self.address_id = None
+        self.order_ids = []
+
+    def request(self, step, method, path, body=None, auth=False):
+        headers = {'Accept-Encoding': 'gzip', 'X-Currency': self.rng.choice(('USD', 'NGN', 'GHS', 'KES'))}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if auth and self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            status = response.status
+            queries = response.getheader('X-Query-Count')
+        finally:
+            connection.close()
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.recorder.record(step, latency_ms, status, int(queries) if queries else None)
+
+        if response.getheader('Content-Type', '').startswith('application/json') and status < 500:
+            if response.getheader('Content-Encoding') == 'gzip':
+                payload = gzip.decompress(payload)
+            try:
+                return status, json.loads(payload)
+            except ValueError:
+                return status, None
+        return status, None
+
+    def login(self):
+        email = self.rng.choice(self.fixtures['emails'])
+        status, data = self.request('login', 'POST', '/api/auth/login', {'email': email, 'password': 'password123'})
+        if status == 200:
+            self.token = data['token']
+            status, data = self.request('list_addresses', 'GET', '/api/orders/addresses', auth=True)
+            if status == 200 and data['addresses']:
+                self.address_id = data['addresses'][0]['id']
+
+    def browse(self):
+        self.request('list_products', 'GET', f'/api/products?page={self.rng.randint(1, 20)}')
+        self.request('categories', 'GET', '/api/products/categories')
+        product_id = self.rng.choice(self.fixtures['product_ids'])
+        self.request('product_detail', 'GET', f'/api/products/{product_id}')
+        self.request('product_reviews', 'GET', f'/api/products/{product_id}/reviews')
+
+    def search(self):
+        self.request('search', 'GET', f'/api/products?search={self.rng.choice(SEARCH_TERMS)}')
+
+    def add_to_cart(self):
+        variant_id = self.rng.choice(self.fixtures['variant_ids'])
+        self.request('add_to_cart', 'POST', '/api/cart/items',
+                     {'product_variant_id': variant_id, 'quantity': 1}, auth=True)
+        self.request('view_cart', 'GET', '/api/cart/', auth=True)
+
+    def cart(self):
+        if not self.token:
+            self.login()
+        self.add_to_cart()
+        self.request('cart_count', 'GET', '/api/cart/count', auth=True)
+
+    def checkout(self):
+        if not self.token:
+            self.login()
+        if not self.address_id:
+            return
+        self.add_to_cart()
+        status, data = self.request('create_order', 'POST', '/api/orders/', {
+            'shipping_address_id': self.address_id,
+            'billing_address_id': self.address_id,
+        }, auth=True)
+        if status == 201:
+            self.order_ids.append(data['order']['id'])
+
+    def orders(self):
+        if not self.token:
+            self.login()
+        self.request('list_orders', 'GET', '/api/orders/', auth=True)
+        if self.order_ids:
+            self.request('order_detail', 'GET', f'/api/orders/{self.rng.choice(self.order_ids)}', auth=True)
+
+    def newsletter(self):
+        self.request('newsletter_subscribe', 'POST', '/api/newsletter/subscribe',
+                     {'email': f'bench-{self.rng.randrange(10 ** 9)}@example.com'})
+
+    def run(self, weights, deadline, iterations):
+        journeys = list(weights)
+        cum_weights = []
+        total = 0
+        for name in journeys:
+            total += weights[name]
+            cum_weights.append(total)
+        done = 0
+        while time.perf_counter() < deadline and (iterations is None or done < iterations):
+            getattr(self, self.rng.choices(journeys, cum_weights=cum_weights)[0])()
+            done += 1
+
+
+def load_fixtures(app, sample=500):
+    with app.app_context():
+        emails = db.session.execute(
+            select(User.email).join(Address, Address.user_id == User.id)
+            .where(User.is_email_verified.is_(True)).limit(sample)
+        ).scalars().all()
+        product_ids = db.session.execute(
+            select(Product.id).where(Product.is_active.is_(True)).limit(sample)
+        ).scalars().all()
+        variant_ids = db.session.execute(
+            select(ProductVariant.id).where(ProductVariant.inventory_quantity > 50).limit(sample)
+        ).scalars().all()
+    return {'emails': emails, 'product_ids': product_ids, 'variant_ids': variant_ids}
+
+
+def generate_dataset(app, args):
+    from src.datagen import DataGenerator
+    with app.app_context():
+        db.create_all()
+        DataGenerator(seed=args.seed, log=lambda message: None).generate(
+            products=args.products, users=args.users, orders=args.orders, reviews=args.reviews
+        )
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def summarize(recorder, elapsed):
+    steps = {}
+    for step, latencies in sorted(recorder.latencies.items()):
+        queries = recorder.queries.get(step, [])
+        steps[step] = {
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+            'statuses': dict(recorder.statuses[step]),
+        }
+    all_latencies = [value for values in recorder.latencies.values() for value in values]
+    total = {
+        'requests': len(all_latencies),
+        'throughput_rps': round(len(all_latencies) / elapsed, 2),
+        'p50_ms': round(percentile(all_latencies, 50), 2),
+        'p95_ms': round(percentile(all_latencies, 95), 2),
+        'p99_ms': round(percentile(all_latencies, 99), 2),
+    }
+    return steps, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing SQLite file (e.g. built with flask db generate)')
+    parser.add_argument('--products', type=int, default=2000, help='generated dataset size when --database is not given')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--iterations', type=int, help='journeys per virtual user (overrides duration)')
+    parser.add_argument('--journeys', default=','.join(f'{k}={v}' for k, v in DEFAULT_WEIGHTS.items()),
+                        help='comma separated journey=weight list')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    weights = {name: int(weight) for name, weight in (item.split('=') for item in args.journeys.split(','))}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.database or os.path.join(tmp, 'bench.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+            # Every virtual user shares 127.0.0.1 and would trip the login/register limits
+            'RATELIMIT_ENABLED': False
+        })
+        if not args.database:
+            print(f'Generating dataset in {database} ...')
+            generate_dataset(app, args)
+
+        # Never call the exchange-rate API from a benchmark
+        currency_service.exchange_rates = currency_service.fallback_rates.copy()
+        currency_service.last_updated = datetime.now()
+
+        instrument(app)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        fixtures = load_fixtures(app)
+        server = make_server('127.0.0.1', args.port, app, threaded=True)
+        port = server.server_port
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        recorder = Recorder()
+        deadline = time.perf_counter() + (args.duration if args.iterations is None else 10 ** 9)
+        users = [VirtualUser('127.0.0.1', port, recorder, fixtures, random.Random(args.seed + index))
+                 for index in range(args.concurrency)]
+        threads = [threading.Thread(target=user.run, args=(weights, deadline, args.iterations)) for user in users]
+
+        print(f'Running {args.concurrency} virtual users against http://127.0.0.1:{port} ...')
+        started = time.perf_counter()
+        # Email services print every send; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+    steps, total = summarize(recorder, elapsed)
+    print(f"\n{'step':<22}{'reqs':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'sql/req':>9}")
+    for step, row in steps.items():
+        queries = row['queries_per_request'] if row['queries_per_request'] is not None else '-'
+        print(f"{step:<22}{row['requests']:>7}{row['throughput_rps']:>9}{row['p50_ms']:>9}"
+              f"{row['p95_ms']:>9}{row['p99_ms']:>9}{queries:>9}")
+    print(f"{'TOTAL':<22}{total['requests']:>7}{total['throughput_rps']:>9}{total['p50_ms']:>9}"
+          f"{total['p95_ms']:>9}{total['p99_ms']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'benchmark': 'api',
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': {
+                    'database': args.database, 'concurrency': args.concurrency, 'duration': args.duration,
+                    'iterations': args.iterations, 'journeys': weights, 'seed': args.seed,
+                },
+                'elapsed_s': round(elapsed, 2),
+                'total': total,
+                'steps': steps,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Threaded WSGI vs ASGI under I/O-bound load: concurrency, latency and memory.
+
+Both servers run the real exchange-rate refresh against a local fake upstream
+that answers after a fixed delay. The threaded server uses the sync
+currency_service.fetch_exchange_rates (one thread blocked per request), the ASGI
+server the async variant on a shared httpx client. For each concurrency level
+the benchmark reports throughput, p50/p95 latency and the server's RSS.
+
+Needs uvicorn, httpx and aiosqlite (pinned in requirements.txt).
+
+Usage:
+  python benchmarks/bench_asgi.py
+  python benchmarks/bench_asgi.py --delay 0.2 --concurrency 10,100,500 --requests 2000 --json asgi.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_api import git_revision, percentile
+
+RATES = {'base': 'USD', 'rates': {'USD': 1.0, 'NGN': 1500.0, 'GBP': 0.79, 'EUR': 0.92}}
+
+
+def serve_threaded(port, upstream, database):
+    from werkzeug.serving import make_server
+    from src.main import create_app
+    from src.services.currency_service import currency_service
+
+    currency_service.rates_url = lambda: upstream
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'METRICS_ENABLED': False})
+
+    def bench_rates():
+        currency_service.fetch_exchange_rates()
+        return {'rates': len(currency_service.exchange_rates)}
+
+    app.add_url_rule('/bench/rates', 'bench_rates', bench_rates)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def serve_asgi(port, upstream, database):
+    import uvicorn
+    from src.asgi import create_asgi_app
+    from src.routes.async_routes import async_router
+    from src.services.currency_service import currency_service
+
+    currency_service.rates_url = lambda: upstream
+
+    @async_router.route('/bench/rates')
+    async def bench_rates(request):
+        await currency_service.fetch_exchange_rates_async(request.app.http)
+        return {'rates': len(currency_service.exchange_rates)}, 200
+
+    application = create_asgi_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'METRICS_ENABLED': False})
+    uvicorn.run(application, host='127.0.0.1', port=port, log_level='warning', lifespan='on')
+
+
+def serve_upstream(port, delay):
+    """Fake exchange-rate API; answers every request after delay seconds"""
+    body = json.dumps(RATES).encode()
+    response = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b'\r\n\r\n')
+                await asyncio.sleep(delay)
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle, '127.0.0.1', port, backlog=4096)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+def rss_mb(pid):
+    values = {}
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith(('VmRSS', 'VmHWM', 'Threads')):
+                key, value = line.split(':')
+                values[key] = int(value.split()[0])
+    return round(values['VmRSS'] / 1024, 1), round(values['VmHWM'] / 1024, 1), values['Threads']
+
+
+async def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def fetch(connection, port, path):
+    """One keep-alive GET; plain asyncio streams so the client is never the bottleneck"""
+    if connection[0] is None:
+        connection[:] = await asyncio.open_connection('127.0.0.1', port)
+    reader, writer = connection
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.lower().split(': ', 1) for line in lines[1:] if ': ' in line)
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    if headers.get('connection') == 'close' or lines[0].startswith('HTTP/1.0'):
+        writer.close()
+        connection[:] = [None, None]
+    return int(lines[0].split()[1])
+
+
+async def load(port, concurrency, total):
+    """Keep `concurrency` requests in flight until `total` have completed"""
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        connection = [None, None]
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                if await fetch(connection, port, '/bench/rates') != 200:
+                    errors += 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                connection[:] = [None, None]
+            latencies.append((time.perf_counter() - started) * 1000)
+        if connection[1] is not None:
+            connection[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+    }
+
+
+def run_mode(mode, args, upstream, database):
+    port = args.port + (0 if mode == 'threaded' else 1)
+    server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+        '--upstream', upstream, '--database', database
+    ])
+    results = []
+    try:
+        asyncio.run(wait_until_up(port))
+        for concurrency in args.concurrency:
+            result = asyncio.run(load(port, concurrency, max(args.requests, concurrency)))
+            rss, peak, threads = rss_mb(server.pid)
+            result.update({'mode': mode, 'concurrency': concurrency, 'rss_mb': rss, 'peak_rss_mb': peak,
+                           'threads': threads})
+            results.append(result)
+            print(f"{mode:<9}{concurrency:>6}{result['throughput_rps']:>10}{result['p50_ms']:>9}"
+                  f"{result['p95_ms']:>9}{result['errors']:>8}{rss:>9}{peak:>9}{threads:>9}")
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--delay', type=float, default=0.1, help='upstream latency in seconds')
+    parser.add_argument('--concurrency', default='10,50,200', help='comma separated in-flight request levels')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per concurrency level')
+    parser.add_argument('--modes', default='threaded,asgi')
+    parser.add_argument('--port', type=int, default=5081)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--serve', choices=('threaded', 'asgi', 'upstream'), help=argparse.SUPPRESS)
+    parser.add_argument('--upstream', help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == 'threaded':
+        return serve_threaded(args.port, args.upstream, args.database)
+    if args.serve == 'asgi':
+        return serve_asgi(args.port, args.upstream, args.database)
+    if args.serve == 'upstream':
+        return serve_upstream(args.port, args.delay)
+
+    args.concurrency = [int(level) for level in args.concurrency.split(',')]
+    upstream_port = args.port + 2
+    upstream_server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), '--serve', 'upstream', '--port', str(upstream_port),
+        '--delay', str(args.delay)
+    ])
+    asyncio.run(wait_until_up(upstream_port))
+    upstream = f'http://127.0.0.1:{upstream_port}/v4/latest/USD'
+    print(f'Upstream delay {args.delay * 1000:.0f} ms, {args.requests} requests per level')
+    print(f"{'mode':<9}{'conc':>6}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}"
+          f"{'rss MB':>9}{'peak MB':>9}{'threads':>9}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            database = os.path.join(tmp, 'bench.db')
+            for mode in args.modes.split(','):
+                results.extend(run_mode(mode, args, upstream, database))
+    finally:
+        upstream_server.terminate()
+        upstream_server.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'benchmark': 'asgi',
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': {'delay': args.delay, 'concurrency': args.concurrency, 'requests': args.requests},
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Bytes and CPU per response for compressed catalog/order JSON payloads.
+
+Usage: python benchmarks/bench_compression.py [--products 20] [--repeat 200] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.services.compression_service import compression_service, brotli
+from src.services.catalog_cache import CatalogCache
+
+WORDS = (
+    'hydrating gentle brightening niacinamide ceramides glycerin squalane peptides retinol '
+    'vitamin antioxidant barrier soothing aloe shea butter jojoba oil hyaluronic acid skin '
+    'texture tone radiant nourishing botanical extract cleanser serum toner moisturizer'
+).split()
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def product_payload(rng, product_id):
+    """Same shape as Product.to_dict with a single variant and image"""
+    price = round(rng.uniform(10, 120), 2)
+    return {
+        'id': product_id,
+        'name': sentence(rng, 3)[:-1],
+        'description': ' '.join(sentence(rng, 14) for _ in range(3)),
+        'short_description': sentence(rng, 6),
+        'sku': f'AVOI-GEN-{product_id:06d}',
+        'price': price,
+        'compare_at_price': None,
+        'currency': 'NGN',
+        'weight': None,
+        'dimensions': None,
+        'category_id': rng.randint(1, 5),
+        'brand': 'AVOI',
+        'ingredients': ', '.join(rng.choice(WORDS).capitalize() for _ in range(8)),
+        'usage_instructions': sentence(rng, 12),
+        'benefits': sentence(rng, 10),
+        'is_active': True,
+        'date_created': '2025-07-18T00:00:00',
+        'date_modified': '2025-07-18T00:00:00',
+        'images': [{'id': product_id, 'product_id': product_id, 'image_url': f'/assets/product-{product_id}.png',
+                    'alt_text': 'Product image', 'display_order': 1, 'is_primary': True}],
+        'variants': [{'id': product_id, 'product_id': product_id, 'variant_name': 'Standard Size',
+                      'sku': f'AVOI-GEN-{product_id:06d}-STD', 'price': price, 'currency': 'NGN',
+                      'weight': None, 'inventory_quantity': 100}],
+    }
+
+
+def measure(label, body, encoding, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        out = compression_service.compress(body, encoding)
+    cpu_ms = (time.process_time() - start) * 1000 / repeat
+    return {
+        'payload': label,
+        'encoding': encoding,
+        'level': compression_service.brotli_quality if encoding == 'br' else compression_service.gzip_level,
+        'bytes_in': len(body),
+        'bytes_out': len(out),
+        'ratio': round(len(out) / len(body), 3),
+        'cpu_ms_per_response': round(cpu_ms, 3),
+    }
+
+
+def measure_cached(app, label, payload, encoding, repeat):
+    """CPU per hit when the encoded body comes from the catalog cache"""
+    cache = CatalogCache()
+    headers = {'Accept-Encoding': encoding}
+    with app.test_request_context(headers=headers):
+        entry = cache.set(label, payload)
+        compression_service.respond(entry)
+        start = time.process_time()
+        for _ in range(repeat):
+            compression_service.respond(cache.get(label))
+        cpu_ms = (time.process_time() - start) * 1000 / repeat
+    return {
+        'payload': label,
+        'encoding': f'{encoding} (cached)',
+        'level': None,
+        'bytes_in': len(entry.body),
+        'bytes_out': len(entry.variants[encoding]),
+        'ratio': round(len(entry.variants[encoding]) / len(entry.body), 3),
+        'cpu_ms_per_response': round(cpu_ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=20, help='products per listing page')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--gzip-level', type=int, default=6)
+    parser.add_argument('--br-level', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    compression_service.gzip_level = args.gzip_level
+    compression_service.brotli_quality = args.br_level
+    app = Flask(__name__)
+
+    listing = {'products': [product_payload(rng, i) for i in range(1, args.products + 1)],
+               'pagination': {'page': 1, 'per_page': args.products}, 'currency': 'NGN'}
+    detail = {'product': product_payload(rng, 1), 'currency': 'NGN'}
+    payloads = {
+        f'get_products ({args.products} items)': listing,
+        'get_product': detail,
+    }
+
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    results = []
+    for label, payload in payloads.items():
+        body = json.dumps(payload).encode('utf-8')
+        results.append({'payload': label, 'encoding': 'identity', 'level': None, 'bytes_in': len(body),
+                        'bytes_out': len(body), 'ratio': 1.0, 'cpu_ms_per_response': 0.0})
+        for encoding in encodings:
+            results.append(measure(label, body, encoding, args.repeat))
+            results.append(measure_cached(app, label, payload, encoding, args.repeat))
+
+    print(f"{'payload':<28}{'encoding':<16}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}")
+    for row in results:
+        print(f"{row['payload']:<28}{row['encoding']:<16}{row['bytes_out']:>10}{row['ratio']:>8}{row['cpu_ms_per_response']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'compression', 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Throughput and peak memory of the supplier feed sync at growing feed sizes.
+
+Writes CSV feeds of 10k, 100k and 1M rows (by default) that cycle through
+every SKU in the configured database (DATABASE_URL), giving a share of rows
+a new quantity, then streams each through inventory_service.sync_feed with
+tracemalloc running. Peak memory should stay flat as the feed grows.
+
+This writes to the database: run it against a generated dataset
+(flask db generate), not real stock. --dry-run diffs without writing.
+
+Usage:
+  python benchmarks/bench_inventory_sync.py
+  python benchmarks/bench_inventory_sync.py --rows 10000 100000 --changed 0.1 --json sync.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_api import git_revision
+from sqlalchemy import select
+from src.main import create_app
+from src.models.user import db
+from src.models.product import ProductVariant
+from src.services.inventory_service import inventory_service, read_feed
+
+
+def write_feed(path, skus, rows, changed, rng):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sku', 'quantity'])
+        for index in range(rows):
+            sku, quantity = skus[index % len(skus)]
+            writer.writerow([sku, rng.randint(0, 500) if rng.random() < changed else quantity])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--changed', type=float, default=0.2, help='Share of rows with a new quantity.')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    results = []
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        skus = db.session.execute(
+            select(ProductVariant.sku, ProductVariant.inventory_quantity).order_by(ProductVariant.id)
+        ).all()
+        for rows in args.rows:
+            path = os.path.join(directory, f'feed-{rows}.csv')
+            write_feed(path, skus, rows, args.changed, rng)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            with open(path, newline='') as feed:
+                report = inventory_service.sync_feed(
+                    read_feed(feed, 'csv'), chunk_size=args.chunk_size, dry_run=args.dry_run, reference='bench'
+                )
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                'rows': rows,
+                'seconds': round(elapsed, 2),
+                'rows_per_s': round(rows / elapsed),
+                'peak_mb': round(peak / 2 ** 20, 2),
+                'quantity_updates': report['quantity_updates'],
+                'movements': report['movements'],
+            })
+
+    print(f"{len(skus)} SKUs, {args.changed:.0%} of rows changed{', dry run' if args.dry_run else ''}")
+    print(f"{'rows':>10}{'seconds':>10}{'rows/s':>10}{'peak MB':>10}{'updates':>10}")
+    for row in results:
+        print(f"{row['rows']:>10}{row['seconds']:>10}{row['rows_per_s']:>10}{row['peak_mb']:>10}{row['quantity_updates']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'benchmark': 'inventory_sync',
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': {key: value for key, value in vars(args).items() if key != 'json'},
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
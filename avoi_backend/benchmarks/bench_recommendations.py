@@ -0,0 +1,95 @@
+"""Build time of the "frequently bought together" lists on millions of order lines.
+
+Generates a synthetic order history (Zipf-distributed product popularity,
+geometric basket sizes), then times the sparse co-occurrence build, as
+rebuild() runs it, and storing the result in a throwaway SQLite database.
+
+Needs numpy and scipy (pinned in requirements.txt).
+
+Usage:
+  python benchmarks/bench_recommendations.py
+  python benchmarks/bench_recommendations.py --lines 1000000,5000000 --products 20000 --json recs.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from bench_api import git_revision
+from src.main import create_app
+from src.models.user import db
+from src.services.recommendation_service import cooccurrence_top_k, recommendation_service
+
+
+def synthetic_lines(rng, lines, products, mean_basket, skew):
+    """Parallel (order_id, product_id) arrays with roughly `lines` entries"""
+    sizes = rng.geometric(1 / mean_basket, size=int(lines / mean_basket) + 1)
+    sizes = sizes[np.cumsum(sizes) <= lines]
+    order_ids = np.repeat(np.arange(len(sizes)), sizes)
+    popularity = 1.0 / np.arange(1, products + 1) ** skew
+    product_ids = rng.choice(products, size=len(order_ids), p=popularity / popularity.sum()) + 1
+    return order_ids, product_ids
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', default='1000000,3000000', help='comma separated order line counts')
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--basket', type=float, default=3.0, help='mean products per order')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for product popularity')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    print(f"{'lines':>10}{'orders':>10}{'pairs':>10}{'build s':>10}{'store s':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            db.create_all()
+            for lines in (int(value) for value in args.lines.split(',')):
+                order_ids, product_ids = synthetic_lines(rng, lines, args.products, args.basket, args.skew)
+
+                started = time.perf_counter()
+                counts = cooccurrence_top_k(order_ids, product_ids)
+                build = time.perf_counter() - started
+
+                started = time.perf_counter()
+                pairs = recommendation_service.store(*counts)
+                store = time.perf_counter() - started
+
+                result = {
+                    'lines': len(order_ids),
+                    'orders': int(order_ids[-1]) + 1,
+                    'pairs': pairs,
+                    'build_s': round(build, 2),
+                    'store_s': round(store, 2),
+                    'peak_rss_mb': peak_rss_mb(),
+                }
+                results.append(result)
+                print(f"{result['lines']:>10}{result['orders']:>10}{pairs:>10}{result['build_s']:>10}"
+                      f"{result['store_s']:>10}{result['peak_rss_mb']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'benchmark': 'recommendations',
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': {key: value for key, value in vars(args).items() if key != 'json'},
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Quality and latency of product search on misspelled queries, with and without the trigram index.
+
+Builds a misspelling corpus from the configured database (DATABASE_URL):
+common real-world misspellings of catalog words plus generated ones (a
+deleted, doubled, swapped or substituted letter in one word of two-word
+queries taken from product names). Each query runs through
+/api/products?search= with the response cache cleared, once with substring
+search only and once with fuzzy matching. A product is relevant when its
+name/brand contains every intended word.
+
+Usage:
+  python benchmarks/bench_search.py
+  python benchmarks/bench_search.py --generated 300 --json search.json
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_api import git_revision
+from src.main import create_app
+from src.services.catalog_cache import catalog_cache
+from src.services.search_service import search_index
+from src.services.suggest_service import normalize_text
+
+# (what shoppers type, what they mean)
+COMMON_MISSPELLINGS = (
+    ('retinal serum', 'retinol serum'),
+    ('moisturiser', 'moisturizer'),
+    ('moisturizor', 'moisturizer'),
+    ('hyaluronc', 'hyaluronic'),
+    ('hyularonic toner', 'hyaluronic toner'),
+    ('niacinimide', 'niacinamide'),
+    ('niacinamid cream', 'niacinamide cream'),
+    ('tumeric face oil', 'turmeric face oil'),
+    ('vitamen c', 'vitamin c'),
+    ('squalene', 'squalane'),
+    ('suncreen', 'sunscreen'),
+    ('sunscren', 'sunscreen'),
+    ('cleanzer', 'cleanser'),
+    ('exfoliator', 'exfoliant'),
+    ('rose hip oil', 'rosehip oil'),
+    ('morninga', 'moringa'),
+    ('shea buter', 'shea'),
+    ('bakuchoil', 'bakuchiol'),
+    ('ceramid', 'ceramide'),
+    ('peptid cream', 'peptide cream'),
+    ('savana botanics', 'savanna botanics'),
+    ('accra glo', 'accra glow'),
+)
+
+
+def misspell(rng, word):
+    position = rng.randrange(len(word))
+    edit = rng.choice(('delete', 'double', 'swap', 'substitute'))
+    if edit == 'delete':
+        return word[:position] + word[position + 1:]
+    if edit == 'double':
+        return word[:position] + word[position] + word[position:]
+    if edit == 'swap' and position < len(word) - 1:
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+def generated_misspellings(rng, product_words, count):
+    names = [sorted(words) for words in product_words.values()]
+    queries = []
+    while len(queries) < count:
+        words = rng.sample(rng.choice(names), 2)
+        target = rng.choice([index for index, word in enumerate(words) if len(word) >= 5] or [None])
+        if target is None:
+            continue
+        typed = list(words)
+        typed[target] = misspell(rng, words[target])
+        if typed[target] != words[target]:
+            queries.append((' '.join(typed), ' '.join(words)))
+    return queries
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return round(samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000, 1)
+
+
+def evaluate(client, corpus, product_words):
+    hits, precision, recall, latencies = 0, 0.0, 0.0, []
+    for typed, intended in corpus:
+        wanted = set(intended.split())
+        relevant = {product_id for product_id, words in product_words.items() if wanted <= words}
+        catalog_cache.clear()
+        started = time.perf_counter()
+        response = client.get('/api/products', query_string={'search': typed, 'per_page': 10}).get_json()
+        latencies.append(time.perf_counter() - started)
+
+        page = [product['id'] for product in response['products']]
+        found = sum(product_id in relevant for product_id in page)
+        hits += found > 0
+        precision += found / len(page) if page else 0.0
+        recall += min(response['pagination']['total'], len(relevant)) / len(relevant) if found else 0.0
+    return {
+        'hit_rate_at_10': round(hits / len(corpus), 3),
+        'precision_at_10': round(precision / len(corpus), 3),
+        'recall': round(recall / len(corpus), 3),
+        'p50_ms': percentile(latencies, 0.5),
+        'p95_ms': percentile(latencies, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--generated', type=int, default=200, help='generated misspelled queries')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        search_index.ensure_fresh()
+        product_words = dict(search_index._product_words)
+    vocabulary = set().union(*product_words.values())
+    common = [(typed, intended) for typed, intended in COMMON_MISSPELLINGS
+              if set(normalize_text(intended).split()) <= vocabulary]
+    corpora = {
+        'common': common,
+        'generated': generated_misspellings(random.Random(args.seed), product_words, args.generated),
+    }
+
+    results = {}
+    print(f"{'corpus':>10}{'mode':>10}{'queries':>9}{'hit@10':>9}{'prec@10':>9}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for corpus_name, corpus in corpora.items():
+        for mode, enabled in (('substring', False), ('fuzzy', True)):
+            search_index.enabled = enabled
+            row = evaluate(client, corpus, product_words)
+            results[f'{corpus_name}_{mode}'] = dict(row, queries=len(corpus))
+            print(f"{corpus_name:>10}{mode:>10}{len(corpus):>9}{row['hit_rate_at_10']:>9}{row['precision_at_10']:>9}"
+                  f"{row['recall']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'benchmark': 'search',
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': {key: value for key, value in vars(args).items() if key != 'json'},
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
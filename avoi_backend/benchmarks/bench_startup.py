@@ -0,0 +1,74 @@
+"""Import-to-first-request latency of a fresh worker process.
+
+Runs each measurement in a new interpreter against a throwaway SQLite file.
+--legacy replays the old import-time work (create_all + drop/reseed) so the
+before/after numbers can be compared on the same machine.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--legacy] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r'''
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+from src.main import app
+imported = time.perf_counter()
+if os.environ.get('BENCH_LEGACY') == '1':
+    from src.models.user import db
+    from src.seed_data import seed_database
+    with app.app_context():
+        db.create_all()
+    seed_database(app, reset=True)
+ready = time.perf_counter()
+response = app.test_client().get('/api')
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'init_ms': (ready - imported) * 1000,
+                  'first_request_ms': (done - ready) * 1000, 'total_ms': (done - start) * 1000}))
+'''
+
+
+def run_once(legacy, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, BENCH_LEGACY='1' if legacy else '0')
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--legacy', action='store_true', help='also measure the old import-time DB init')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    modes = ['factory'] + (['legacy'] if args.legacy else [])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        for mode in modes:
+            runs = [run_once(mode == 'legacy', database_url) for _ in range(args.runs)]
+            results[mode] = {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+
+    print(f"{'mode':<10}{'import ms':>12}{'db init ms':>12}{'1st req ms':>12}{'total ms':>12}")
+    for mode, row in results.items():
+        print(f"{mode:<10}{row['import_ms']:>12}{row['init_ms']:>12}{row['first_request_ms']:>12}{row['total_ms']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'startup', 'runs': args.runs, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Per-keystroke latency of /api/products/suggest lookups against LIKE search.
+
+Replays typing product names one character at a time against the configured
+database (DATABASE_URL), timing the in-process prefix index after a fresh
+build (first lookup of each prefix) and again once results are cached, and
+the triple-LIKE query /api/products?search= runs for a sample of the same
+prefixes.
+
+Usage:
+  python benchmarks/bench_suggest.py
+  python benchmarks/bench_suggest.py --names 2000 --like-sample 200 --json suggest.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_api import git_revision
+from sqlalchemy import or_, select
+from src.main import create_app
+from src.models.user import db
+from src.models.product import Product
+from src.services.suggest_service import suggest_service
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_us': round(samples[len(samples) // 2] * 1e6, 1),
+        'p99_us': round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+        'max_us': round(samples[-1] * 1e6, 1),
+    }
+
+
+def timed(function, prefixes):
+    samples = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        function(prefix)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def like_search(prefix):
+    return db.session.scalars(
+        select(Product.id).where(Product.is_active == True, or_(
+            Product.name.contains(prefix), Product.description.contains(prefix), Product.brand.contains(prefix)
+        )).order_by(Product.name).limit(10)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=1000, help='product names to type out')
+    parser.add_argument('--like-sample', type=int, default=100, help='prefixes also run through LIKE search')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        names = db.session.scalars(select(Product.name).where(Product.is_active == True)).all()
+        random.Random(args.seed).shuffle(names)
+        prefixes = [name[:length] for name in names[:args.names] for length in range(1, len(name) + 1)]
+
+        started = time.perf_counter()
+        suggest_service.ensure_fresh()
+        build = time.perf_counter() - started
+
+        results = {
+            'build_s': round(build, 2),
+            'keys': len(suggest_service.ensure_fresh().pairs),
+            'lookups': len(prefixes),
+            'cold': percentiles(timed(suggest_service.suggest, prefixes)),
+            'warm': percentiles(timed(suggest_service.suggest, prefixes)),
+            'like': percentiles(timed(like_search, random.Random(args.seed).sample(prefixes, args.like_sample))),
+        }
+
+    print(f"build {results['build_s']}s, {results['keys']} keys, {results['lookups']} lookups")
+    print(f"{'':>8}{'p50 us':>12}{'p99 us':>12}{'max us':>12}")
+    for name in ('cold', 'warm', 'like'):
+        row = results[name]
+        print(f"{name:>8}{row['p50_us']:>12}{row['p99_us']:>12}{row['max_us']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'benchmark': 'suggest',
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': {key: value for key, value in vars(args).items() if key != 'json'},
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Gunicorn settings for production serving.
+
+    flask --app src.main static precompress   # once per frontend build
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+    TRUSTED_PROXY_HOPS=1 gunicorn -c gunicorn.conf.py src.wsgi:app   # behind nginx/caddy
+
+Reload: `kill -HUP <master>` restarts workers gracefully with the current config.
+Because the app is preloaded, new code needs a full restart or the USR2 + WINCH
+binary upgrade dance.
+"""
+import os
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+
+# X-Forwarded-For is ignored by default (TRUSTED_PROXY_HOPS=0), since clients that
+# reach gunicorn directly could pick their own address with it. Behind a reverse
+# proxy, set TRUSTED_PROXY_HOPS to the number of proxies in front of gunicorn
+# (usually 1); otherwise every client shares the proxy's rate-limit buckets.
+
+# Threads cover I/O waits; processes cover CPU. Override with WEB_CONCURRENCY.
+workers = int(os.environ.get('WEB_CONCURRENCY', available_cpus() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app, warm its caches and freeze the heap once in the master
+preload_app = True
+
+# Recycle workers to cap slow memory growth; jitter avoids restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # A pooled connection inherited from the master must never be used by two processes
+    from src.wsgi import app
+    from src.models.user import db
+    from src.services.scheduler_service import scheduler_service
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Threads don't survive fork, so each worker starts its own; leases stop duplicate runs
+    scheduler_service.start(app)
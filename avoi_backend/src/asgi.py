@@ -0,0 +1,277 @@
+"""ASGI entry point: async handlers for I/O-bound routes, everything else through the Flask app.
+
+    pip install -r requirements.txt  # includes uvicorn, httpx and aiosqlite
+    uvicorn src.asgi:application --host 0.0.0.0 --port 3000
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from werkzeug.http import parse_accept_header
+from src.services.compression_service import compression_service
+from src.services.currency_service import currency_service
+from src.services.metrics_service import metrics_service
+from src.services.scheduler_service import scheduler_service
+
+try:
+    import httpx
+except ImportError:  # httpx and aiosqlite are only needed for ASGI serving
+    httpx = None
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:
+    create_async_engine = None
+
+# Same policy as CORS(app, origins="*") in create_app, for responses Flask never sees
+CORS_ALLOW_ORIGIN = b'*'
+
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope and its fully read body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class ThreadPoolWsgiBridge:
+    """Runs sync Flask requests on the event loop's default executor.
+
+    The request body is read before the app starts, as WSGI expects a file;
+    response chunks go back to the loop as the app yields them, so streamed
+    responses stay streamed.
+    """
+
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+
+    async def __call__(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.run, wsgi_environ(scope, bytes(body)), send, loop)
+
+    def run(self, environ, send, loop):
+        def forward(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response_start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            }
+
+        def send_start():
+            if not response_start.get('sent'):
+                forward(response_start['message'])
+                response_start['sent'] = True
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    send_start()
+                    forward({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_start()
+            forward({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+class PooledAsyncClient:
+    """httpx.AsyncClient sharded into small pools behind one semaphore.
+
+    httpcore rescans every pending request against every pooled connection on each
+    pool event, so a single pool with hundreds of connections burns CPU quadratically.
+    Shards of at most SHARD_SIZE connections, each picked when least busy, keep that
+    scan small while the semaphore bounds total outbound concurrency.
+    """
+
+    SHARD_SIZE = 16
+
+    def __init__(self, max_connections, timeout=10):
+        shard_count = max(1, -(-max_connections // self.SHARD_SIZE))
+        per_shard = -(-max_connections // shard_count)
+        limits = httpx.Limits(max_connections=per_shard, max_keepalive_connections=per_shard)
+        self.shards = [httpx.AsyncClient(limits=limits, timeout=timeout) for _ in range(shard_count)]
+        self.in_flight = [0] * shard_count
+        self.slots = asyncio.Semaphore(per_shard * shard_count)
+
+    async def request(self, method, url, **kwargs):
+        async with self.slots:
+            index = min(range(len(self.shards)), key=self.in_flight.__getitem__)
+            self.in_flight[index] += 1
+            try:
+                return await self.shards[index].request(method, url, **kwargs)
+            finally:
+                self.in_flight[index] -= 1
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        for client in self.shards:
+            await client.aclose()
+
+
+class AsyncRequest:
+    def __init__(self, scope, app):
+        self.scope = scope
+        self.app = app
+        self.headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        self.args = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+
+
+class AsyncApplication:
+    """Dispatches async routes on the event loop and the rest to Flask in a thread pool"""
+
+    def __init__(self, flask_app, router):
+        if httpx is None or create_async_engine is None:
+            raise RuntimeError('ASGI mode needs: pip install uvicorn httpx aiosqlite')
+        self.flask_app = flask_app
+        self.router = router
+        self.wsgi = ThreadPoolWsgiBridge(flask_app)
+        self.sync_threads = flask_app.config.get('ASGI_SYNC_THREADS', 16)
+        self.http_max_connections = flask_app.config.get('ASGI_HTTP_MAX_CONNECTIONS', 128)
+        self.engine = create_async_engine(self.async_database_url(flask_app.config))
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.http = None
+        self._rates_lock = None
+        self._background = []
+
+    @staticmethod
+    def async_database_url(config):
+        url = config.get('ASYNC_DATABASE_URL') or config['SQLALCHEMY_DATABASE_URI']
+        if url.startswith('sqlite:'):
+            return url.replace('sqlite:', 'sqlite+aiosqlite:', 1)
+        return url
+
+    async def startup(self):
+        # Bounds the threads (and memory) spent on CPU-bound sync routes
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(self.sync_threads))
+        self.http = PooledAsyncClient(self.http_max_connections)
+        self._rates_lock = asyncio.Lock()
+        self._background.append(asyncio.create_task(self.refresh_exchange_rates()))
+        scheduler_service.start(self.flask_app)
+
+    async def shutdown(self):
+        scheduler_service.stop()
+        for task in self._background:
+            task.cancel()
+        await self.http.aclose()
+        await self.engine.dispose()
+
+    async def refresh_exchange_rates(self):
+        """Keep rates fresh off the request path so sync handlers never block on the rates API"""
+        while True:
+            await self.ensure_fresh_rates()
+            await asyncio.sleep(60)
+
+    async def ensure_fresh_rates(self):
+        """Single-flight refresh: concurrent callers wait for one upstream request"""
+        if not currency_service.should_update_rates():
+            return
+        async with self._rates_lock:
+            if currency_service.should_update_rates():
+                await currency_service.fetch_exchange_rates_async(self.http)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            handler, values = self.router.match(scope)
+            if handler is not None:
+                return await self.respond(handler, AsyncRequest(scope, self), values, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, handler, request, values, send):
+        """JSON response with the CORS, compression and metrics the Flask app would have added"""
+        started = time.perf_counter()
+        try:
+            payload, status = await handler(request, **values)
+        except Exception as e:
+            payload, status = {'error': str(e)}, 500
+        body = json.dumps(payload).encode('utf-8')
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'access-control-allow-origin', CORS_ALLOW_ORIGIN),
+            (b'vary', b'Accept-Encoding')
+        ]
+        if 200 <= status < 300 and len(body) >= compression_service.min_size:
+            encoding = compression_service.negotiate(parse_accept_header(request.headers.get('accept-encoding')))
+            if encoding is not None:
+                body = compression_service.compress(body, encoding)
+                headers.append((b'content-encoding', encoding.encode()))
+        headers.append((b'content-length', str(len(body)).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+        metrics_service.record(f'async.{handler.__name__}', request.scope['method'], status, time.perf_counter() - started)
+
+
+def create_asgi_app(config=None):
+    from src.main import app, create_app
+    from src.routes.async_routes import async_router
+    # Importing src.main already built the default app; only a custom config needs another
+    return AsyncApplication(create_app(config) if config else app, async_router)
+
+
+application = create_asgi_app() if httpx is not None else None
@@ -0,0 +1,233 @@
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect, select, text
+from src.models.user import db
+from src.models.product import (
+    Category, CategoryClosure, Product, ProductVariant, rebuild_category_closure, refresh_low_stock, refresh_product_price_range
+)
+from src.models.review import refresh_product_ratings
+from src.services.archive_service import archive_service
+from src.services.inventory_service import FEED_CHUNK_SIZE, FEED_FORMATS, FeedSyncAborted, inventory_service, read_feed
+from src.services.scheduler_service import scheduler_service
+from src.services.static_service import static_service
+
+db_cli = AppGroup('db', help='Create, migrate and seed the database.')
+jobs_cli = AppGroup('jobs', help='Inspect and run scheduled maintenance jobs.')
+static_cli = AppGroup('static', help='Prepare the frontend build in the static folder.')
+
+
+def _column_default_sql(column):
+    """Literal DEFAULT clause for a scalar Python-side default, if any"""
+    default = column.default
+    if default is None or not default.is_scalar:
+        return ''
+    value = default.arg
+    if isinstance(value, bool):
+        return f' DEFAULT {int(value)}'
+    if isinstance(value, (int, float)):
+        return f' DEFAULT {value}'
+    if isinstance(value, str):
+        escaped = value.replace("'", "''")
+        return f" DEFAULT '{escaped}'"
+    return ''
+
+
+def missing_columns():
+    """Model columns that existing tables lack, as 'table.column'; empty when the schema is current"""
+    missing = []
+    for bind_key, metadata in db.metadatas.items():
+        inspector = inspect(db.engines[bind_key])
+        existing_tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            missing.extend(f'{table.name}.{column.name}' for column in table.columns if column.name not in existing_columns)
+    return missing
+
+
+def _migrate_bind(engine, metadata):
+    inspector = inspect(engine)
+    dialect = engine.dialect
+    changes = []
+
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=dialect)
+                connection.execute(text(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}{_column_default_sql(column)}'
+                ))
+                changes.append(f'added column {table.name}.{column.name}')
+
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(engine)
+                changes.append(f'created index {index.name}')
+    return changes
+
+
+def migrate_schema():
+    """Bring an existing database up to the current models without dropping data"""
+    # Creates missing tables together with their indexes
+    db.create_all()
+
+    changes = []
+    # The archive bind mirrors hot tables, so it needs the same new columns
+    for bind_key, metadata in db.metadatas.items():
+        changes.extend(_migrate_bind(db.engines[bind_key], metadata))
+
+    with db.engine.begin() as connection:
+        has_categories = connection.execute(select(Category.id).limit(1)).first() is not None
+        has_closure = connection.execute(select(CategoryClosure.ancestor_id).limit(1)).first() is not None
+        if has_categories and not has_closure:
+            rebuild_category_closure(connection)
+            changes.append('backfilled category_closure')
+        if (connection.execute(select(Product.id).where(Product.min_price == None).limit(1)).first() is not None
+                or connection.execute(select(ProductVariant.id).where(ProductVariant.price == None).limit(1)).first() is not None):
+            refresh_product_price_range(connection)
+            changes.append('backfilled variant prices and product min_price/max_price')
+        if 'added column product.average_rating' in changes:
+            refresh_product_ratings(connection)
+            changes.append('backfilled product ratings')
+        if 'added column inventory.is_low_stock' in changes:
+            refresh_low_stock(connection)
+            changes.append('backfilled inventory low-stock flags')
+
+    return changes
+
+
+@db_cli.command('init-db')
+@click.option('--drop', is_flag=True, help='Drop all tables first.')
+def init_db_command(drop):
+    """Create all tables."""
+    if drop:
+        db.drop_all()
+    db.create_all()
+    click.echo('Database initialized.')
+
+
+@db_cli.command('migrate')
+def migrate_command():
+    """Add tables, columns and indexes missing from an existing database."""
+    changes = migrate_schema()
+    for change in changes:
+        click.echo(change)
+    click.echo(f'Migration complete ({len(changes)} changes).')
+
+
+@db_cli.command('seed')
+@click.option('--reset', is_flag=True, help='Drop and recreate all tables before seeding.')
+def seed_command(reset):
+    """Load the demo catalog and test user."""
+    from src.seed_data import seed_database
+    if not seed_database(current_app, reset=reset):
+        click.echo('Database already has catalog data; use --reset to reseed.')
+
+
+@db_cli.command('generate')
+@click.option('--categories', default=40, show_default=True)
+@click.option('--products', default=10000, show_default=True)
+@click.option('--users', default=1000, show_default=True)
+@click.option('--orders', default=20000, show_default=True)
+@click.option('--reviews', default=20000, show_default=True)
+@click.option('--seed', default=42, show_default=True, help='RNG seed; same seed, same dataset.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per insert transaction.')
+@click.option('--skew', default=1.1, show_default=True, help='Zipf exponent for product/customer popularity.')
+def generate_command(categories, products, users, orders, reviews, seed, batch_size, skew):
+    """Bulk-load a reproducible synthetic dataset for load testing."""
+    from src.datagen import DataGenerator
+    db.create_all()
+    generator = DataGenerator(seed=seed, batch_size=batch_size, skew=skew, log=click.echo)
+    generator.generate(categories=categories, products=products, users=users, orders=orders, reviews=reviews)
+
+
+@db_cli.command('archive')
+@click.option('--days', type=int, help='Archive finished orders older than this (default ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, help='Rows moved per transaction (default ARCHIVE_BATCH_SIZE).')
+def archive_command(days, batch_size):
+    """Move finished orders and old inventory movements to the archive database."""
+    moved = archive_service.archive(days=days, batch_size=batch_size)
+    click.echo(f"Archived {moved['orders']} orders and {moved['inventory_movements']} inventory movements.")
+
+
+@db_cli.command('sync-inventory')
+@click.argument('feed', type=click.File('r', encoding='utf-8-sig', lazy=False))
+@click.option('--format', 'fmt', type=click.Choice(FEED_FORMATS), help='Feed format (default: from the file extension).')
+@click.option('--chunk-size', default=FEED_CHUNK_SIZE, show_default=True, help='SKUs diffed and written per transaction.')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing.')
+def sync_inventory_command(feed, fmt, chunk_size, dry_run):
+    """Apply a supplier CSV/NDJSON feed of sku, quantity, price and reorder_level ('-' reads stdin)."""
+    fmt = fmt or ('ndjson' if feed.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+    try:
+        report = inventory_service.sync_feed(
+            read_feed(feed, fmt), chunk_size=chunk_size, dry_run=dry_run, reference=f'feed:{os.path.basename(feed.name)}'
+        )
+    except FeedSyncAborted as e:
+        report = e.report
+    for error in report.pop('errors'):
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    aborted = report.pop('aborted', None)
+    click.echo(', '.join(f'{key.replace("_", " ")} {value}' for key, value in report.items() if key != 'dry_run'))
+    if aborted:
+        raise click.ClickException(
+            f"sync aborted after line {report['applied_through_line']} ({report['chunks_applied']} chunks committed): {aborted}"
+        )
+    if dry_run:
+        click.echo('Dry run, nothing written.')
+
+
+@jobs_cli.command('list')
+def jobs_list_command():
+    """Show each job's schedule and last run."""
+    for job in scheduler_service.status():
+        click.echo(
+            f"{job['name']:<26}{job['schedule']:<16}{job.get('last_status') or 'never':<9}"
+            f"{job.get('last_duration_ms') or 0:>10.0f} ms  next {job.get('next_run_at') or '-'}"
+        )
+
+
+@jobs_cli.command('run')
+@click.argument('name')
+@click.option('--force', is_flag=True, help='Run even if it is not due yet (still waits for a held lease).')
+def jobs_run_command(name, force):
+    """Run one job now."""
+    job = scheduler_service.jobs.get(name)
+    if job is None:
+        raise click.BadParameter(f'unknown job, choose from: {", ".join(scheduler_service.jobs)}')
+    status = scheduler_service.run_job(current_app._get_current_object(), job, force=force)
+    click.echo(f'{name}: {status or "skipped, not due or running elsewhere"}')
+
+
+@jobs_cli.command('worker')
+def jobs_worker_command():
+    """Run the scheduler in the foreground as a sidecar process."""
+    scheduler_service.enabled = True
+    click.echo(f'Scheduling {len(scheduler_service.jobs)} jobs, Ctrl+C to stop')
+    try:
+        scheduler_service.run_forever(current_app._get_current_object())
+    except KeyboardInterrupt:
+        scheduler_service.stop()
+
+
+@static_cli.command('precompress')
+@click.option('--root', type=click.Path(exists=True, file_okay=False), help='Folder to compress (default: the app static folder).')
+def static_precompress_command(root):
+    """Write .gz/.br siblings for the frontend build; run after copying it into the static folder."""
+    root = root or current_app.static_folder
+    written = static_service.precompress(root)
+    click.echo(f'Wrote {written} compressed files under {root}.')
+
+
+def init_app(app):
+    app.cli.add_command(db_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(static_cli)
@@ -0,0 +1,104 @@
+import os
+
+BASE_DIR = os.path.dirname(__file__)
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'avoi-ecommerce-secret-key-2025')
+
+    # Database configuration
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL', f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Compress JSON API responses and cache serialized catalog payloads
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+    CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 1024))
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 60))
+
+    # Per-endpoint latency/SQL histograms served at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'False').lower() == 'true'
+    # /metrics needs 'Authorization: Bearer <METRICS_TOKEN>' unless METRICS_PUBLIC=true opens it to all
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'False').lower() == 'true'
+
+    # Queries slower than this are fingerprinted, EXPLAINed and logged
+    SLOW_QUERY_ENABLED = os.environ.get('SLOW_QUERY_ENABLED', 'True').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'logs', 'slow_queries.log'))
+
+    # Stack-sampled request profiles; requests carrying a signed X-Profile-Token are always profiled
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.0))
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    PROFILER_MAX_PROFILES = int(os.environ.get('PROFILER_MAX_PROFILES', 100))
+
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted. Rate limits
+    # key on the client address, which behind a proxy is the proxy's unless this is set
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+
+    # Token buckets for auth/newsletter endpoints, shared by all workers through SQLite
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.environ.get(
+        'RATELIMIT_STORAGE_URL', f"sqlite:///{os.path.join(BASE_DIR, 'database', 'ratelimit.db')}"
+    )
+
+    # Resized/WebP derivatives of static images, generated on first request
+    IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'images'))
+    IMAGE_CACHE_MAX_MB = int(os.environ.get('IMAGE_CACHE_MAX_MB', 256))
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 80))
+    IMAGE_WIDTHS = (160, 320, 480, 640, 960, 1280)
+
+    # ASGI mode (src/asgi.py): threads for sync Flask routes, outbound HTTP pool and async database URL
+    ASGI_SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS', 16))
+    ASGI_HTTP_MAX_CONNECTIONS = int(os.environ.get('ASGI_HTTP_MAX_CONNECTIONS', 128))
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+
+    # Build caches at import so a preloading server (gunicorn.conf.py) shares them with workers
+    PRELOAD_WARM_CACHES = os.environ.get('PRELOAD_WARM_CACHES', 'True').lower() == 'true'
+
+    # Periodic maintenance jobs (src/jobs.py). Run them in web processes or in one `flask jobs worker`
+    # sidecar; DB leases keep each exclusive job to one process either way
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'False').lower() == 'true'
+    SCHEDULER_TICK_SECONDS = float(os.environ.get('SCHEDULER_TICK_SECONDS', 5))
+    CART_ITEM_TTL_DAYS = int(os.environ.get('CART_ITEM_TTL_DAYS', 30))
+    UNVERIFIED_USER_TTL_DAYS = int(os.environ.get('UNVERIFIED_USER_TTL_DAYS', 7))
+
+    # Delivered/cancelled orders and old inventory movements move to an archive database
+    # (default: <app db>-archive.db) nightly, keeping hot tables and their indexes small
+    ARCHIVE_DATABASE_URL = os.environ.get('ARCHIVE_DATABASE_URL')
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+
+    # "Frequently bought together" lists per product (rebuild needs numpy + scipy)
+    RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', 20))
+    RECOMMENDATIONS_CACHE_TTL = int(os.environ.get('RECOMMENDATIONS_CACHE_TTL', 300))
+
+    # Ingredient similarity/exclusion index (needs numpy + scipy); re-synced on catalog writes or after this many seconds
+    INGREDIENT_INDEX_TTL = int(os.environ.get('INGREDIENT_INDEX_TTL', 60))
+
+    # Search-as-you-type index: patched on catalog writes, fully rebuilt (sales, popular searches) periodically.
+    # Searches run at least SUGGEST_MIN_QUERY_COUNT times in the window are suggested as queries
+    SUGGEST_INDEX_TTL = int(os.environ.get('SUGGEST_INDEX_TTL', 60))
+    SUGGEST_REBUILD_SECONDS = int(os.environ.get('SUGGEST_REBUILD_SECONDS', 900))
+    SUGGEST_MIN_QUERY_COUNT = int(os.environ.get('SUGGEST_MIN_QUERY_COUNT', 3))
+    SUGGEST_QUERY_WINDOW_DAYS = int(os.environ.get('SUGGEST_QUERY_WINDOW_DAYS', 30))
+
+    # Typo-tolerant product search: words of names/brands within this trigram similarity of a misspelled
+    # search word also match; at most SEARCH_FUZZY_LIMIT fuzzy hits are added to the substring matches
+    SEARCH_FUZZY_ENABLED = os.environ.get('SEARCH_FUZZY_ENABLED', 'True').lower() == 'true'
+    SEARCH_FUZZY_THRESHOLD = float(os.environ.get('SEARCH_FUZZY_THRESHOLD', 0.3))
+    SEARCH_FUZZY_LIMIT = int(os.environ.get('SEARCH_FUZZY_LIMIT', 500))
+    SEARCH_INDEX_TTL = int(os.environ.get('SEARCH_INDEX_TTL', 60))
+
+    # Shipping zones, weight tiers and tax rates used by checkout quotes and order creation
+    SHIPPING_RATES_FILE = os.environ.get('SHIPPING_RATES_FILE', os.path.join(BASE_DIR, 'data', 'shipping_rates.json'))
+
+    # Compiled promotion rules are rebuilt on promotion/catalog writes, or after this many seconds
+    PROMOTION_PLAN_TTL = int(os.environ.get('PROMOTION_PLAN_TTL', 60))
+
+    # Comma-separated addresses for the daily digest of variants at or below their reorder level
+    LOW_STOCK_ALERT_EMAILS = os.environ.get('LOW_STOCK_ALERT_EMAILS', '')
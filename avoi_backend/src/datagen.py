@@ -0,0 +1,386 @@
+"""Synthetic catalog, customer and order data for load and performance testing.
+
+Rows are produced from a seeded RNG and written with Core executemany inserts
+in batched transactions, so the same arguments always build the same dataset.
+Popularity is Zipf-skewed: a few products get most orders and reviews and a few
+customers place most orders, like a real store.
+"""
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+from src.models.user import db, User
+from src.models.product import Category, Product, ProductImage, ProductVariant, Inventory, rebuild_category_closure
+from src.models.order import Address, Order, OrderItem, OrderStatusHistory
+from src.models.review import Review, refresh_product_ratings
+from src.services.currency_service import currency_service
+
+ADJECTIVES = ['Gentle', 'Hydrating', 'Brightening', 'Nourishing', 'Balancing', 'Soothing', 'Renewing',
+              'Clarifying', 'Firming', 'Restorative', 'Radiant', 'Calming', 'Purifying', 'Revitalizing']
+ACTIVES = ['Vitamin C', 'Retinol', 'Niacinamide', 'Hyaluronic', 'Ceramide', 'Peptide', 'Shea', 'Aloe',
+           'Green Tea', 'Bakuchiol', 'Squalane', 'Rosehip', 'Moringa', 'Baobab', 'Marula', 'Turmeric']
+FORMATS = ['Cleanser', 'Moisturizer', 'Serum', 'Toner', 'Mask', 'Night Cream', 'Eye Cream', 'Body Lotion',
+           'Face Oil', 'Exfoliant', 'Sunscreen', 'Balm', 'Essence', 'Mist']
+BRANDS = ['AVOI', 'AVOI', 'AVOI', 'Kòkó Naturals', 'Savanna Botanics', 'Lagos Lab', 'Baobab & Co', 'Accra Glow']
+INGREDIENTS = ['Water', 'Glycerin', 'Niacinamide', 'Hyaluronic Acid', 'Ceramides', 'Squalane', 'Shea Butter',
+               'Jojoba Oil', 'Vitamin E', 'Ferulic Acid', 'Peptides', 'Aloe Vera', 'Witch Hazel', 'Rose Water',
+               'Panthenol', 'Retinol', 'Bakuchiol', 'Salicylic Acid', 'Lactic Acid', 'Zinc Oxide',
+               'Fragrance', 'Alcohol Denat', 'Cetyl Alcohol', 'Green Tea Extract', 'Allantoin', 'Moringa Oil']
+VARIANTS = [('Standard Size', 0), ('Travel Size', -8), ('Value Size', 15)]
+CATEGORY_ROOTS = ['Cleansers', 'Moisturizers', 'Serums', 'Toners', 'Masks', 'Body Care', 'Sun Care', 'Treatments']
+ORDER_STATUSES = ['delivered', 'delivered', 'delivered', 'delivered', 'shipped', 'processing', 'pending', 'cancelled']
+# Most traffic comes from the markets the store is built for
+NATIONALITY_WEIGHTS = {'Nigeria': 40, 'Ghana': 12, 'Kenya': 10, 'South Africa': 8, 'United Kingdom': 8,
+                       'United States': 8, 'Canada': 4}
+RATING_WEIGHTS = [4, 6, 12, 30, 48]
+
+
+class DataGenerator:
+    def __init__(self, seed=42, batch_size=5000, skew=1.1, start_date=None, log=print):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.skew = skew
+        self.start_date = start_date or datetime(2024, 1, 1)
+        self.log = log
+        self.rng = random.Random(seed)
+
+    def _next_id(self, connection, model):
+        return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def _insert(self, connection, model, rows):
+        """Insert rows in batch_size chunks, committing after each chunk"""
+        table = model.__table__
+        batch = []
+        count = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                connection.execute(table.insert(), batch)
+                connection.commit()
+                count += len(batch)
+                batch = []
+        if batch:
+            connection.execute(table.insert(), batch)
+            connection.commit()
+            count += len(batch)
+        return count
+
+    def _zipf_cum_weights(self, n):
+        return list(accumulate(1.0 / (rank ** self.skew) for rank in range(1, n + 1)))
+
+    def _random_date(self, days=730):
+        return self.start_date + timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def generate(self, categories=40, products=10000, users=1000, orders=20000, reviews=20000):
+        started = time.perf_counter()
+        with db.engine.connect() as connection:
+            # Bulk load settings; the database is not crash-safe while this runs
+            connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+            connection.exec_driver_sql('PRAGMA synchronous=OFF')
+            connection.commit()
+
+            category_ids = self.generate_categories(connection, categories)
+            first_product_id, variant_ids, variant_prices = self.generate_products(connection, products, category_ids)
+            user_ids, address_ids = self.generate_users(connection, users)
+
+            # One popularity ranking drives both orders and reviews
+            popularity = self._zipf_cum_weights(products)
+            product_rank = list(range(products))
+            self.rng.shuffle(product_rank)
+
+            self.generate_orders(connection, orders, product_rank, popularity, variant_ids, variant_prices,
+                                 user_ids, address_ids)
+            self.generate_reviews(connection, reviews, product_rank, popularity, first_product_id, user_ids)
+
+            connection.exec_driver_sql('PRAGMA synchronous=FULL')
+            connection.exec_driver_sql('ANALYZE')
+            connection.commit()
+
+        self.log(f'Dataset generated in {time.perf_counter() - started:.1f}s')
+
+    def generate_categories(self, connection, count):
+        first_id = self._next_id(connection, Category)
+        rows = []
+        roots = CATEGORY_ROOTS[:max(1, min(count, len(CATEGORY_ROOTS)))]
+        for index, name in enumerate(roots):
+            rows.append({'id': first_id + index, 'name': name, 'description': f'{name} for every skin type',
+                         'parent_category_id': None, 'slug': f'gen-{self.seed}-{first_id + index}', 'is_active': True})
+        for index in range(len(roots), count):
+            parent = self.rng.choice(rows[:len(roots)])
+            name = f'{self.rng.choice(ACTIVES)} {parent["name"]}'
+            rows.append({'id': first_id + index, 'name': name, 'description': None,
+                         'parent_category_id': parent['id'], 'slug': f'gen-{self.seed}-{first_id + index}',
+                         'is_active': True})
+        self._insert(connection, Category, rows)
+        # Core inserts skip the ORM events that maintain the closure table
+        rebuild_category_closure(connection)
+        connection.commit()
+        self.log(f'Created {len(rows)} categories')
+        return [row['id'] for row in rows]
+
+    def generate_products(self, connection, count, category_ids):
+        first_product_id = self._next_id(connection, Product)
+        first_variant_id = self._next_id(connection, ProductVariant)
+        first_image_id = self._next_id(connection, ProductImage)
+        first_inventory_id = self._next_id(connection, Inventory)
+        rng = self.rng
+
+        # Only the first (standard) variant of each product is ordered
+        variant_ids = array('q')
+        variant_prices = array('d')
+        products, variants, images, inventory = [], [], [], []
+        next_variant_id = first_variant_id
+        next_image_id = first_image_id
+        next_inventory_id = first_inventory_id
+
+        def flush():
+            connection.execute(Product.__table__.insert(), products)
+            connection.execute(ProductVariant.__table__.insert(), variants)
+            connection.execute(Inventory.__table__.insert(), inventory)
+            connection.execute(ProductImage.__table__.insert(), images)
+            connection.commit()
+            for rows in (products, variants, images, inventory):
+                rows.clear()
+
+        for index in range(count):
+            product_id = first_product_id + index
+            name = f'{rng.choice(ADJECTIVES)} {rng.choice(ACTIVES)} {rng.choice(FORMATS)}'
+            base_price = round(rng.lognormvariate(3.4, 0.5), 2)
+            created = self._random_date()
+            ingredients = ', '.join(rng.sample(INGREDIENTS, rng.randint(4, 9)))
+            products.append({
+                'id': product_id,
+                'name': name,
+                'description': f'{name} with {ingredients.split(", ")[1]} for healthy, radiant skin.',
+                'short_description': name,
+                'sku': f'GEN-{self.seed}-{product_id:08d}',
+                'base_price': base_price,
+                'compare_at_price': round(base_price * 1.2, 2) if rng.random() < 0.3 else None,
+                'category_id': rng.choice(category_ids),
+                'brand': rng.choice(BRANDS),
+                'ingredients': ingredients,
+                'usage_instructions': 'Apply to clean skin.',
+                'benefits': f'{rng.choice(ADJECTIVES)} and {rng.choice(ADJECTIVES).lower()} care',
+                'is_active': rng.random() > 0.02,
+                'date_created': created,
+                'date_modified': created,
+            })
+
+            variant_ids.append(next_variant_id)
+            variant_prices.append(base_price)
+            adjustments = []
+            for variant_name, adjustment in VARIANTS[:rng.choice((1, 1, 2, 3))]:
+                quantity = rng.randint(0, 500)
+                adjustments.append(adjustment if base_price + adjustment > 1 else 0)
+                variants.append({
+                    'id': next_variant_id,
+                    'product_id': product_id,
+                    'variant_name': variant_name,
+                    'sku': f'GEN-{self.seed}-{product_id:08d}-{variant_name[0]}',
+                    'price_adjustment': adjustments[-1],
+                    'price': round(base_price + adjustments[-1], 2),
+                    'weight': round(rng.uniform(0.05, 0.8), 2),
+                    'inventory_quantity': quantity,
+                })
+                inventory.append({
+                    'id': next_inventory_id,
+                    'product_variant_id': next_variant_id,
+                    'quantity_available': quantity,
+                    'quantity_reserved': 0,
+                    'reorder_level': 20,
+                    'is_low_stock': quantity <= 20,
+                    'low_stock_since': created if quantity <= 20 else None,
+                    'last_updated': created,
+                })
+                next_variant_id += 1
+                next_inventory_id += 1
+            # Core inserts skip the flush hook that maintains variant prices and the price range
+            products[-1]['min_price'] = round(base_price + min(adjustments), 2)
+            products[-1]['max_price'] = round(base_price + max(adjustments), 2)
+
+            for position in range(rng.randint(1, 3)):
+                images.append({
+                    'id': next_image_id,
+                    'product_id': product_id,
+                    'image_url': f'/api/placeholder/800/800?seed={product_id}-{position}',
+                    'alt_text': name,
+                    'display_order': position + 1,
+                    'is_primary': position == 0,
+                })
+                next_image_id += 1
+
+            if len(products) >= self.batch_size:
+                flush()
+
+        if products:
+            flush()
+        self.log(f'Created {count} products with {next_variant_id - first_variant_id} variants '
+                 f'and {next_image_id - first_image_id} images')
+        return first_product_id, variant_ids, variant_prices
+
+    def generate_users(self, connection, count):
+        first_user_id = self._next_id(connection, User)
+        first_address_id = self._next_id(connection, Address)
+        # Hashing is deliberately slow, so every generated user shares one hash
+        password_hash = generate_password_hash('password123')
+        nationalities = list(NATIONALITY_WEIGHTS)
+        weights = list(NATIONALITY_WEIGHTS.values())
+        rng = self.rng
+
+        user_ids = array('q')
+        address_ids = array('q')
+        users, addresses = [], []
+
+        for index in range(count):
+            user_id = first_user_id + index
+            address_id = first_address_id + index
+            nationality = rng.choices(nationalities, weights)[0]
+            created = self._random_date()
+            users.append({
+                'id': user_id,
+                'email': f'loadtest-{self.seed}-{user_id}@example.com',
+                'password_hash': password_hash,
+                'first_name': f'User{user_id}',
+                'last_name': 'Loadtest',
+                'nationality': nationality,
+                'preferred_currency': currency_service.get_currency_by_nationality(nationality),
+                'is_email_verified': True,
+                'email_verified_at': created,
+                'date_created': created,
+                'is_active': True,
+                'user_role': 'customer',
+            })
+            addresses.append({
+                'id': address_id,
+                'user_id': user_id,
+                'address_type': 'shipping',
+                'street_address': f'{rng.randint(1, 300)} Market Road',
+                'city': 'Lagos' if nationality == 'Nigeria' else 'Capital City',
+                'state': 'Lagos State' if nationality == 'Nigeria' else 'Central',
+                'postal_code': f'{rng.randint(10000, 99999)}',
+                'country': nationality,
+                'is_default': True,
+            })
+            user_ids.append(user_id)
+            address_ids.append(address_id)
+
+            if len(users) >= self.batch_size:
+                connection.execute(User.__table__.insert(), users)
+                connection.execute(Address.__table__.insert(), addresses)
+                connection.commit()
+                users.clear()
+                addresses.clear()
+
+        if users:
+            connection.execute(User.__table__.insert(), users)
+            connection.execute(Address.__table__.insert(), addresses)
+            connection.commit()
+        self.log(f'Created {count} users')
+        return user_ids, address_ids
+
+    def generate_orders(self, connection, count, product_rank, popularity, variant_ids, variant_prices,
+                        user_ids, address_ids):
+        if not count or not variant_ids or not user_ids:
+            return
+        first_order_id = self._next_id(connection, Order)
+        first_item_id = self._next_id(connection, OrderItem)
+        first_history_id = self._next_id(connection, OrderStatusHistory)
+        rng = self.rng
+        user_weights = self._zipf_cum_weights(len(user_ids))
+
+        orders, items, history = [], [], []
+        next_item_id = first_item_id
+
+        def flush():
+            connection.execute(Order.__table__.insert(), orders)
+            connection.execute(OrderItem.__table__.insert(), items)
+            connection.execute(OrderStatusHistory.__table__.insert(), history)
+            connection.commit()
+            for rows in (orders, items, history):
+                rows.clear()
+
+        for index in range(count):
+            order_id = first_order_id + index
+            user_index = rng.choices(range(len(user_ids)), cum_weights=user_weights)[0]
+            created = self._random_date()
+            status = rng.choice(ORDER_STATUSES)
+            picks = rng.choices(product_rank, cum_weights=popularity, k=rng.choice((1, 1, 2, 2, 3, 4, 5)))
+
+            subtotal = 0.0
+            for product_index in set(picks):
+                quantity = rng.choice((1, 1, 1, 2, 3))
+                unit_price = variant_prices[product_index]
+                subtotal += unit_price * quantity
+                items.append({
+                    'id': next_item_id,
+                    'order_id': order_id,
+                    'product_variant_id': variant_ids[product_index],
+                    'quantity': quantity,
+                    'unit_price': unit_price,
+                    'total_price': round(unit_price * quantity, 2),
+                })
+                next_item_id += 1
+
+            tax = round(subtotal * 0.075, 2)
+            orders.append({
+                'id': order_id,
+                'user_id': user_ids[user_index],
+                'order_number': f'GEN-{self.seed}-{order_id:010d}',
+                'order_status': status,
+                'subtotal': round(subtotal, 2),
+                'shipping_cost': 5.0,
+                'tax_amount': tax,
+                'total_amount': round(subtotal + 5.0 + tax, 2),
+                'currency': 'USD',
+                'shipping_address_id': address_ids[user_index],
+                'billing_address_id': address_ids[user_index],
+                'payment_status': 'paid' if status in ('delivered', 'shipped', 'processing') else 'pending',
+                'date_created': created,
+                'date_modified': created,
+            })
+            history.append({
+                'id': first_history_id + index,
+                'order_id': order_id,
+                'status': status,
+                'notes': 'Generated order',
+                'timestamp': created,
+                'updated_by': 'datagen',
+            })
+
+            if len(orders) >= self.batch_size:
+                flush()
+
+        if orders:
+            flush()
+        self.log(f'Created {count} orders with {next_item_id - first_item_id} order lines')
+
+    def generate_reviews(self, connection, count, product_rank, popularity, first_product_id, user_ids):
+        if not count or not product_rank or not user_ids:
+            return
+        first_review_id = self._next_id(connection, Review)
+        rng = self.rng
+
+        def rows():
+            for index in range(count):
+                product_index = rng.choices(product_rank, cum_weights=popularity)[0]
+                rating = rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+                yield {
+                    'id': first_review_id + index,
+                    'product_id': first_product_id + product_index,
+                    'user_id': rng.choice(user_ids),
+                    'rating': rating,
+                    'title': f'{rating} stars',
+                    'comment': 'Generated review for load testing.',
+                    'is_verified_purchase': rng.random() < 0.6,
+                    'is_approved': rng.random() > 0.05,
+                    'helpful_votes': int(rng.paretovariate(1.5)) - 1,
+                    'date_created': self._random_date(),
+                }
+
+        self._insert(connection, Review, rows())
+        # Core inserts skip the flush hook that maintains product ratings
+        refresh_product_ratings(connection)
+        self.log(f'Created {count} reviews')
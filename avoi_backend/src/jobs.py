@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, exists, select
+from src.models.user import User, db
+from src.models.order import Address, CartItem, Order
+from src.models.product import rebuild_category_closure, refresh_low_stock, refresh_product_price_range
+from src.models.review import Review, WishlistItem, refresh_product_ratings
+from src.services.archive_service import archive_service
+from src.services.catalog_cache import catalog_cache
+from src.services.currency_service import currency_service
+from src.services.inventory_service import inventory_service
+from src.services.recommendation_service import recommendation_service
+from src.services.scheduler_service import scheduler_service
+from src.services.shared_state import shared_counters
+from src.services.suggest_service import suggest_service
+
+BATCH_SIZE = 1000
+
+
+@scheduler_service.job(every=6 * 3600, timeout=60, exclusive=False)
+def refresh_exchange_rates(context):
+    """Rates live in each process's memory, so every process refreshes its own"""
+    return 'updated' if currency_service.fetch_exchange_rates() else 'fallback'
+
+
+@scheduler_service.job(cron='5 * * * *', timeout=300)
+def expire_cart_items(context):
+    """Drop cart rows nobody has touched in CART_ITEM_TTL_DAYS"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config.get('CART_ITEM_TTL_DAYS', 30))
+    deleted = 0
+    while True:
+        context.check()
+        ids = db.session.scalars(select(CartItem.id).where(CartItem.date_added < cutoff).limit(BATCH_SIZE)).all()
+        if not ids:
+            return f'{deleted} deleted'
+        db.session.execute(delete(CartItem).where(CartItem.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+@scheduler_service.job(cron='30 2 * * *', timeout=600)
+def purge_unverified_users(context):
+    """Delete accounts never verified within UNVERIFIED_USER_TTL_DAYS that own no orders or reviews"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config.get('UNVERIFIED_USER_TTL_DAYS', 7))
+    stale_users = select(User.id).where(
+        User.is_email_verified == False,
+        User.email_verification_sent_at < cutoff,
+        ~exists().where(Order.user_id == User.id),
+        ~exists().where(Review.user_id == User.id)
+    ).order_by(User.id).limit(BATCH_SIZE)
+
+    deleted = 0
+    last_id = 0
+    while True:
+        context.check()
+        ids = db.session.scalars(stale_users.where(User.id > last_id)).all()
+        if not ids:
+            return f'{deleted} deleted'
+        last_id = ids[-1]
+        # Orders in the archive database can't be seen by the EXISTS above
+        kept = archive_service.users_with_orders(ids)
+        ids = [user_id for user_id in ids if user_id not in kept]
+        # Bulk deletes skip ORM cascades, so clear the rows User cascades to first
+        for model in (Address, WishlistItem, CartItem):
+            db.session.execute(delete(model).where(model.user_id.in_(ids)))
+        db.session.execute(delete(User).where(User.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+@scheduler_service.job(cron='15 3 * * *', timeout=900)
+def recompute_aggregates(context):
+    """Repair drift in denormalized catalog data maintained incrementally by flush events"""
+    with db.engine.begin() as connection:
+        refresh_product_price_range(connection)
+        context.check()
+        rebuild_category_closure(connection)
+        refresh_low_stock(connection)
+        refresh_product_ratings(connection)
+    # These writes bypass the session, so invalidate cached catalog responses by hand
+    catalog_cache.bump_version()
+    shared_counters.inc('categories_version')
+
+
+@scheduler_service.job(cron='45 3 * * *', timeout=1800)
+def archive_orders(context):
+    """Move finished orders and old inventory movements out of the hot tables"""
+    moved = archive_service.archive(check=context.check)
+    return f"{moved['orders']} orders, {moved['inventory_movements']} movements"
+
+
+@scheduler_service.job(cron='0 4 * * *', timeout=1800)
+def rebuild_recommendations(context):
+    """Recompute "frequently bought together" lists, including pairs incremental updates can't place"""
+    return f'{recommendation_service.rebuild()} pairs'
+
+
+@scheduler_service.job(every=60, timeout=30, exclusive=False)
+def flush_search_queries(context):
+    """Search counts are buffered per process, so every process flushes its own"""
+    return f'{suggest_service.flush_queries()} queries'
+
+
+@scheduler_service.job(cron='0 7 * * *', timeout=120)
+def low_stock_digest(context):
+    """One email listing every variant that fell to its reorder level since the last digest"""
+    return f'{inventory_service.send_digest()} items'
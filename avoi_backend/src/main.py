@@ -3,12 +3,17 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify, render_template_string
+from flask import Flask, jsonify, redirect, render_template_string, request, url_for
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from src.models.user import db
-from src.models.product import Category, Product, ProductImage, ProductVariant, Inventory, InventoryMovement
+from src.models.product import Category, CategoryClosure, Product, ProductImage, ProductVariant, Inventory, InventoryMovement, ProductRecommendation
 from src.models.order import Address, Order, OrderItem, OrderStatusHistory, Payment, CartItem
 from src.models.review import Review, WishlistItem
+from src.models.job import JobLease
+from src.models.search import SearchQuery
+from src.models.promotion import Promotion
+from src.models.archive import ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusHistory, ArchivedPayment, ArchivedInventoryMovement
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.product import product_bp
@@ -16,98 +21,206 @@ from src.routes.cart import cart_bp
 from src.routes.order import order_bp
 from src.routes.admin import admin_bp
 from src.routes.newsletter import newsletter_bp
+from src.routes.media import media_bp
+from src.routes.checkout import checkout_bp
+from src.routes.async_routes import sync_fallback_bp
+from src.services.static_service import static_service
+from src.services.image_service import image_service
+from src.services.catalog_cache import catalog_cache
+from src.services.compression_service import compression_service
+from src.services.metrics_service import metrics_service
+from src.services.slow_query_service import slow_query_service
+from src.services.profiler_service import profiler_service
+from src.services.rate_limit_service import rate_limit_service
+from src.services.scheduler_service import scheduler_service
+from src.services.archive_service import archive_service
+from src.services.recommendation_service import recommendation_service
+from src.services.ingredient_service import ingredient_index
+from src.services.suggest_service import suggest_service
+from src.services.search_service import search_index
+from src.services.checkout_service import checkout_service
+from src.services.promotion_service import promotion_service
+from src.services.inventory_service import inventory_service
+from src.config import Config
+from src import commands, jobs
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'avoi-ecommerce-secret-key-2025'
-
-# Enable CORS for all routes
-CORS(app, origins="*")
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api')
-app.register_blueprint(product_bp, url_prefix='/api')
-app.register_blueprint(cart_bp, url_prefix='/api')
-app.register_blueprint(order_bp, url_prefix='/api')
-app.register_blueprint(admin_bp)
-app.register_blueprint(newsletter_bp, url_prefix='/api')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Initialize database and seed data
-with app.app_context():
-    db.create_all()
-    
-    # Import and run seed data
-    try:
-        from src.seed_data import seed_database
-        seed_database(app)
-    except Exception as e:
-        print(f"Seed data already exists or error: {e}")
-
-# API Root endpoint
-@app.route('/')
-def api_root():
-    return jsonify({
-        "message": "AVOI E-commerce API",
-        "version": "1.0",
-        "status": "online",
-        "description": "Skincare Inspired by Nature, Rooted in Heritage and Perfected by Science",
-        "admin_panel": "/admin",
-        "endpoints": {
-            "authentication": {
-                "register": "/api/auth/register",
-                "login": "/api/auth/login",
-                "verify_email": "/api/auth/verify-email"
-            },
-            "products": {
-                "get_all": "/api/products",
-                "get_single": "/api/products/{id}",
-                "categories": "/api/products/categories"
-            },
-            "cart": {
-                "add_item": "/api/cart/add",
-                "get_cart": "/api/cart",
-                "update_item": "/api/cart/update",
-                "remove_item": "/api/cart/remove"
-            },
-            "orders": {
-                "create_order": "/api/orders",
-                "get_orders": "/api/orders",
-                "get_order": "/api/orders/{id}"
+def create_app(config=None):
+    """Build the Flask app; does no database work so workers and tests start fast"""
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # Take the client address from the trusted proxies' X-Forwarded-For, never from further hops
+    hops = app.config.get('TRUSTED_PROXY_HOPS', 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    # Enable CORS for all routes
+    CORS(app, origins="*")
+
+    # Registered first so its after_request hook runs last and sees the full latency
+    metrics_service.init_app(app)
+    slow_query_service.init_app(app)
+    profiler_service.init_app(app)
+    rate_limit_service.init_app(app)
+
+    # Register blueprints. auth, cart and orders are mounted on their own
+    # prefixes (/api/auth/login, /api/cart/items, /api/orders/...) as the
+    # frontend and the admin endpoint list expect; under a shared /api their
+    # '/' routes collided. The old /api/... paths redirect, see LEGACY_PREFIXES.
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(product_bp, url_prefix='/api')
+    app.register_blueprint(cart_bp, url_prefix='/api/cart')
+    app.register_blueprint(order_bp, url_prefix='/api/orders')
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(newsletter_bp, url_prefix='/api')
+    app.register_blueprint(media_bp, url_prefix='/api')
+    app.register_blueprint(checkout_bp, url_prefix='/api/checkout')
+    app.register_blueprint(sync_fallback_bp)
+    register_legacy_redirects(app)
+
+    # Load the static folder into memory once instead of stat-ing it per request
+    static_service.init_app(app)
+    image_service.init_app(app)
+
+    # Compress JSON API responses and cache serialized catalog payloads
+    compression_service.init_app(app)
+    catalog_cache.init_app(app)
+    recommendation_service.init_app(app)
+    ingredient_index.init_app(app)
+    suggest_service.init_app(app)
+    search_index.init_app(app)
+    checkout_service.init_app(app)
+    promotion_service.init_app(app)
+    inventory_service.init_app(app)
+
+    # Finished orders move to a separate archive database; registers its bind
+    archive_service.init_app(app)
+    db.init_app(app)
+
+    # Schema and seed data are managed explicitly: flask db init-db / migrate / seed
+    commands.init_app(app)
+
+    # Maintenance jobs (src/jobs.py); each process starts them with scheduler_service.start(app)
+    scheduler_service.init_app(app)
+
+    register_routes(app)
+    return app
+
+
+# Blueprints that used to share the /api prefix, and where they live now
+LEGACY_PREFIXES = {'auth': '/api/auth', 'cart': '/api/cart', 'order': '/api/orders'}
+
+
+def legacy_redirect(endpoint):
+    def view(**values):
+        target = url_for(endpoint, **values)
+        if request.query_string:
+            target += '?' + request.query_string.decode()
+        # 308 keeps the method and body, so old POST/PUT/DELETE clients keep working
+        return redirect(target, code=308)
+    return view
+
+
+def register_legacy_redirects(app):
+    """Redirect the pre-remount /api/... URLs of auth, cart and orders to their current paths.
+
+    Where two old routes shared a path and method (GET /api/ was the cart, POST /api/
+    created an order) the first registered keeps it, as it did before the remount.
+    """
+    claimed = {}
+    for rule in list(app.url_map.iter_rules()):
+        blueprint = rule.endpoint.split('.', 1)[0]
+        prefix = LEGACY_PREFIXES.get(blueprint)
+        if prefix is None:
+            continue
+        legacy_path = '/api' + rule.rule[len(prefix):]
+        methods = rule.methods - {'HEAD', 'OPTIONS'} - claimed.get(legacy_path, set())
+        if not methods:
+            continue
+        claimed.setdefault(legacy_path, set()).update(methods)
+        app.add_url_rule(
+            legacy_path, f"legacy_{rule.endpoint.replace('.', '_')}", legacy_redirect(rule.endpoint), methods=sorted(methods)
+        )
+
+
+def init_database(app):
+    """Create missing tables, add columns and indexes newer models need, and seed an empty database"""
+    from src.seed_data import seed_database
+    with app.app_context():
+        # Only adds what is missing, so it is safe on every start
+        for change in commands.migrate_schema():
+            print(f'Schema: {change}')
+    seed_database(app)
+
+
+def register_routes(app):
+    # API Root endpoint
+    @app.route('/')
+    def api_root():
+        return jsonify({
+            "message": "AVOI E-commerce API",
+            "version": "1.0",
+            "status": "online",
+            "description": "Skincare Inspired by Nature, Rooted in Heritage and Perfected by Science",
+            "admin_panel": "/admin",
+            "endpoints": {
+                "authentication": {
+                    "register": "/api/auth/register",
+                    "login": "/api/auth/login",
+                    "verify_email": "/api/auth/verify-email"
+                },
+                "products": {
+                    "get_all": "/api/products",
+                    "get_single": "/api/products/{id}",
+                    "categories": "/api/products/categories"
+                },
+                "cart": {
+                    "add_item": "/api/cart/add",
+                    "get_cart": "/api/cart",
+                    "update_item": "/api/cart/update",
+                    "remove_item": "/api/cart/remove"
+                },
+                "orders": {
+                    "create_order": "/api/orders",
+                    "get_orders": "/api/orders",
+                    "get_order": "/api/orders/{id}"
+                },
+                "checkout": {
+                    "quote": "/api/checkout/quote"
+                }
             }
-        }
-    })
-
-@app.route('/api')
-def api_info():
-    return jsonify({
-        "message": "AVOI E-commerce API v1.0",
-        "status": "online",
-        "admin_panel": "/admin"
-    })
-
-# Handle static files and SPA routing
-@app.route('/<path:path>')
-def serve_static(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return jsonify({"error": "Static folder not configured"}), 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+        })
+
+    @app.route('/api')
+    def api_info():
+        return jsonify({
+            "message": "AVOI E-commerce API v1.0",
+            "status": "online",
+            "admin_panel": "/admin"
+        })
+
+    # Handle static files and SPA routing
+    @app.route('/<path:path>')
+    def serve_static(path):
+        if static_service.root is None:
+            return jsonify({"error": "Static folder not configured"}), 404
+
+        response = static_service.serve(path)
+        if response is None:
             return jsonify({"error": "Frontend not found", "message": "This is the AVOI backend API"}), 404
+        return response
+
 
+app = create_app()
 
 if __name__ == '__main__':
+    init_database(app)
+    scheduler_service.start(app)
     port = int(os.environ.get('PORT', 5001))
-    debug = os.environ.get('DEBUG', 'True').lower() == 'true'
+    debug = os.environ.get('DEBUG', 'False').lower() == 'true'
     app.run(host='0.0.0.0', port=port, debug=debug)
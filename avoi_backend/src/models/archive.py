@@ -0,0 +1,97 @@
+from src.models.user import db
+from src.models.order import Address, Order, OrderItem, OrderStatusHistory, Payment
+from src.models.product import InventoryMovement, ProductVariant
+
+ARCHIVE_BIND = 'archive'
+
+
+def archive_table(model, *indexed):
+    """Same name and columns as the hot table, in the archive database and without foreign keys"""
+    name = model.__table__.name
+    # Nullable so columns later added to the hot table can be added here without defaults
+    columns = [db.Column(column.name, column.type, primary_key=column.primary_key) for column in model.__table__.columns]
+    indexes = [db.Index(f"ix_archive_{name}_{'_'.join(index)}", *index) for index in indexed]
+    return db.Table(name, *columns, *indexes, bind_key=ARCHIVE_BIND)
+
+
+class ArchivedOrder(db.Model):
+    __table__ = archive_table(Order, ('user_id', 'date_created'))
+
+    items = db.relationship(
+        'ArchivedOrderItem', primaryjoin='ArchivedOrder.id == foreign(ArchivedOrderItem.order_id)',
+        lazy=True, viewonly=True
+    )
+    status_history = db.relationship(
+        'ArchivedOrderStatusHistory', primaryjoin='ArchivedOrder.id == foreign(ArchivedOrderStatusHistory.order_id)',
+        lazy=True, viewonly=True
+    )
+
+    def to_dict(self):
+        # Addresses and variants stay in the hot database, so they're fetched by id
+        shipping_address = db.session.get(Address, self.shipping_address_id)
+        billing_address = db.session.get(Address, self.billing_address_id)
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'order_number': self.order_number,
+            'order_status': self.order_status,
+            'subtotal': float(self.subtotal),
+            'discount_amount': float(self.discount_amount or 0),
+            'coupon_code': self.coupon_code,
+            'shipping_cost': float(self.shipping_cost),
+            'tax_amount': float(self.tax_amount),
+            'total_amount': float(self.total_amount),
+            'currency': self.currency,
+            'shipping_address_id': self.shipping_address_id,
+            'billing_address_id': self.billing_address_id,
+            'payment_status': self.payment_status,
+            'date_created': self.date_created.isoformat() if self.date_created else None,
+            'date_modified': self.date_modified.isoformat() if self.date_modified else None,
+            'items': [item.to_dict() for item in self.items],
+            'shipping_address': shipping_address.to_dict() if shipping_address else None,
+            'billing_address': billing_address.to_dict() if billing_address else None,
+            'archived': True
+        }
+
+
+class ArchivedOrderItem(db.Model):
+    __table__ = archive_table(OrderItem, ('order_id',))
+
+    def to_dict(self):
+        variant = db.session.get(ProductVariant, self.product_variant_id)
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'product_variant_id': self.product_variant_id,
+            'quantity': self.quantity,
+            'unit_price': float(self.unit_price),
+            'total_price': float(self.total_price),
+            'product_variant': variant.to_dict() if variant else None
+        }
+
+
+class ArchivedOrderStatusHistory(db.Model):
+    __table__ = archive_table(OrderStatusHistory, ('order_id',))
+
+    to_dict = OrderStatusHistory.to_dict
+
+
+class ArchivedPayment(db.Model):
+    __table__ = archive_table(Payment, ('order_id',))
+
+    to_dict = Payment.to_dict
+
+
+class ArchivedInventoryMovement(db.Model):
+    __table__ = archive_table(InventoryMovement)
+
+    to_dict = InventoryMovement.to_dict
+
+
+# Hot model -> archive model, children before parents so deletes respect foreign keys
+ARCHIVED_ORDER_MODELS = (
+    (OrderItem, ArchivedOrderItem),
+    (OrderStatusHistory, ArchivedOrderStatusHistory),
+    (Payment, ArchivedPayment),
+    (Order, ArchivedOrder),
+)
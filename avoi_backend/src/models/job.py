@@ -0,0 +1,32 @@
+from src.models.user import db
+
+class JobLease(db.Model):
+    """One row per scheduled job: who may run it now, when it is next due and how it last went"""
+    __tablename__ = 'job_lease'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100))
+    lease_expires_at = db.Column(db.DateTime)
+    next_run_at = db.Column(db.DateTime)
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(20))
+    last_duration_ms = db.Column(db.Float)
+    last_error = db.Column(db.Text)
+    run_count = db.Column(db.Integer, default=0, nullable=False)
+    failure_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+            'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+            'last_status': self.last_status,
+            'last_duration_ms': self.last_duration_ms,
+            'last_error': self.last_error,
+            'run_count': self.run_count,
+            'failure_count': self.failure_count
+        }
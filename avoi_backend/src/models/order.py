@@ -31,11 +31,19 @@ class Address(db.Model):
         }
 
 class Order(db.Model):
+    __table_args__ = (
+        db.Index('ix_order_user_date_created', 'user_id', 'date_created'),
+        # Lets the archiver find finished orders without scanning the table
+        db.Index('ix_order_status_date_modified', 'order_status', 'date_modified'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
     order_status = db.Column(db.String(20), default='pending')  # pending, processing, shipped, delivered, cancelled
     subtotal = db.Column(db.Numeric(10, 2), nullable=False)
+    discount_amount = db.Column(db.Numeric(10, 2), default=0)
+    coupon_code = db.Column(db.String(50))
     shipping_cost = db.Column(db.Numeric(10, 2), default=0)
     tax_amount = db.Column(db.Numeric(10, 2), default=0)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -66,6 +74,8 @@ class Order(db.Model):
             'order_number': self.order_number,
             'order_status': self.order_status,
             'subtotal': float(self.subtotal),
+            'discount_amount': float(self.discount_amount or 0),
+            'coupon_code': self.coupon_code,
             'shipping_cost': float(self.shipping_cost),
             'tax_amount': float(self.tax_amount),
             'total_amount': float(self.total_amount),
@@ -1,5 +1,7 @@
 from src.models.user import db
 from datetime import datetime
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm import Session
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -23,6 +25,73 @@ class Category(db.Model):
             'is_active': self.is_active
         }
 
+class CategoryClosure(db.Model):
+    """Every ancestor/descendant pair in the category tree, including each category with itself"""
+    __tablename__ = 'category_closure'
+    __table_args__ = (
+        db.Index('ix_category_closure_descendant_depth', 'descendant_id', 'depth'),
+    )
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+
+def rebuild_category_closure(connection):
+    """Recompute the closure table from parent_category_id, e.g. after bulk inserts"""
+    connection.execute(text('DELETE FROM category_closure'))
+    connection.execute(text('''
+        WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM category
+            UNION ALL
+            SELECT tree.ancestor_id, category.id, tree.depth + 1
+            FROM tree JOIN category ON category.parent_category_id = tree.descendant_id
+        )
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM tree
+    '''))
+
+
+@event.listens_for(Category, 'after_insert')
+def _add_category_to_closure(mapper, connection, target):
+    connection.execute(text('''
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, :id, depth + 1 FROM category_closure WHERE descendant_id = :parent_id
+        UNION ALL SELECT :id, :id, 0
+    '''), {'id': target.id, 'parent_id': target.parent_category_id})
+
+
+@event.listens_for(Category, 'after_update')
+def _move_category_subtree(mapper, connection, target):
+    if not inspect(target).attrs.parent_category_id.history.has_changes():
+        return
+
+    params = {'id': target.id, 'parent_id': target.parent_category_id}
+    if target.parent_category_id is not None and connection.execute(text(
+        'SELECT 1 FROM category_closure WHERE ancestor_id = :id AND descendant_id = :parent_id'
+    ), params).first():
+        raise ValueError('A category cannot be moved under itself or one of its subcategories')
+
+    # Detach the subtree from its old ancestors, then hang it under the new parent's path
+    connection.execute(text('''
+        DELETE FROM category_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = :id)
+          AND ancestor_id NOT IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = :id)
+    '''), params)
+    connection.execute(text('''
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+        FROM category_closure AS above, category_closure AS below
+        WHERE above.descendant_id = :parent_id AND below.ancestor_id = :id
+    '''), params)
+
+
+@event.listens_for(Category, 'before_delete')
+def _remove_category_from_closure(mapper, connection, target):
+    connection.execute(text(
+        'DELETE FROM category_closure WHERE ancestor_id = :id OR descendant_id = :id'
+    ), {'id': target.id})
+
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -31,6 +100,12 @@ class Product(db.Model):
     sku = db.Column(db.String(50), unique=True, nullable=False)
     base_price = db.Column(db.Numeric(10, 2), nullable=False)  # Base price in USD
     compare_at_price = db.Column(db.Numeric(10, 2))
+    # Cheapest and dearest variant sell price in USD, maintained on flush
+    min_price = db.Column(db.Numeric(10, 2), index=True)
+    max_price = db.Column(db.Numeric(10, 2), index=True)
+    # Approved reviews only, maintained on flush; average_rating is NULL without reviews
+    average_rating = db.Column(db.Float, index=True)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
     weight = db.Column(db.Numeric(8, 2))
     dimensions = db.Column(db.String(100))
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
@@ -40,7 +115,8 @@ class Product(db.Model):
     benefits = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
-    date_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed: the search, suggest and ingredient indexes sync by date_modified watermark
+    date_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     images = db.relationship('ProductImage', backref='product', lazy=True, cascade='all, delete-orphan')
@@ -60,6 +136,8 @@ class Product(db.Model):
             'sku': self.sku,
             'price': round(converted_price, 2),
             'compare_at_price': round(converted_compare_price, 2) if converted_compare_price else None,
+            'min_price': round(float(self.min_price) * exchange_rate, 2) if self.min_price is not None else None,
+            'max_price': round(float(self.max_price) * exchange_rate, 2) if self.max_price is not None else None,
             'currency': currency,
             'weight': float(self.weight) if self.weight else None,
             'dimensions': self.dimensions,
@@ -95,13 +173,20 @@ class ProductImage(db.Model):
 
 class ProductVariant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     variant_name = db.Column(db.String(100), nullable=False)
     sku = db.Column(db.String(50), unique=True, nullable=False)
     price_adjustment = db.Column(db.Numeric(10, 2), default=0)  # Price difference from base price
+    # Sell price in USD (base_price + price_adjustment), maintained on flush for price filters
+    price = db.Column(db.Numeric(10, 2))
     weight = db.Column(db.Numeric(8, 2))
     inventory_quantity = db.Column(db.Integer, default=0)
     
+    __table_args__ = (
+        # Covers EXISTS (... WHERE product_id = ? AND price BETWEEN ? AND ?) without touching the table
+        db.Index('ix_product_variant_product_price', 'product_id', 'price'),
+    )
+
     # Relationships
     inventory = db.relationship('Inventory', backref='product_variant', uselist=False, cascade='all, delete-orphan')
     cart_items = db.relationship('CartItem', backref='product_variant', lazy=True)
@@ -122,12 +207,98 @@ class ProductVariant(db.Model):
             'inventory_quantity': self.inventory_quantity
         }
 
+VARIANT_PRICE_SQL = '''
+    UPDATE product_variant SET
+        price = (SELECT base_price FROM product WHERE product.id = product_variant.product_id) + COALESCE(price_adjustment, 0)
+'''
+
+PRICE_RANGE_SQL = '''
+    UPDATE product SET
+        min_price = base_price + COALESCE((
+            SELECT MIN(COALESCE(price_adjustment, 0)) FROM product_variant WHERE product_variant.product_id = product.id
+        ), 0),
+        max_price = base_price + COALESCE((
+            SELECT MAX(COALESCE(price_adjustment, 0)) FROM product_variant WHERE product_variant.product_id = product.id
+        ), 0)
+'''
+
+
+def refresh_product_price_range(connection, product_ids=None):
+    """Recompute variant prices and min_price/max_price for the given products, or all of them"""
+    if product_ids is None:
+        connection.execute(text(VARIANT_PRICE_SQL))
+        connection.execute(text(PRICE_RANGE_SQL))
+        return
+    product_ids = list(product_ids)
+    variant_statement = text(VARIANT_PRICE_SQL + ' WHERE product_id IN :ids').bindparams(bindparam('ids', expanding=True))
+    statement = text(PRICE_RANGE_SQL + ' WHERE id IN :ids').bindparams(bindparam('ids', expanding=True))
+    for start in range(0, len(product_ids), 500):
+        connection.execute(variant_statement, {'ids': product_ids[start:start + 500]})
+        connection.execute(statement, {'ids': product_ids[start:start + 500]})
+
+
+def _price_affected_products(session):
+    product_ids = set()
+    for instance in (*session.new, *session.dirty):
+        if isinstance(instance, Product):
+            if instance in session.new or inspect(instance).attrs.base_price.history.has_changes():
+                product_ids.add(instance.id)
+        elif isinstance(instance, ProductVariant):
+            state = inspect(instance)
+            moved = state.attrs.product_id.history
+            if instance in session.new or moved.has_changes() or state.attrs.price_adjustment.history.has_changes():
+                product_ids.add(instance.product_id)
+                # A variant moved between products changes both ranges
+                product_ids.update(moved.deleted or ())
+    for instance in session.deleted:
+        if isinstance(instance, ProductVariant):
+            product_ids.add(instance.product_id)
+    product_ids.discard(None)
+    return product_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_price_ranges(session, flush_context):
+    product_ids = _price_affected_products(session)
+    if product_ids:
+        refresh_product_price_range(session.connection(), product_ids)
+        session.info.setdefault('price_range_refreshed', set()).update(product_ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_price_ranges(session, flush_context):
+    # The UPDATE ran behind the ORM's back, so reload the columns on next access
+    product_ids = session.info.pop('price_range_refreshed', ())
+    for product_id in product_ids:
+        product = session.identity_map.get(inspect(Product).identity_key_from_primary_key((product_id,)))
+        if product is not None:
+            session.expire(product, ['min_price', 'max_price'])
+    if product_ids:
+        for instance in list(session.identity_map.values()):
+            if isinstance(instance, ProductVariant) and instance.product_id in product_ids:
+                session.expire(instance, ['price'])
+
 class Inventory(db.Model):
+    """Stock for one variant; quantity_available mirrors ProductVariant.inventory_quantity.
+
+    is_low_stock is kept current by the flush events below, so the low-stock
+    report reads only the rows in the partial index instead of every variant.
+    """
+    __table_args__ = (
+        db.Index(
+            'ix_inventory_low_stock', 'product_variant_id',
+            sqlite_where=text('is_low_stock = 1'), postgresql_where=text('is_low_stock')
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    product_variant_id = db.Column(db.Integer, db.ForeignKey('product_variant.id'), nullable=False)
+    product_variant_id = db.Column(db.Integer, db.ForeignKey('product_variant.id'), nullable=False, index=True)
     quantity_available = db.Column(db.Integer, default=0)
     quantity_reserved = db.Column(db.Integer, default=0)
     reorder_level = db.Column(db.Integer, default=10)
+    is_low_stock = db.Column(db.Boolean, default=False, nullable=False)
+    low_stock_since = db.Column(db.DateTime)
+    low_stock_alerted_at = db.Column(db.DateTime)  # Set once the item has gone out in a digest
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -140,9 +311,71 @@ class Inventory(db.Model):
             'quantity_available': self.quantity_available,
             'quantity_reserved': self.quantity_reserved,
             'reorder_level': self.reorder_level,
+            'is_low_stock': self.is_low_stock,
+            'low_stock_since': self.low_stock_since.isoformat() if self.low_stock_since else None,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
 
+LOW_STOCK_CONDITION = 'COALESCE(quantity_available, 0) - COALESCE(quantity_reserved, 0) <= COALESCE(reorder_level, 0)'
+
+LOW_STOCK_SQL = f'''
+    UPDATE inventory SET
+        is_low_stock = ({LOW_STOCK_CONDITION}),
+        low_stock_since = CASE WHEN {LOW_STOCK_CONDITION} THEN COALESCE(low_stock_since, :now) END,
+        low_stock_alerted_at = CASE WHEN {LOW_STOCK_CONDITION} THEN low_stock_alerted_at END
+'''
+
+# A variant's stock changed: mirror it and re-evaluate the flag in the same statement
+STOCK_SQL = '''
+    UPDATE inventory SET
+        quantity_available = :quantity,
+        is_low_stock = (:quantity - COALESCE(quantity_reserved, 0) <= COALESCE(reorder_level, 0)),
+        low_stock_since = CASE WHEN :quantity - COALESCE(quantity_reserved, 0) <= COALESCE(reorder_level, 0)
+            THEN COALESCE(low_stock_since, :now) END,
+        low_stock_alerted_at = CASE WHEN :quantity - COALESCE(quantity_reserved, 0) <= COALESCE(reorder_level, 0)
+            THEN low_stock_alerted_at END,
+        last_updated = :now
+    WHERE product_variant_id = :variant_id
+'''
+
+
+def refresh_low_stock(connection):
+    """Recompute is_low_stock for every inventory row"""
+    connection.execute(text(LOW_STOCK_SQL), {'now': datetime.utcnow()})
+
+
+@event.listens_for(Inventory, 'before_insert')
+@event.listens_for(Inventory, 'before_update')
+def _flag_low_stock(mapper, connection, target):
+    low = (target.quantity_available or 0) - (target.quantity_reserved or 0) <= (target.reorder_level or 0)
+    if low and not target.is_low_stock:
+        target.low_stock_since = datetime.utcnow()
+    elif not low:
+        target.low_stock_since = None
+        target.low_stock_alerted_at = None
+    target.is_low_stock = low
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_inventory(session, flush_context):
+    rows = []
+    for instance in session.dirty:
+        if isinstance(instance, ProductVariant) and inspect(instance).attrs.inventory_quantity.history.has_changes():
+            rows.append({'variant_id': instance.id, 'quantity': instance.inventory_quantity or 0})
+    if rows:
+        now = datetime.utcnow()
+        session.connection().execute(text(STOCK_SQL), [dict(row, now=now) for row in rows])
+        session.info.setdefault('inventory_synced', set()).update(row['variant_id'] for row in rows)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_inventory(session, flush_context):
+    variant_ids = session.info.pop('inventory_synced', None)
+    if variant_ids:
+        for instance in list(session.identity_map.values()):
+            if isinstance(instance, Inventory) and instance.product_variant_id in variant_ids:
+                session.expire(instance)
+
 class InventoryMovement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
@@ -163,3 +396,11 @@ class InventoryMovement(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
 
+
+class ProductRecommendation(db.Model):
+    """Products ordered together with product_id; score counts shared orders, read back top-K first"""
+    __tablename__ = 'product_recommendation'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    recommended_product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
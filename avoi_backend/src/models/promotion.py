@@ -0,0 +1,55 @@
+from src.models.user import db
+from datetime import datetime
+
+PROMOTION_KINDS = ('percentage', 'fixed', 'bogo', 'free_shipping')
+
+class Promotion(db.Model):
+    """A discount rule; with a code it is a coupon, without one it applies automatically.
+
+    value is the percentage off for percentage rules, the USD amount off for
+    fixed rules and the percentage off the "get" items for bogo rules.
+    Empty product/category lists mean the whole cart; categories include
+    their subcategories.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    code = db.Column(db.String(50), unique=True)
+    kind = db.Column(db.String(20), nullable=False)  # percentage, fixed, bogo, free_shipping
+    value = db.Column(db.Numeric(10, 2), default=0)
+    buy_quantity = db.Column(db.Integer, default=1)
+    get_quantity = db.Column(db.Integer, default=1)
+    product_ids = db.Column(db.JSON, default=list)
+    category_ids = db.Column(db.JSON, default=list)
+    min_subtotal = db.Column(db.Numeric(10, 2))  # USD
+    currencies = db.Column(db.JSON, default=list)
+    nationalities = db.Column(db.JSON, default=list)
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    usage_limit = db.Column(db.Integer)
+    usage_count = db.Column(db.Integer, default=0, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'kind': self.kind,
+            'value': float(self.value or 0),
+            'buy_quantity': self.buy_quantity,
+            'get_quantity': self.get_quantity,
+            'product_ids': self.product_ids or [],
+            'category_ids': self.category_ids or [],
+            'min_subtotal': float(self.min_subtotal) if self.min_subtotal is not None else None,
+            'currencies': self.currencies or [],
+            'nationalities': self.nationalities or [],
+            'starts_at': self.starts_at.isoformat() if self.starts_at else None,
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
+            'usage_limit': self.usage_limit,
+            'usage_count': self.usage_count,
+            'is_active': self.is_active,
+            'date_created': self.date_created.isoformat() if self.date_created else None,
+            'date_modified': self.date_modified.isoformat() if self.date_modified else None
+        }
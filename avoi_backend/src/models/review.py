@@ -1,5 +1,8 @@
 from src.models.user import db
+from src.models.product import Product
 from datetime import datetime
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm import Session
 
 class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,6 +31,55 @@ class Review(db.Model):
             'user_name': f"{self.user.first_name} {self.user.last_name[0]}." if self.user else "Anonymous"
         }
 
+PRODUCT_RATING_SQL = '''
+    UPDATE product SET
+        average_rating = (SELECT AVG(rating) FROM review WHERE review.product_id = product.id AND review.is_approved),
+        review_count = (SELECT COUNT(*) FROM review WHERE review.product_id = product.id AND review.is_approved)
+'''
+
+
+def refresh_product_ratings(connection, product_ids=None):
+    """Recompute average_rating/review_count for the given products, or all of them"""
+    if product_ids is None:
+        connection.execute(text(PRODUCT_RATING_SQL))
+        return
+    product_ids = list(product_ids)
+    statement = text(PRODUCT_RATING_SQL + ' WHERE id IN :ids').bindparams(bindparam('ids', expanding=True))
+    for start in range(0, len(product_ids), 500):
+        connection.execute(statement, {'ids': product_ids[start:start + 500]})
+
+
+def _rating_affected_products(session):
+    product_ids = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(instance, Review):
+            continue
+        state = inspect(instance)
+        moved = state.attrs.product_id.history
+        if (instance in session.dirty and not moved.has_changes()
+                and not state.attrs.rating.history.has_changes() and not state.attrs.is_approved.history.has_changes()):
+            continue
+        product_ids.add(instance.product_id)
+        product_ids.update(moved.deleted or ())
+    product_ids.discard(None)
+    return product_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_ratings(session, flush_context):
+    product_ids = _rating_affected_products(session)
+    if product_ids:
+        refresh_product_ratings(session.connection(), product_ids)
+        session.info.setdefault('ratings_refreshed', set()).update(product_ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_ratings(session, flush_context):
+    for product_id in session.info.pop('ratings_refreshed', ()):
+        product = session.identity_map.get(inspect(Product).identity_key_from_primary_key((product_id,)))
+        if product is not None:
+            session.expire(product, ['average_rating', 'review_count'])
+
 class WishlistItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -0,0 +1,17 @@
+from src.models.user import db
+from datetime import datetime
+
+class SearchQuery(db.Model):
+    """How often a normalized catalog search has been run; feeds popular-query suggestions"""
+    __tablename__ = 'search_query'
+
+    query = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    last_searched_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'query': self.query,
+            'count': self.count,
+            'last_searched_at': self.last_searched_at.isoformat() if self.last_searched_at else None
+        }
@@ -1,5 +1,16 @@
-from flask import Blueprint, request, jsonify, session, render_template_string
+from flask import Blueprint, Response, request, jsonify, session, render_template, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
+from functools import lru_cache, wraps
+from src.services.slow_query_service import slow_query_service
+from src.services.profiler_service import profiler_service, PROFILE_HEADER
+from src.services.rate_limit_service import rate_limit_service
+from src.services.scheduler_service import scheduler_service
+from src.services.promotion_service import normalize_code
+from src.services.inventory_service import FEED_FORMATS, FeedError, FeedSyncAborted, inventory_service, read_feed
+from src.models.user import db
+from src.models.promotion import PROMOTION_KINDS, Promotion
+from datetime import datetime
+import io
 import os
 
 admin_bp = Blueprint('admin', __name__)
@@ -8,6 +19,24 @@ admin_bp = Blueprint('admin', __name__)
 ADMIN_EMAIL = "Saheedkehinde052@gmail.com"
 ADMIN_PASSWORD_HASH = generate_password_hash("pheymous414")
 
+@lru_cache(maxsize=None)
+def compile_template(jinja_env, source):
+    return jinja_env.from_string(source)
+
+def render_admin_template(source, **context):
+    """render_template_string without recompiling the template on every request"""
+    return render_template(compile_template(current_app.jinja_env, source), **context)
+
+def admin_required(f):
+    """Restrict JSON admin endpoints to a logged-in admin session"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not session.get('admin_logged_in'):
+            return jsonify({'error': 'Admin login required'}), 401
+        return f(*args, **kwargs)
+    
+    return decorated
+
 # Simple HTML template for admin login
 ADMIN_LOGIN_TEMPLATE = """
 <!DOCTYPE html>
@@ -349,26 +378,253 @@ def admin_login():
         if email == ADMIN_EMAIL and check_password_hash(ADMIN_PASSWORD_HASH, password):
             session['admin_logged_in'] = True
             session['admin_email'] = email
-            return render_template_string(ADMIN_DASHBOARD_TEMPLATE, admin_email=email)
+            return render_admin_template(ADMIN_DASHBOARD_TEMPLATE, admin_email=email)
         else:
-            return render_template_string(ADMIN_LOGIN_TEMPLATE, error="Invalid email or password")
+            return render_admin_template(ADMIN_LOGIN_TEMPLATE, error="Invalid email or password")
     
     # Check if already logged in
     if session.get('admin_logged_in'):
-        return render_template_string(ADMIN_DASHBOARD_TEMPLATE, admin_email=session.get('admin_email'))
+        return render_admin_template(ADMIN_DASHBOARD_TEMPLATE, admin_email=session.get('admin_email'))
     
-    return render_template_string(ADMIN_LOGIN_TEMPLATE)
+    return render_admin_template(ADMIN_LOGIN_TEMPLATE)
 
 @admin_bp.route('/admin/logout')
 def admin_logout():
     session.pop('admin_logged_in', None)
     session.pop('admin_email', None)
-    return render_template_string(ADMIN_LOGIN_TEMPLATE, error="Logged out successfully")
+    return render_admin_template(ADMIN_LOGIN_TEMPLATE, error="Logged out successfully")
 
 @admin_bp.route('/admin/dashboard')
 def admin_dashboard():
     if not session.get('admin_logged_in'):
-        return render_template_string(ADMIN_LOGIN_TEMPLATE, error="Please login first")
+        return render_admin_template(ADMIN_LOGIN_TEMPLATE, error="Please login first")
+    
+    return render_admin_template(ADMIN_DASHBOARD_TEMPLATE, admin_email=session.get('admin_email'))
+
+@admin_bp.route('/admin/api/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    order_by = request.args.get('order_by', 'total_ms')
+    if order_by not in ('total_ms', 'max_ms', 'count'):
+        return jsonify({'error': 'order_by must be total_ms, max_ms or count'}), 400
     
-    return render_template_string(ADMIN_DASHBOARD_TEMPLATE, admin_email=session.get('admin_email'))
+    return jsonify({
+        'threshold_ms': slow_query_service.threshold_ms,
+        'queries': slow_query_service.top(limit, order_by)
+    }), 200
+
+@admin_bp.route('/admin/api/slow-queries', methods=['DELETE'])
+@admin_required
+def reset_slow_queries():
+    slow_query_service.reset()
+    return jsonify({'message': 'Slow query statistics cleared'}), 200
+
+@admin_bp.route('/admin/api/profiles', methods=['GET'])
+@admin_required
+def get_profiles():
+    endpoint = request.args.get('endpoint')
+    profiles = [p.to_dict() for p in reversed(profiler_service.profiles) if not endpoint or p.endpoint == endpoint]
+    return jsonify({
+        'sample_rate': profiler_service.sample_rate,
+        'interval_ms': profiler_service.interval * 1000,
+        'profiles': profiles
+    }), 200
+
+@admin_bp.route('/admin/api/profiles/token', methods=['POST'])
+@admin_required
+def create_profile_token():
+    data = request.get_json(silent=True) or {}
+    token = profiler_service.generate_token(data.get('note', session.get('admin_email', '')))
+    return jsonify({
+        'header': PROFILE_HEADER,
+        'token': token,
+        'expires_in': profiler_service.token_max_age
+    }), 200
+
+@admin_bp.route('/admin/api/profiles/<int:profile_id>/collapsed', methods=['GET'])
+@admin_required
+def get_profile_collapsed(profile_id):
+    profile = profiler_service.get(profile_id)
+    if not profile:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(profile.collapsed(), mimetype='text/plain')
+
+@admin_bp.route('/admin/api/profiles/collapsed', methods=['GET'])
+@admin_required
+def get_merged_profile_collapsed():
+    return Response(profiler_service.merged(request.args.get('endpoint')), mimetype='text/plain')
+
+@admin_bp.route('/admin/api/rate-limits', methods=['GET'])
+@admin_required
+def get_rate_limits():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({
+        'enabled': rate_limit_service.enabled,
+        'limited_keys': rate_limit_service.top_limited(limit)
+    }), 200
+
+@admin_bp.route('/admin/api/rate-limits', methods=['DELETE'])
+@admin_required
+def reset_rate_limits():
+    rate_limit_service.reset()
+    return jsonify({'message': 'Rate limit buckets cleared'}), 200
+
+@admin_bp.route('/admin/api/jobs', methods=['GET'])
+@admin_required
+def get_jobs():
+    try:
+        return jsonify({
+            'enabled_here': scheduler_service.enabled,
+            'jobs': scheduler_service.status()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+PROMOTION_FIELDS = (
+    'name', 'code', 'kind', 'value', 'buy_quantity', 'get_quantity', 'product_ids', 'category_ids',
+    'min_subtotal', 'currencies', 'nationalities', 'starts_at', 'ends_at', 'usage_limit', 'is_active'
+)
+
+def is_number(value, integer=False):
+    # bool is an int subclass, but true/false is never a meaningful amount
+    types = int if integer else (int, float)
+    return isinstance(value, types) and not isinstance(value, bool)
+
+def apply_promotion_fields(promotion, data):
+    """Copy fields from a JSON body onto a promotion; returns an error message or None"""
+    for field in PROMOTION_FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        if field in ('starts_at', 'ends_at') and value:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                return f'{field} must be an ISO 8601 date'
+        elif field == 'code':
+            value = normalize_code(value) or None
+        elif field in ('product_ids', 'category_ids'):
+            if not isinstance(value or [], list) or not all(is_number(item, integer=True) for item in value or []):
+                return f'{field} must be a list of ids'
+            value = value or []
+        elif field in ('currencies', 'nationalities'):
+            if not isinstance(value or [], list) or not all(isinstance(item, str) for item in value or []):
+                return f'{field} must be a list of strings'
+            value = value or []
+        elif field in ('value', 'min_subtotal'):
+            if value is None and field == 'min_subtotal':
+                pass
+            elif not is_number(value) or value < 0:
+                return f'{field} must be a number of at least 0'
+        elif field in ('buy_quantity', 'get_quantity'):
+            if not is_number(value, integer=True) or value < 1:
+                return f'{field} must be a whole number of at least 1'
+        elif field == 'usage_limit' and value is not None:
+            if not is_number(value, integer=True) or value < 0:
+                return 'usage_limit must be a whole number of at least 0'
+        elif field == 'is_active' and not isinstance(value, bool):
+            return 'is_active must be true or false'
+        setattr(promotion, field, value)
+    
+    if not promotion.name:
+        return 'name is required'
+    if promotion.kind not in PROMOTION_KINDS:
+        return f"kind must be one of {', '.join(PROMOTION_KINDS)}"
+    if promotion.kind in ('percentage', 'bogo') and float(promotion.value or 0) > 100:
+        return 'value is a percentage and can be at most 100'
+    return None
+
+@admin_bp.route('/admin/api/promotions', methods=['GET'])
+@admin_required
+def get_promotions():
+    try:
+        promotions = Promotion.query.order_by(Promotion.id.desc()).all()
+        return jsonify({'promotions': [promotion.to_dict() for promotion in promotions]}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/api/promotions', methods=['POST'])
+@admin_required
+def create_promotion():
+    try:
+        promotion = Promotion(usage_count=0)
+        error = apply_promotion_fields(promotion, request.get_json(silent=True) or {})
+        if error:
+            return jsonify({'error': error}), 400
+        if promotion.code and Promotion.query.filter_by(code=promotion.code).first():
+            return jsonify({'error': 'A promotion with this code already exists'}), 400
+        
+        db.session.add(promotion)
+        db.session.commit()
+        return jsonify({'promotion': promotion.to_dict()}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/api/promotions/<int:promotion_id>', methods=['PUT'])
+@admin_required
+def update_promotion(promotion_id):
+    try:
+        promotion = db.session.get(Promotion, promotion_id)
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+        error = apply_promotion_fields(promotion, request.get_json(silent=True) or {})
+        if error:
+            db.session.rollback()
+            return jsonify({'error': error}), 400
+        
+        db.session.commit()
+        return jsonify({'promotion': promotion.to_dict()}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/api/promotions/<int:promotion_id>', methods=['DELETE'])
+@admin_required
+def deactivate_promotion(promotion_id):
+    """Deactivated rather than deleted: orders keep referring to their coupon code"""
+    try:
+        promotion = db.session.get(Promotion, promotion_id)
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+        promotion.is_active = False
+        db.session.commit()
+        return jsonify({'message': 'Promotion deactivated'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/api/inventory/low-stock', methods=['GET'])
+@admin_required
+def get_low_stock():
+    try:
+        limit = min(request.args.get('limit', 100, type=int), 500)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        items, total = inventory_service.low_stock(limit, offset, new_only=request.args.get('new') == 'true')
+        return jsonify({'items': items, 'total': total, 'limit': limit, 'offset': offset}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/admin/api/inventory/sync', methods=['POST'])
+@admin_required
+def sync_inventory():
+    """Stream a supplier feed from the request body: ?format=csv|ndjson, or inferred from Content-Type"""
+    try:
+        fmt = request.args.get('format') or ('ndjson' if 'json' in (request.mimetype or '') else 'csv')
+        if fmt not in FEED_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(FEED_FORMATS)}"}), 400
+        feed = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        report = inventory_service.sync_feed(
+            read_feed(feed, fmt),
+            dry_run=request.args.get('dry_run') == 'true',
+            reference=request.args.get('reference') or f"feed:{datetime.utcnow():%Y%m%d%H%M%S}"
+        )
+        return jsonify(report), 200
+    except FeedError as e:
+        return jsonify({'error': str(e)}), 400
+    except FeedSyncAborted as e:
+        # Chunks before applied_through_line are committed; rerunning the feed is safe
+        return jsonify({'error': str(e), 'report': e.report}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,114 @@
+from flask import Blueprint, jsonify
+from sqlalchemy import select
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import Map, Rule
+from src.models.user import db
+from src.models.product import Product, ProductVariant, Inventory
+from src.services.currency_service import currency_service
+
+class AsyncRouter:
+    """Werkzeug URL map for native async handlers"""
+
+    def __init__(self):
+        self.url_map = Map()
+        self.handlers = {}
+
+    def route(self, rule, methods=('GET',)):
+        def decorator(handler):
+            self.url_map.add(Rule(rule, endpoint=handler.__name__, methods=list(methods)))
+            self.handlers[handler.__name__] = handler
+            return handler
+        return decorator
+
+    def match(self, scope):
+        adapter = self.url_map.bind('', path_info=scope['path'])
+        try:
+            endpoint, values = adapter.match(method=scope['method'])
+        except (NotFound, MethodNotAllowed):
+            return None, None
+        return self.handlers[endpoint], values
+
+async_router = AsyncRouter()
+
+# Every async route has a sync twin on this blueprint, so WSGI servers answer the same paths;
+# under ASGI the async router matches first and Flask never sees them
+sync_fallback_bp = Blueprint('async_fallback', __name__)
+
+
+def rates_payload():
+    return {
+        'base_currency': currency_service.base_currency,
+        'rates': {code: currency_service.exchange_rates.get(code, 1.0)
+                  for code in sorted(set(currency_service.get_supported_currencies()))},
+        'last_updated': currency_service.last_updated.isoformat() if currency_service.last_updated else None
+    }
+
+
+def active_product_statement(product_id):
+    return select(Product.id).where(Product.id == product_id, Product.is_active == True)
+
+
+def availability_statement(product_id):
+    return (
+        select(
+            ProductVariant.id,
+            ProductVariant.variant_name,
+            Inventory.quantity_available,
+            Inventory.quantity_reserved
+        ).outerjoin(Inventory, Inventory.product_variant_id == ProductVariant.id)
+        .where(ProductVariant.product_id == product_id)
+        .order_by(ProductVariant.id)
+    )
+
+
+def availability_payload(product_id, rows):
+    variants = []
+    for variant_id, variant_name, available, reserved in rows:
+        in_stock = (available or 0) - (reserved or 0)
+        variants.append({
+            'variant_id': variant_id,
+            'variant_name': variant_name,
+            'quantity_available': max(in_stock, 0),
+            'in_stock': in_stock > 0
+        })
+
+    return {
+        'product_id': product_id,
+        'variants': variants,
+        'in_stock': any(variant['in_stock'] for variant in variants)
+    }
+
+
+@async_router.route('/api/currency/rates')
+async def get_exchange_rates(request):
+    """Current exchange rates; a stale table is refreshed without blocking a thread"""
+    await request.app.ensure_fresh_rates()
+    return rates_payload(), 200
+
+@async_router.route('/api/products/<int:product_id>/availability')
+async def get_product_availability(request, product_id):
+    """Per-variant stock for product pages that poll while open"""
+    async with request.app.session_factory() as session:
+        if await session.scalar(active_product_statement(product_id)) is None:
+            return {'error': 'Product not found'}, 404
+        rows = (await session.execute(availability_statement(product_id))).all()
+    return availability_payload(product_id, rows), 200
+
+@sync_fallback_bp.route('/api/currency/rates')
+def get_exchange_rates_sync():
+    try:
+        if currency_service.should_update_rates():
+            currency_service.fetch_exchange_rates()
+        return jsonify(rates_payload()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@sync_fallback_bp.route('/api/products/<int:product_id>/availability')
+def get_product_availability_sync(product_id):
+    try:
+        if db.session.scalar(active_product_statement(product_id)) is None:
+            return jsonify({'error': 'Product not found'}), 404
+        rows = db.session.execute(availability_statement(product_id)).all()
+        return jsonify(availability_payload(product_id, rows)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, User
 from src.services.currency_service import currency_service
-from src.services.email_service import email_service
+from src.services.email_service import email_outbox, email_service
+from src.services.rate_limit_service import rate_limit, json_email
 import jwt
 import datetime
 from functools import wraps
@@ -47,6 +48,7 @@ def generate_token(user_id):
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register', 10, 3600)
 def register():
     try:
         data = request.get_json()
@@ -83,10 +85,11 @@ def register():
         db.session.add(user)
         db.session.commit()
         
-        # Send verification email
-        email_sent = email_service.send_verification_email(
-            user.email, 
-            user.first_name, 
+        # Queue the verification email; the outbox thread sends it after we respond
+        email_sent = email_outbox.submit(
+            email_service.send_verification_email,
+            user.email,
+            user.first_name,
             verification_token
         )
         
@@ -108,6 +111,8 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', 20, 60)
+@rate_limit('login_email', 5, 60, key=json_email)
 def login():
     try:
         data = request.get_json()
@@ -251,6 +256,8 @@ def verify_email():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/resend-verification', methods=['POST'])
+@rate_limit('resend_verification', 10, 3600)
+@rate_limit('resend_verification_email', 3, 900, key=json_email)
 def resend_verification():
     """Resend verification email"""
     try:
@@ -272,10 +279,11 @@ def resend_verification():
         user.set_verification_token(verification_token)
         db.session.commit()
         
-        # Send verification email
-        email_sent = email_service.send_verification_email(
-            user.email, 
-            user.first_name, 
+        # Queue the verification email; the outbox thread sends it after we respond
+        email_sent = email_outbox.submit(
+            email_service.send_verification_email,
+            user.email,
+            user.first_name,
             verification_token
         )
         
@@ -4,6 +4,8 @@ from src.models.order import CartItem
 from src.models.product import ProductVariant
 from src.routes.auth import token_required
 from src.services.currency_service import currency_service
+from src.services.checkout_service import checkout_service
+from src.services.promotion_service import PromotionError, promotion_service
 
 cart_bp = Blueprint('cart', __name__)
 
@@ -20,10 +22,12 @@ def get_cart(current_user):
         # Calculate totals
         subtotal = 0
         cart_data = []
+        lines = []
         
         for item in cart_items:
             item_data = item.to_dict(user_currency, exchange_rate)
             if item.product_variant:
+                lines.append(checkout_service.cart_line(item.product_variant, item.quantity))
                 item_price = item.product_variant.product.base_price + item.product_variant.price_adjustment
                 converted_price = float(item_price) * exchange_rate
                 item_total = converted_price * item.quantity
@@ -33,12 +37,29 @@ def get_cart(current_user):
             
             cart_data.append(item_data)
         
-        return jsonify({
+        # Same promotion pricing as checkout; a bad ?coupon_code= is reported, not fatal
+        coupon_error = None
+        try:
+            pricing = promotion_service.price(
+                lines, user_currency, current_user.nationality, exchange_rate, request.args.get('coupon_code')
+            )
+        except PromotionError as e:
+            coupon_error = str(e)
+            pricing = promotion_service.price(lines, user_currency, current_user.nationality, exchange_rate)
+        
+        payload = {
             'cart_items': cart_data,
             'subtotal': round(subtotal, 2),
+            'discounts': pricing['discounts'],
+            'discount_total': pricing['discount_total'],
+            'free_shipping': pricing['free_shipping'],
             'currency': user_currency,
             'item_count': len(cart_items)
-        }), 200
+        }
+        if coupon_error:
+            payload['coupon_error'] = coupon_error
+        
+        return jsonify(payload), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,63 @@
+from flask import Blueprint, request, jsonify
+from types import SimpleNamespace
+from src.models.order import Address
+from src.routes.auth import token_required
+from src.services.checkout_service import checkout_service
+from src.services.currency_service import currency_service
+from src.services.promotion_service import PromotionError, promotion_service
+
+checkout_bp = Blueprint('checkout', __name__)
+
+def quote_address(current_user, data):
+    """The address to quote for: a saved address, an unsaved one in the body, or the user's default"""
+    if data.get('shipping_address_id'):
+        return Address.query.filter_by(id=data['shipping_address_id'], user_id=current_user.id).first()
+    if data.get('address') is not None:
+        fields = data['address']
+        return SimpleNamespace(
+            country=fields.get('country'), state=fields.get('state'), postal_code=fields.get('postal_code')
+        ) if fields.get('country') else None
+    return Address.query.filter(
+        Address.user_id == current_user.id, Address.address_type == 'shipping'
+    ).order_by(Address.is_default.desc(), Address.id).first()
+
+@checkout_bp.route('/quote', methods=['POST'])
+@token_required
+def get_quote(current_user):
+    """Shipping, tax and total for the current cart; cheap enough to call on every cart change"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        address = quote_address(current_user, data)
+        if address is None:
+            return jsonify({'error': 'A shipping address with a country is required'}), 400
+        
+        lines = checkout_service.cart_lines(current_user.id)
+        if not lines:
+            return jsonify({'error': 'Cart is empty'}), 400
+        
+        user_currency = current_user.preferred_currency
+        exchange_rate = currency_service.get_exchange_rate(user_currency)
+        
+        subtotal = sum(line.unit_price * exchange_rate * line.quantity for line in lines)
+        weight = sum(line.weight * line.quantity for line in lines)
+        
+        try:
+            pricing = promotion_service.price(
+                lines, user_currency, current_user.nationality, exchange_rate, data.get('coupon_code')
+            )
+        except PromotionError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        quote = checkout_service.quote(
+            address, subtotal, weight, user_currency, exchange_rate,
+            pricing['discount_total'], pricing['free_shipping']
+        )
+        quote['discounts'] = pricing['discounts']
+        quote['coupon_code'] = pricing['coupon_code']
+        quote['item_count'] = len(lines)
+        
+        return jsonify({'quote': quote}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
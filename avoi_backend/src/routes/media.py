@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from src.services.image_service import image_service
+
+media_bp = Blueprint('media', __name__)
+
+@media_bp.route('/images/<path:path>', methods=['GET'])
+def get_image(path):
+    """Serve a static image, resized and re-encoded when w is given"""
+    try:
+        response = image_service.serve(
+            path,
+            width=request.args.get('w', type=int),
+            requested_format=request.args.get('fmt'),
+            version=request.args.get('v')
+        )
+        if response is None:
+            return jsonify({'error': 'Image not found'}), 404
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@media_bp.route('/placeholder/<int:width>/<int:height>', methods=['GET'])
+def get_placeholder(width, height):
+    """Lightweight SVG placeholder used by the frontend while images are missing"""
+    return image_service.placeholder(width, height, request.args.get('text'))
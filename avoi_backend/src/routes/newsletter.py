@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from src.services.email_service import send_email
+from src.services.email_service import email_outbox, send_email
+from src.services.rate_limit_service import rate_limit
 import re
 from datetime import datetime
 
@@ -11,6 +12,7 @@ def is_valid_email(email):
     return re.match(pattern, email) is not None
 
 @newsletter_bp.route('/newsletter/subscribe', methods=['POST'])
+@rate_limit('newsletter', 5, 3600)
 def subscribe_newsletter():
     try:
         data = request.get_json()
@@ -140,7 +142,9 @@ def subscribe_newsletter():
         
         # Send welcome email
         try:
-            email_sent = send_email(
+            # Queued so the subscriber doesn't wait on SMTP
+            email_sent = email_outbox.submit(
+                send_email,
                 to_email=email,
                 subject=subject,
                 html_content=html_content,
@@ -150,7 +154,7 @@ def subscribe_newsletter():
             if email_sent:
                 return jsonify({
                     'success': True,
-                    'message': f'🎉 Thank you for subscribing! A welcome email has been sent to {email}. Please check your inbox (and spam folder) for your AVOI welcome message with exclusive benefits!'
+                    'message': f'🎉 Thank you for subscribing! A welcome email is on its way to {email}. Please check your inbox (and spam folder) for your AVOI welcome message with exclusive benefits!'
                 }), 200
             else:
                 return jsonify({
@@ -4,10 +4,30 @@ from src.models.order import Order, OrderItem, OrderStatusHistory, Address, Cart
 from src.models.product import ProductVariant
 from src.routes.auth import token_required
 from src.services.currency_service import currency_service
+from src.services.archive_service import archive_service
+from src.services.recommendation_service import recommendation_service
+from src.services.checkout_service import checkout_service
+from src.services.promotion_service import PromotionError, promotion_service
 from datetime import datetime
+import heapq
+import math
 
 order_bp = Blueprint('order', __name__)
 
+def merged_order_page(hot_query, user_id, status, page, per_page):
+    """One newest-first page across hot and archived orders, plus the combined total"""
+    page = max(page, 1)
+    window = page * per_page
+    hot = hot_query.order_by(Order.date_created.desc(), Order.id.desc()).limit(window).all()
+    archived = archive_service.user_orders(user_id, status, limit=window)
+    total = hot_query.order_by(None).count() + archive_service.count_user_orders(user_id, status)
+
+    # An order caught mid-archive exists in both databases; the hot copy wins
+    hot_ids = {order.id for order in hot}
+    archived = [order for order in archived if order.id not in hot_ids]
+    merged = heapq.merge(hot, archived, key=lambda order: (order.date_created, order.id), reverse=True)
+    return list(merged)[window - per_page:window], total
+
 @order_bp.route('/', methods=['GET'])
 @token_required
 def get_orders(current_user):
@@ -21,19 +41,18 @@ def get_orders(current_user):
         if status_filter:
             query = query.filter_by(order_status=status_filter)
         
-        orders = query.order_by(Order.date_created.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        orders, total = merged_order_page(query, current_user.id, status_filter, page, per_page)
+        pages = math.ceil(total / per_page) if total else 0
         
         return jsonify({
-            'orders': [order.to_dict() for order in orders.items],
+            'orders': [order.to_dict() for order in orders],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': orders.total,
-                'pages': orders.pages,
-                'has_next': orders.has_next,
-                'has_prev': orders.has_prev
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
             }
         }), 200
         
@@ -47,7 +66,12 @@ def get_order(current_user, order_id):
         order = Order.query.filter_by(
             id=order_id,
             user_id=current_user.id
-        ).first_or_404()
+        ).first()
+        
+        if not order:
+            order = archive_service.get_order(order_id, current_user.id)
+        if not order:
+            return jsonify({'error': 'Order not found'}), 404
         
         return jsonify({'order': order.to_dict()}), 200
         
@@ -87,6 +111,8 @@ def create_order(current_user):
         
         # Calculate order totals
         subtotal = 0
+        weight = 0
+        lines = []
         order_items_data = []
         
         for cart_item in cart_items:
@@ -103,27 +129,38 @@ def create_order(current_user):
             unit_price = float(base_price) * exchange_rate
             total_price = unit_price * cart_item.quantity
             subtotal += total_price
+            lines.append(checkout_service.cart_line(variant, cart_item.quantity))
+            weight += lines[-1].weight * cart_item.quantity
             
             order_items_data.append({
+                'product_id': variant.product_id,
                 'product_variant_id': variant.id,
                 'quantity': cart_item.quantity,
                 'unit_price': unit_price,
                 'total_price': total_price
             })
         
-        # Calculate shipping and tax (simplified)
-        shipping_cost = data.get('shipping_cost', 5.0)  # Default shipping
-        tax_rate = 0.075  # 7.5% tax rate
-        tax_amount = subtotal * tax_rate
-        total_amount = subtotal + shipping_cost + tax_amount
+        # Promotions, then shipping by parcel weight and tax by destination zone, same as /api/checkout/quote
+        try:
+            pricing = promotion_service.price(
+                lines, user_currency, current_user.nationality, exchange_rate, data.get('coupon_code')
+            )
+        except PromotionError as e:
+            return jsonify({'error': str(e)}), 400
+        quote = checkout_service.quote(
+            shipping_address, subtotal, weight, user_currency, exchange_rate,
+            pricing['discount_total'], pricing['free_shipping']
+        )
         
         # Create order
         order = Order(
             user_id=current_user.id,
-            subtotal=subtotal,
-            shipping_cost=shipping_cost,
-            tax_amount=tax_amount,
-            total_amount=total_amount,
+            subtotal=quote['subtotal'],
+            discount_amount=quote['discount_amount'],
+            coupon_code=pricing['coupon_code'],
+            shipping_cost=quote['shipping_cost'],
+            tax_amount=quote['tax_amount'],
+            total_amount=quote['total_amount'],
             currency=user_currency,
             shipping_address_id=data['shipping_address_id'],
             billing_address_id=data['billing_address_id']
@@ -156,9 +193,17 @@ def create_order(current_user):
         )
         db.session.add(status_history)
         
+        # Count co-purchases for "frequently bought together"
+        recommendation_service.record_order(db.session, [item['product_id'] for item in order_items_data])
+        
         # Clear cart
         CartItem.query.filter_by(user_id=current_user.id).delete()
         
+        # Counted in this transaction, so two checkouts can't both take a coupon's last use
+        if pricing['coupon_code'] and not promotion_service.redeem(db.session, pricing['coupon_code']):
+            db.session.rollback()
+            return jsonify({'error': f"Coupon code {pricing['coupon_code']} has been fully redeemed"}), 409
+        
         db.session.commit()
         
         return jsonify({
@@ -192,6 +237,11 @@ def cancel_order(current_user, order_id):
             variant = item.product_variant
             variant.inventory_quantity += item.quantity
         
+        recommendation_service.release_order(db.session, [item.product_variant.product_id for item in order.items])
+        
+        if order.coupon_code:
+            promotion_service.release(db.session, order.coupon_code)
+        
         # Add status history
         status_history = OrderStatusHistory(
             order_id=order.id,
@@ -219,11 +269,17 @@ def get_order_status(current_user, order_id):
         order = Order.query.filter_by(
             id=order_id,
             user_id=current_user.id
-        ).first_or_404()
+        ).first()
         
-        status_history = OrderStatusHistory.query.filter_by(
-            order_id=order_id
-        ).order_by(OrderStatusHistory.timestamp.desc()).all()
+        if order:
+            status_history = OrderStatusHistory.query.filter_by(
+                order_id=order_id
+            ).order_by(OrderStatusHistory.timestamp.desc()).all()
+        else:
+            order = archive_service.get_order(order_id, current_user.id)
+            if not order:
+                return jsonify({'error': 'Order not found'}), 404
+            status_history = archive_service.status_history(order_id)
         
         return jsonify({
             'order_id': order_id,
@@ -346,7 +402,7 @@ def delete_address(current_user, address_id):
             (Order.billing_address_id == address_id)
         ).first()
         
-        if orders_with_address:
+        if orders_with_address or archive_service.address_in_use(address_id):
             return jsonify({'error': 'Cannot delete address used in existing orders'}), 400
         
         db.session.delete(address)
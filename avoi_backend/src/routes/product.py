@@ -1,10 +1,19 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
-from src.models.product import Product, Category, ProductVariant, ProductImage
+from src.models.product import Product, Category, CategoryClosure, ProductVariant, ProductImage
 from src.models.review import Review
 from src.routes.auth import token_required
 from src.services.currency_service import currency_service
-from sqlalchemy import or_
+from src.services.catalog_cache import catalog_cache
+from src.services.compression_service import compression_service
+from src.services.image_service import image_service
+from src.services.recommendation_service import recommendation_service
+from src.services.ingredient_service import ingredient_index, parse_terms
+from src.services.suggest_service import MAX_SUGGESTIONS, suggest_service
+from src.services.search_service import search_index
+from sqlalchemy import and_, case, cast, func, or_, select
+from sqlalchemy.orm import aliased
+import math
 
 product_bp = Blueprint('product', __name__)
 
@@ -18,53 +27,211 @@ def get_exchange_rate(currency):
     """Get exchange rate for currency conversion"""
     return currency_service.get_exchange_rate(currency)
 
+def category_descendant_ids(category_id):
+    """Subquery of the category and all of its subcategories reachable through active categories"""
+    path = aliased(CategoryClosure)
+    within = aliased(CategoryClosure)
+    # An inactive category between category_id and a descendant (either end included) hides it
+    hidden = select(path.ancestor_id).join(
+        within, and_(within.descendant_id == path.ancestor_id, within.ancestor_id == category_id)
+    ).join(
+        Category, Category.id == path.ancestor_id
+    ).where(path.descendant_id == CategoryClosure.descendant_id, Category.is_active == False)
+    return select(CategoryClosure.descendant_id).where(
+        CategoryClosure.ancestor_id == category_id, ~hidden.exists()
+    )
+
+def get_category_breadcrumbs(category_id):
+    """Path from the root category down to this one"""
+    ancestors = Category.query.join(
+        CategoryClosure, CategoryClosure.ancestor_id == Category.id
+    ).filter(CategoryClosure.descendant_id == category_id).order_by(CategoryClosure.depth.desc()).all()
+    return [{'id': category.id, 'name': category.name, 'slug': category.slug} for category in ancestors]
+
+def ranked_products(ranking, score_field, limit, currency, exchange_rate):
+    """Serialize active products from (product_id, score) pairs, keeping their order"""
+    products = {
+        product.id: product for product in Product.query.filter(
+            Product.id.in_([product_id for product_id, _ in ranking]),
+            Product.is_active == True
+        )
+    }
+    results = []
+    for product_id, score in ranking:
+        if product_id in products:
+            product_data = image_service.add_srcsets(products[product_id].to_dict(currency, exchange_rate))
+            product_data[score_field] = score
+            results.append(product_data)
+            if len(results) == limit:
+                break
+    return results
+
+# Upper bounds of the price facet buckets in USD, rounded to friendly amounts per currency
+PRICE_BUCKET_EDGES_USD = (10, 25, 50, 100, 200)
+
+def exact_search_condition(search):
+    return or_(
+        Product.name.contains(search),
+        Product.description.contains(search),
+        Product.brand.contains(search)
+    )
+
+def search_relevance(search, fuzzy_ids):
+    """ORDER BY terms: substring hits first, then by trigram similarity rank"""
+    terms = [case((exact_search_condition(search), 0), else_=1)]
+    if fuzzy_ids:
+        terms.append(case({product_id: rank for rank, product_id in enumerate(fuzzy_ids)}, value=Product.id, else_=len(fuzzy_ids)))
+    return terms
+
+def build_product_query(args, exchange_rate, fuzzy_ids=()):
+    """Active products matching the listing filters in args, unsorted.
+
+    fuzzy_ids (from search_index.search) are typo-tolerant matches for the
+    search term, returned alongside the substring matches.
+    """
+    category_id = args.get('category_id', type=int)
+    search = args.get('search', '')
+    brand = args.get('brand')
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+    min_rating = args.get('min_rating', type=int)
+    
+    query = Product.query.filter_by(is_active=True)
+    
+    if category_id:
+        query = query.filter(Product.category_id.in_(category_descendant_ids(category_id)))
+    
+    if search:
+        condition = exact_search_condition(search)
+        if fuzzy_ids:
+            condition = or_(condition, Product.id.in_(fuzzy_ids))
+        query = query.filter(condition)
+    
+    if brand:
+        query = query.filter(Product.brand == brand)
+    
+    if min_price or max_price:
+        # Keep products with at least one variant priced in range (converted to USD).
+        # Products without variants sell at base_price, so min_price == max_price then.
+        min_price_usd = min_price / exchange_rate if min_price else 0
+        max_price_usd = max_price / exchange_rate if max_price else None
+        variant_price = ProductVariant.price >= min_price_usd
+        product_price = Product.min_price >= min_price_usd
+        if max_price_usd is not None:
+            variant_price = ProductVariant.price.between(min_price_usd, max_price_usd)
+            product_price = Product.min_price.between(min_price_usd, max_price_usd)
+        variant_in_range = select(ProductVariant.id).where(ProductVariant.product_id == Product.id, variant_price).exists()
+        query = query.filter(or_(variant_in_range, and_(Product.min_price == Product.max_price, product_price)))
+    
+    if min_rating:
+        query = query.filter(Product.average_rating >= min_rating)
+    
+    return query
+
+def round_price_edge(value):
+    """Nearest 1, 2, 2.5 or 5 times a power of ten"""
+    if value <= 0:
+        return value
+    magnitude = 10 ** math.floor(math.log10(value))
+    edge = min((step * magnitude for step in (1, 2, 2.5, 5, 10)), key=lambda edge: abs(edge - value))
+    return int(edge) if edge == int(edge) else edge
+
+def get_product_facets(query, exchange_rate):
+    """Category, brand, price and rating counts for the filtered products in one grouped query"""
+    edges = sorted({round_price_edge(edge * exchange_rate) for edge in PRICE_BUCKET_EDGES_USD})
+    price_bucket = case(
+        *[(Product.min_price * exchange_rate < edge, index) for index, edge in enumerate(edges)],
+        else_=len(edges)
+    )
+    rating_band = case(
+        (Product.average_rating == None, 0),
+        else_=cast(Product.average_rating, db.Integer)
+    )
+    
+    # One row per distinct combination; each facet is a marginal sum over the others
+    rows = query.order_by(None).with_entities(
+        Product.category_id, Product.brand, price_bucket, rating_band, func.count(Product.id)
+    ).group_by(Product.category_id, Product.brand, price_bucket, rating_band).all()
+    
+    category_counts, brand_counts, bucket_counts, band_counts = {}, {}, {}, {}
+    for category_id, brand, bucket, band, count in rows:
+        category_counts[category_id] = category_counts.get(category_id, 0) + count
+        if brand:
+            brand_counts[brand] = brand_counts.get(brand, 0) + count
+        bucket_counts[bucket] = bucket_counts.get(bucket, 0) + count
+        band_counts[band] = band_counts.get(band, 0) + count
+    
+    # Roll counts up so a parent category includes its subcategories
+    categories = {category.id: category for category in Category.query.filter_by(is_active=True).all()}
+    rolled_up = {}
+    for category_id, count in category_counts.items():
+        seen = set()
+        while category_id in categories and category_id not in seen:
+            seen.add(category_id)
+            rolled_up[category_id] = rolled_up.get(category_id, 0) + count
+            category_id = categories[category_id].parent_category_id
+    
+    bounds = [0] + edges + [None]
+    return {
+        'categories': sorted([
+            {
+                'id': category_id,
+                'name': categories[category_id].name,
+                'slug': categories[category_id].slug,
+                'parent_category_id': categories[category_id].parent_category_id,
+                'count': count
+            } for category_id, count in rolled_up.items()
+        ], key=lambda item: (-item['count'], item['name'])),
+        'brands': sorted([
+            {'brand': brand, 'count': count} for brand, count in brand_counts.items()
+        ], key=lambda item: (-item['count'], item['brand'])),
+        'price_ranges': [
+            {'min': bounds[index], 'max': bounds[index + 1], 'count': bucket_counts.get(index, 0)}
+            for index in range(len(bounds) - 1)
+        ],
+        'ratings': [
+            {'min_rating': band, 'count': sum(count for key, count in band_counts.items() if key >= band)}
+            for band in (4, 3, 2, 1)
+        ]
+    }
+
 @product_bp.route('/products', methods=['GET'])
 def get_products():
     try:
+        # Get user currency from header or default to USD
+        user_currency = request.headers.get('X-Currency', 'USD')
+        
+        if request.args.get('search'):
+            suggest_service.record_query(request.args['search'])
+        
+        cache_key = ('products', user_currency, request.query_string)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
-        category_id = request.args.get('category_id', type=int)
         search = request.args.get('search', '')
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        sort_by = request.args.get('sort_by', 'name')
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'name')
+        include_facets = request.args.get('facets', 'false').lower() in ('1', 'true')
         
-        # Get user currency from header or default to USD
-        user_currency = request.headers.get('X-Currency', 'USD')
         exchange_rate = get_exchange_rate(user_currency)
         
-        # Build query
-        query = Product.query.filter_by(is_active=True)
-        
-        # Apply filters
-        if category_id:
-            query = query.filter_by(category_id=category_id)
+        # Misspelled words ("retinal serum") still find products through the trigram index
+        fuzzy_ids, corrections = search_index.search(search) if search else ([], {})
         
-        if search:
-            query = query.filter(
-                or_(
-                    Product.name.contains(search),
-                    Product.description.contains(search),
-                    Product.brand.contains(search)
-                )
-            )
-        
-        if min_price:
-            # Convert min_price from user currency to USD for database query
-            min_price_usd = min_price / exchange_rate
-            query = query.filter(Product.base_price >= min_price_usd)
-        
-        if max_price:
-            # Convert max_price from user currency to USD for database query
-            max_price_usd = max_price / exchange_rate
-            query = query.filter(Product.base_price <= max_price_usd)
+        # Build query
+        query = build_product_query(request.args, exchange_rate, fuzzy_ids)
+        filtered_query = query
         
         # Apply sorting
-        if sort_by == 'price_asc':
-            query = query.order_by(Product.base_price.asc())
+        if sort_by == 'relevance' and search:
+            query = query.order_by(*search_relevance(search, fuzzy_ids), Product.name.asc())
+        elif sort_by == 'price_asc':
+            query = query.order_by(Product.min_price.asc())
         elif sort_by == 'price_desc':
-            query = query.order_by(Product.base_price.desc())
+            query = query.order_by(Product.max_price.desc())
         elif sort_by == 'date_desc':
             query = query.order_by(Product.date_created.desc())
         else:
@@ -75,8 +242,8 @@ def get_products():
             page=page, per_page=per_page, error_out=False
         )
         
-        return jsonify({
-            'products': [product.to_dict(user_currency, exchange_rate) for product in products.items],
+        payload = {
+            'products': [image_service.add_srcsets(product.to_dict(user_currency, exchange_rate)) for product in products.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -86,7 +253,15 @@ def get_products():
                 'has_prev': products.has_prev
             },
             'currency': user_currency
-        }), 200
+        }
+        
+        if corrections:
+            payload['corrections'] = corrections
+        
+        if include_facets:
+            payload['facets'] = get_product_facets(filtered_query, exchange_rate)
+        
+        return compression_service.respond(catalog_cache.set(cache_key, payload))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -94,13 +269,19 @@ def get_products():
 @product_bp.route('/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     try:
+        # Get user currency
+        user_currency = request.headers.get('X-Currency', 'USD')
+        
+        cache_key = ('product', user_currency, product_id)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
         product = Product.query.get_or_404(product_id)
         
         if not product.is_active:
             return jsonify({'error': 'Product not found'}), 404
         
-        # Get user currency
-        user_currency = request.headers.get('X-Currency', 'USD')
         exchange_rate = get_exchange_rate(user_currency)
         
         # Get product reviews
@@ -109,13 +290,135 @@ def get_product(product_id):
             is_approved=True
         ).order_by(Review.date_created.desc()).limit(10).all()
         
-        product_data = product.to_dict(user_currency, exchange_rate)
+        product_data = image_service.add_srcsets(product.to_dict(user_currency, exchange_rate))
         product_data['reviews'] = [review.to_dict() for review in reviews]
         
-        return jsonify({
+        payload = {
             'product': product_data,
             'currency': user_currency
-        }), 200
+        }
+        
+        return compression_service.respond(catalog_cache.set(cache_key, payload))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@product_bp.route('/products/suggest', methods=['GET'])
+def suggest_products():
+    """Search-as-you-type: ?q=vit -> products, brands, categories and popular searches"""
+    try:
+        limit = max(1, min(request.args.get('limit', MAX_SUGGESTIONS, type=int), MAX_SUGGESTIONS))
+        query = request.args.get('q', '')
+        
+        response = jsonify({'query': query, 'suggestions': suggest_service.suggest(query, limit)})
+        # Short enough that new products show up quickly, long enough to absorb repeated keystrokes
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@product_bp.route('/products/<int:product_id>/recommendations', methods=['GET'])
+def get_product_recommendations(product_id):
+    """Products most often bought together with this one"""
+    try:
+        user_currency = request.headers.get('X-Currency', 'USD')
+        limit = max(1, min(request.args.get('limit', 10, type=int), recommendation_service.top_k))
+        
+        cache_key = ('recommendations', recommendation_service.version, user_currency, product_id, limit)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
+        exchange_rate = get_exchange_rate(user_currency)
+        neighbors = recommendation_service.recommendations(product_id)
+        
+        payload = {
+            'product_id': product_id,
+            'recommendations': ranked_products(neighbors, 'bought_together_count', limit, user_currency, exchange_rate),
+            'currency': user_currency
+        }
+        
+        return compression_service.respond(catalog_cache.set(cache_key, payload))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@product_bp.route('/products/<int:product_id>/similar', methods=['GET'])
+def get_similar_products(product_id):
+    """Products with the most similar ingredient lists, e.g. ?exclude=no fragrance, no alcohol"""
+    try:
+        if not ingredient_index.available:
+            return jsonify({'error': 'Ingredient search is not available'}), 503
+        
+        user_currency = request.headers.get('X-Currency', 'USD')
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        exclude = parse_terms(request.args.get('exclude', ''))
+        
+        cache_key = ('similar', user_currency, product_id, limit, exclude)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
+        exchange_rate = get_exchange_rate(user_currency)
+        # Over-fetch so inactive or deleted products can be dropped without a short page
+        similar = ingredient_index.similar(product_id, limit * 2, exclude)
+        ingredients = set(ingredient_index.ingredients(product_id))
+        
+        products = ranked_products(similar, 'similarity', limit, user_currency, exchange_rate)
+        for product_data in products:
+            product_data['similarity'] = round(product_data['similarity'], 4)
+            product_data['shared_ingredients'] = [
+                name for name in ingredient_index.ingredients(product_data['id']) if name in ingredients
+            ]
+        
+        payload = {
+            'product_id': product_id,
+            'excluded': list(exclude),
+            'products': products,
+            'currency': user_currency
+        }
+        
+        return compression_service.respond(catalog_cache.set(cache_key, payload))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@product_bp.route('/products/ingredient-search', methods=['GET'])
+def search_by_ingredients():
+    """?include=niacinamide, ceramides&exclude=no fragrance, no alcohol"""
+    try:
+        if not ingredient_index.available:
+            return jsonify({'error': 'Ingredient search is not available'}), 503
+        
+        user_currency = request.headers.get('X-Currency', 'USD')
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        include = parse_terms(request.args.get('include', ''))
+        exclude = parse_terms(request.args.get('exclude', ''))
+        if not include and not exclude:
+            return jsonify({'error': 'include or exclude is required'}), 400
+        
+        cache_key = ('ingredient-search', user_currency, limit, include, exclude)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
+        exchange_rate = get_exchange_rate(user_currency)
+        matches, total = ingredient_index.search(include, exclude, limit * 2)
+        
+        products = ranked_products(matches, 'relevance', limit, user_currency, exchange_rate)
+        for product_data in products:
+            product_data['relevance'] = round(product_data['relevance'], 4)
+        
+        payload = {
+            'included': list(include),
+            'excluded': list(exclude),
+            'products': products,
+            'total': total,
+            'currency': user_currency
+        }
+        
+        return compression_service.respond(catalog_cache.set(cache_key, payload))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -123,6 +426,11 @@ def get_product(product_id):
 @product_bp.route('/products/categories', methods=['GET'])
 def get_categories():
     try:
+        cache_key = ('categories',)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
         categories = Category.query.filter_by(is_active=True).all()
         
         # Build hierarchical structure
@@ -141,7 +449,8 @@ def get_categories():
             else:
                 root_categories.append(category_dict[category.id])
         
-        return jsonify({'categories': root_categories}), 200
+        payload = {'categories': root_categories}
+        return compression_service.respond(catalog_cache.set(cache_key, payload, vary=()))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -149,27 +458,38 @@ def get_categories():
 @product_bp.route('/products/categories/<int:category_id>/products', methods=['GET'])
 def get_category_products(category_id):
     try:
+        # Get user currency
+        user_currency = request.headers.get('X-Currency', 'USD')
+        
+        cache_key = ('category_products', user_currency, category_id, request.query_string)
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return compression_service.respond(cached)
+        
         category = Category.query.get_or_404(category_id)
         
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        include_subcategories = request.args.get('include_subcategories', 'true').lower() == 'true'
         
-        # Get user currency
-        user_currency = request.headers.get('X-Currency', 'USD')
         exchange_rate = get_exchange_rate(user_currency)
         
-        # Get products in this category
-        products = Product.query.filter_by(
-            category_id=category_id, 
-            is_active=True
-        ).paginate(
+        # Get products in this category and, by default, all of its subcategories
+        query = Product.query.filter_by(is_active=True)
+        if include_subcategories:
+            query = query.filter(Product.category_id.in_(category_descendant_ids(category_id)))
+        else:
+            query = query.filter_by(category_id=category_id)
+        
+        products = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        return jsonify({
+        payload = {
             'category': category.to_dict(),
-            'products': [product.to_dict(user_currency, exchange_rate) for product in products.items],
+            'breadcrumbs': get_category_breadcrumbs(category_id),
+            'products': [image_service.add_srcsets(product.to_dict(user_currency, exchange_rate)) for product in products.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -179,7 +499,9 @@ def get_category_products(category_id):
                 'has_prev': products.has_prev
             },
             'currency': user_currency
-        }), 200
+        }
+        
+        return compression_service.respond(catalog_cache.set(cache_key, payload))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -8,12 +8,17 @@ from src.models.order import Address
 from src.services.currency_service import currency_service
 from datetime import datetime
 
-def seed_database(app):
+def seed_database(app, reset=False):
+    """Load demo data; returns False if the catalog is already populated"""
     with app.app_context():
-        # Clear existing data
-        db.drop_all()
+        if reset:
+            # Clear existing data
+            db.drop_all()
         db.create_all()
         
+        if db.session.query(Category.id).first() is not None:
+            return False
+        
         # Create categories
         categories = [
             {
@@ -201,8 +206,9 @@ def seed_database(app):
         print(f"Created {len(categories)} categories")
         print(f"Created {len(products)} products")
         print("Created test user: test@avoi.com (password: password123)")
+        return True
 
 if __name__ == '__main__':
-    from main import app
-    seed_database(app)
+    from src.main import create_app
+    seed_database(create_app(), reset='--reset' in sys.argv)
 
@@ -0,0 +1,154 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from src.models.user import db
+from src.models.order import Order
+from src.models.product import InventoryMovement
+from src.models.archive import (
+    ARCHIVE_BIND, ARCHIVED_ORDER_MODELS, ArchivedInventoryMovement, ArchivedOrder, ArchivedOrderStatusHistory
+)
+
+# Orders in these states never change again, so they can leave the hot tables
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+
+
+def archive_database_url(database_url):
+    """Default archive location: app.db -> app-archive.db next to a file-based SQLite database"""
+    if database_url.startswith('sqlite:///') and ':memory:' not in database_url:
+        root, extension = os.path.splitext(database_url)
+        return f'{root}-archive{extension or ".db"}'
+    if database_url.startswith('sqlite:'):
+        return 'sqlite://'
+    # Archive tables reuse the hot table names, so they can't share a server database
+    return f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'archive.db')}"
+
+
+def _order_key(table):
+    return table.c.id if table.name == Order.__table__.name else table.c.order_id
+
+
+class ArchiveService:
+    """Moves finished orders and old inventory movements into a separate archive database.
+
+    Each batch is copied into the archive and committed before the hot rows are
+    deleted, and the copy replaces any rows a crashed run left behind, so a run
+    can stop anywhere and simply be started again. Until the delete commits, an
+    order exists in both databases; readers prefer the hot copy.
+    """
+
+    def __init__(self):
+        self.after_days = 180
+        self.batch_size = 500
+
+    def init_app(self, app):
+        # Must run before db.init_app, which reads the binds
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(
+            ARCHIVE_BIND,
+            app.config.get('ARCHIVE_DATABASE_URL') or archive_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        )
+        app.config['SQLALCHEMY_BINDS'] = binds
+        self.after_days = app.config.get('ARCHIVE_AFTER_DAYS', self.after_days)
+        self.batch_size = app.config.get('ARCHIVE_BATCH_SIZE', self.batch_size)
+
+    def archive(self, days=None, batch_size=None, check=None):
+        """Archive everything past the cutoff; check() is called between batches"""
+        cutoff = datetime.utcnow() - timedelta(days=self.after_days if days is None else days)
+        batch_size = batch_size or self.batch_size
+        moved = {'orders': 0, 'inventory_movements': 0}
+        for name, step in (('orders', self.archive_orders), ('inventory_movements', self.archive_movements)):
+            while True:
+                if check:
+                    check()
+                count = step(cutoff, batch_size)
+                if not count:
+                    break
+                moved[name] += count
+        return moved
+
+    def archive_orders(self, cutoff, batch_size):
+        """Move one batch of finished orders with their items, history and payments"""
+        with db.engine.connect() as connection:
+            ids = connection.scalars(
+                select(Order.id)
+                .where(Order.order_status.in_(ARCHIVABLE_STATUSES), Order.date_modified < cutoff)
+                .order_by(Order.id).limit(batch_size)
+            ).all()
+        if ids:
+            self._move(ARCHIVED_ORDER_MODELS, ids, _order_key)
+        return len(ids)
+
+    def archive_movements(self, cutoff, batch_size):
+        with db.engine.connect() as connection:
+            ids = connection.scalars(
+                select(InventoryMovement.id)
+                .where(InventoryMovement.timestamp < cutoff)
+                .order_by(InventoryMovement.id).limit(batch_size)
+            ).all()
+        if ids:
+            self._move(((InventoryMovement, ArchivedInventoryMovement),), ids, lambda table: table.c.id)
+        return len(ids)
+
+    def _move(self, model_pairs, ids, key):
+        with db.engine.connect() as connection:
+            rows = [
+                [dict(row) for row in connection.execute(
+                    select(hot.__table__).where(key(hot.__table__).in_(ids))
+                ).mappings()]
+                for hot, _ in model_pairs
+            ]
+
+        with db.engines[ARCHIVE_BIND].begin() as connection:
+            for (_, archived), batch in zip(model_pairs, rows):
+                connection.execute(delete(archived.__table__).where(key(archived.__table__).in_(ids)))
+                if batch:
+                    connection.execute(insert(archived.__table__), batch)
+
+        with db.engine.begin() as connection:
+            for hot, _ in model_pairs:
+                connection.execute(delete(hot.__table__).where(key(hot.__table__).in_(ids)))
+
+    def get_order(self, order_id, user_id):
+        return db.session.scalar(
+            select(ArchivedOrder).where(ArchivedOrder.id == order_id, ArchivedOrder.user_id == user_id)
+        )
+
+    def _user_orders(self, user_id, status):
+        query = select(ArchivedOrder).where(ArchivedOrder.user_id == user_id)
+        if status:
+            query = query.where(ArchivedOrder.order_status == status)
+        return query
+
+    def user_orders(self, user_id, status=None, limit=None):
+        """A user's archived orders, newest first"""
+        if status and status not in ARCHIVABLE_STATUSES:
+            return []
+        query = self._user_orders(user_id, status).order_by(ArchivedOrder.date_created.desc(), ArchivedOrder.id.desc())
+        return db.session.scalars(query.limit(limit)).all()
+
+    def count_user_orders(self, user_id, status=None):
+        if status and status not in ARCHIVABLE_STATUSES:
+            return 0
+        return db.session.scalar(self._user_orders(user_id, status).with_only_columns(func.count(ArchivedOrder.id)))
+
+    def status_history(self, order_id):
+        return db.session.scalars(
+            select(ArchivedOrderStatusHistory)
+            .where(ArchivedOrderStatusHistory.order_id == order_id)
+            .order_by(ArchivedOrderStatusHistory.timestamp.desc())
+        ).all()
+
+    def address_in_use(self, address_id):
+        return db.session.scalar(
+            select(ArchivedOrder.id).where(
+                (ArchivedOrder.shipping_address_id == address_id) | (ArchivedOrder.billing_address_id == address_id)
+            ).limit(1)
+        ) is not None
+
+    def users_with_orders(self, user_ids):
+        return set(db.session.scalars(
+            select(ArchivedOrder.user_id).where(ArchivedOrder.user_id.in_(user_ids)).distinct()
+        ))
+
+# Global archive service instance
+archive_service = ArchiveService()
@@ -0,0 +1,113 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.product import Category, Product, ProductImage, ProductVariant, Inventory
+from src.models.review import Review
+from src.services.shared_state import shared_counters
+
+# Writes to any of these change what the catalog endpoints return
+CATALOG_MODELS = (Category, Product, ProductImage, ProductVariant, Inventory, Review)
+# Rows the search, suggest and ingredient indexes are built from; they follow products_version
+PRODUCT_TEXT_MODELS = (Category, Product)
+
+
+class CachedResponse:
+    def __init__(self, body, status, version, vary):
+        self.body = body
+        self.status = status
+        self.version = version
+        self.vary = vary
+        self.created_at = time.monotonic()
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # Encoded bodies keyed by content-encoding, filled on first use
+        self.variants = {}
+
+
+class CatalogCache:
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        # Bounds staleness for workers that don't share the version segment (no preload)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('CATALOG_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('CATALOG_CACHE_TTL', self.ttl)
+
+    @property
+    def version(self):
+        # Lives in shared memory so a write in one worker invalidates every worker
+        return shared_counters.get('catalog_version')
+
+    def bump_version(self):
+        """Invalidate every cached catalog response"""
+        with self._lock:
+            shared_counters.inc('catalog_version')
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != self.version or time.monotonic() - entry.created_at > self.ttl):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                shared_counters.inc('catalog_cache_misses')
+                return None
+            self._entries.move_to_end(key)
+        shared_counters.inc('catalog_cache_hits')
+        return entry
+
+    def set(self, key, payload, status=200, vary=('X-Currency',)):
+        """Serialize a payload once and keep it for later hits"""
+        body = current_app.json.dumps(payload).encode('utf-8')
+        with self._lock:
+            entry = CachedResponse(body, status, self.version, vary)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Global catalog cache instance
+catalog_cache = CatalogCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_catalog_writes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, CATALOG_MODELS):
+            session.info['catalog_dirty'] = True
+            # Stock and review writes leave product text alone, so the text indexes keep their snapshot
+            if isinstance(instance, PRODUCT_TEXT_MODELS):
+                session.info['products_dirty'] = True
+            # The category tree is all compiled promotion plans depend on besides promotions
+            if isinstance(instance, Category):
+                session.info['categories_dirty'] = True
+                return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('catalog_dirty', False):
+        catalog_cache.bump_version()
+    if session.info.pop('products_dirty', False):
+        shared_counters.inc('products_version')
+    if session.info.pop('categories_dirty', False):
+        shared_counters.inc('categories_version')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('catalog_dirty', None)
+    session.info.pop('products_dirty', None)
+    session.info.pop('categories_dirty', None)
@@ -0,0 +1,170 @@
+import bisect
+import json
+from collections import namedtuple
+from functools import lru_cache
+from sqlalchemy import select
+from src.models.user import db
+from src.models.order import CartItem
+from src.models.product import Product, ProductVariant
+
+ZONE_CACHE_SIZE = 4096
+
+# One cart row priced in USD; shared by quotes, promotions and order creation
+CartLine = namedtuple('CartLine', 'product_variant_id product_id category_id quantity unit_price weight')
+
+
+def normalize_region(value):
+    """'Lagos State' -> 'lagos', ' CA ' -> 'ca'"""
+    value = ' '.join((value or '').lower().split())
+    return value[:-len(' state')] if value.endswith(' state') else value
+
+
+class ShippingZone:
+    """Tax rate and weight-based shipping for one zone of the rate table"""
+
+    def __init__(self, config):
+        self.name = config['name']
+        tax = config.get('tax', {})
+        self.tax_name = tax.get('name', 'Tax')
+        self.tax_rate = float(tax.get('rate', 0))
+        self.tax_applies_to_shipping = bool(tax.get('applies_to_shipping', False))
+        shipping = config.get('shipping', {})
+        # [[max kg, price], ...] sorted by weight; beyond the last tier, per_kg_over per extra kg
+        tiers = sorted(shipping.get('tiers', [[0, 0]]))
+        self.tier_weights = [float(weight) for weight, _ in tiers]
+        self.tier_prices = [float(price) for _, price in tiers]
+        self.per_kg_over = float(shipping.get('per_kg_over', 0))
+        self.free_over = shipping.get('free_over')
+
+    def shipping_cost(self, weight, subtotal):
+        """Cost in table currency for a parcel of `weight` kg and goods worth `subtotal`"""
+        if self.free_over is not None and subtotal >= self.free_over:
+            return 0.0
+        tier = bisect.bisect_left(self.tier_weights, weight)
+        if tier < len(self.tier_weights):
+            return self.tier_prices[tier]
+        return self.tier_prices[-1] + (weight - self.tier_weights[-1]) * self.per_kg_over
+
+
+class CheckoutService:
+    """Shipping and tax quotes from a rate table loaded from SHIPPING_RATES_FILE.
+
+    An address resolves to the most specific zone listing its country:
+    postal code prefix, then state, then the country alone, else the default
+    zone. Resolutions are memoized per normalized (country, state, postal
+    code), so quoting a cart costs one cart query and a cache hit.
+    """
+
+    def __init__(self):
+        self.currency = 'USD'
+        self.default_item_weight = 0.25
+        self.default_zone = ShippingZone({'name': 'default'})
+        self._country_codes = {}
+        self._postal_zones = {}
+        self._state_zones = {}
+        self._country_zones = {}
+        self._resolve = lru_cache(maxsize=ZONE_CACHE_SIZE)(self._resolve_zone)
+
+    def init_app(self, app):
+        path = app.config.get('SHIPPING_RATES_FILE')
+        if path:
+            with open(path) as f:
+                self.load(json.load(f))
+
+    def load(self, table):
+        """Replace the rate table; zones listed first win ties"""
+        self.currency = table.get('currency', 'USD')
+        self.default_item_weight = float(table.get('default_item_weight_kg', self.default_item_weight))
+        self._country_codes = {normalize_region(name): code.upper() for name, code in table.get('country_codes', {}).items()}
+        self._postal_zones, self._state_zones, self._country_zones = {}, {}, {}
+        for config in table.get('zones', []):
+            zone = ShippingZone(config)
+            for country in config['countries']:
+                country = country.upper()
+                if config.get('postal_prefixes'):
+                    for prefix in config['postal_prefixes']:
+                        self._postal_zones.setdefault((country, prefix.upper().replace(' ', '')), zone)
+                elif config.get('states'):
+                    for state in config['states']:
+                        self._state_zones.setdefault((country, normalize_region(state)), zone)
+                else:
+                    self._country_zones.setdefault(country, zone)
+        self.default_zone = ShippingZone(table.get('default', {'name': 'default'}))
+        self._resolve = lru_cache(maxsize=ZONE_CACHE_SIZE)(self._resolve_zone)
+
+    def country_code(self, country):
+        country = normalize_region(country)
+        return self._country_codes.get(country, country.upper())
+
+    def resolve_zone(self, country, state=None, postal_code=None):
+        return self._resolve(
+            self.country_code(country), normalize_region(state), (postal_code or '').upper().replace(' ', '')
+        )
+
+    def _resolve_zone(self, country, state, postal_code):
+        for length in range(len(postal_code), 0, -1):
+            zone = self._postal_zones.get((country, postal_code[:length]))
+            if zone is not None:
+                return zone
+        return self._state_zones.get((country, state)) or self._country_zones.get(country) or self.default_zone
+
+    def zone_cache_info(self):
+        return self._resolve.cache_info()
+
+    def cart_lines(self, user_id):
+        """A user's cart as CartLines, in one query"""
+        rows = db.session.execute(
+            select(
+                CartItem.product_variant_id, Product.id, Product.category_id, CartItem.quantity,
+                Product.base_price, ProductVariant.price_adjustment, ProductVariant.weight, Product.weight
+            )
+            .join(ProductVariant, ProductVariant.id == CartItem.product_variant_id)
+            .join(Product, Product.id == ProductVariant.product_id)
+            .where(CartItem.user_id == user_id)
+            .order_by(CartItem.id)
+        ).all()
+        return [
+            CartLine(variant_id, product_id, category_id, quantity, float(base_price + (price_adjustment or 0)),
+                     float(variant_weight or product_weight or self.default_item_weight))
+            for variant_id, product_id, category_id, quantity, base_price, price_adjustment, variant_weight, product_weight in rows
+        ]
+
+    def cart_line(self, variant, quantity):
+        """CartLine for an already loaded variant"""
+        product = variant.product
+        return CartLine(
+            variant.id, product.id, product.category_id, quantity, float(product.base_price + (variant.price_adjustment or 0)),
+            float(variant.weight or product.weight or self.default_item_weight)
+        )
+
+    def quote(self, address, subtotal, weight, currency='USD', exchange_rate=1.0, discount=0.0, free_shipping=False):
+        """Shipping, tax and total for goods worth `subtotal` (in `currency`) weighing `weight` kg.
+
+        `address` is any object with country, state and postal_code attributes.
+        Rate table amounts are in the table currency (USD) and converted with
+        `exchange_rate`. `discount` and `free_shipping` come from
+        promotion_service.price(); tax is charged on the discounted amount.
+        """
+        zone = self.resolve_zone(address.country, address.state, address.postal_code)
+        goods = subtotal - discount
+        shipping_cost = 0.0 if free_shipping else round(zone.shipping_cost(weight, goods / exchange_rate) * exchange_rate, 2)
+        taxable = goods + (shipping_cost if zone.tax_applies_to_shipping else 0)
+        tax_amount = round(taxable * zone.tax_rate, 2)
+        quote = {
+            'subtotal': round(subtotal, 2),
+            'discount_amount': round(discount, 2),
+            'shipping_cost': shipping_cost,
+            'tax_amount': tax_amount,
+            'total_amount': round(goods + shipping_cost + tax_amount, 2),
+            'currency': currency,
+            'weight_kg': round(weight, 3),
+            'zone': zone.name,
+            'tax_name': zone.tax_name,
+            'tax_rate': zone.tax_rate,
+        }
+        if zone.free_over is not None and shipping_cost:
+            quote['free_shipping_remaining'] = round(zone.free_over * exchange_rate - goods, 2)
+        return quote
+
+# Global checkout service instance
+checkout_service = CheckoutService()
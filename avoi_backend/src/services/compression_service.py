@@ -0,0 +1,108 @@
+import gzip
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'application/javascript',
+)
+
+
+class CompressionService:
+    def __init__(self):
+        self.min_size = 500
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.algorithms = ('br', 'gzip')
+
+    def init_app(self, app):
+        """Read settings from app config and compress eligible responses"""
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESS_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESS_BR_LEVEL', self.brotli_quality)
+        self.algorithms = tuple(
+            algorithm for algorithm in app.config.get('COMPRESS_ALGORITHMS', self.algorithms)
+            if algorithm != 'br' or brotli is not None
+        )
+        app.after_request(self.after_request)
+
+    def negotiate(self, accepted=None):
+        """Pick the preferred encoding the client accepts (default: the current request's), or None"""
+        if accepted is None:
+            accepted = request.accept_encodings
+        for algorithm in self.algorithms:
+            if accepted[algorithm] > 0:
+                return algorithm
+        return None
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def is_compressible(self, response):
+        # 206 bodies are byte ranges of the identity representation; leave them alone
+        if response.direct_passthrough or response.status_code < 200 or response.status_code >= 300 or response.status_code == 206:
+            return False
+        if 'Content-Encoding' in response.headers:
+            return False
+        return response.mimetype in COMPRESSIBLE_MIMETYPES
+
+    def after_request(self, response):
+        """Compress dynamic responses that are large enough to benefit"""
+        if not self.is_compressible(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        response.set_data(self.compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        # A strong validator names one byte stream; the encoded body needs its own,
+        # and byte ranges computed on the identity body no longer apply
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+        response.headers.pop('Accept-Ranges', None)
+        return response.make_conditional(request) if etag else response
+
+    def respond(self, entry):
+        """Build a response from a cached entry, reusing stored encoded bodies"""
+        encoding = None
+        if len(entry.body) >= self.min_size:
+            encoding = self.negotiate()
+
+        if encoding is None:
+            body = entry.body
+            etag = entry.etag
+        else:
+            body = entry.variants.get(encoding)
+            if body is None:
+                body = self.compress(entry.body, encoding)
+                entry.variants[encoding] = body
+            etag = f'{entry.etag}-{encoding}'
+
+        response = Response(body, status=entry.status, mimetype='application/json')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        for header in entry.vary:
+            response.vary.add(header)
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+# Global compression service instance
+compression_service = CompressionService()
@@ -1,6 +1,7 @@
 import requests
 from datetime import datetime, timedelta
 import json
+from src.services.shared_state import shared_counters
 
 class CurrencyService:
     def __init__(self):
@@ -59,26 +60,46 @@ class CurrencyService:
             return True
         return datetime.now() - self.last_updated > self.update_interval
 
+    def rates_url(self):
+        # Using exchangerate-api.com (free tier)
+        return f"https://api.exchangerate-api.com/v4/latest/{self.base_currency}"
+
     def fetch_exchange_rates(self):
         """Fetch current exchange rates from a free API"""
         try:
-            # Using exchangerate-api.com (free tier)
-            url = f"https://api.exchangerate-api.com/v4/latest/{self.base_currency}"
-            response = requests.get(url, timeout=10)
+            response = requests.get(self.rates_url(), timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
-                self.exchange_rates = data.get('rates', {})
-                self.last_updated = datetime.now()
-                return True
+                return self.apply_rates(response.json())
         except Exception as e:
             print(f"Error fetching exchange rates: {e}")
         
-        # Fallback to stored rates if API fails
+        return self.apply_fallback_rates()
+
+    async def fetch_exchange_rates_async(self, client):
+        """Same as fetch_exchange_rates, using a shared httpx.AsyncClient"""
+        try:
+            response = await client.get(self.rates_url(), timeout=10)
+            
+            if response.status_code == 200:
+                return self.apply_rates(response.json())
+        except Exception as e:
+            print(f"Error fetching exchange rates: {e}")
+        
+        return self.apply_fallback_rates()
+
+    def apply_rates(self, data):
+        """Store rates from an exchangerate-api.com response"""
+        self.exchange_rates = data.get('rates', {})
+        self.last_updated = datetime.now()
+        shared_counters.inc('exchange_rate_refreshes')
+        return True
+
+    def apply_fallback_rates(self):
+        """Fallback to stored rates if API fails"""
         if not self.exchange_rates:
             self.exchange_rates = self.fallback_rates.copy()
             self.last_updated = datetime.now()
-        
         return False
 
     def get_exchange_rate(self, target_currency):
@@ -1,6 +1,8 @@
 import smtplib
 import secrets
 import hashlib
+import queue
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
@@ -163,6 +165,52 @@ class EmailService:
 email_service = EmailService()
 
 
+class EmailOutbox:
+    """Sends queued emails from a background thread so requests don't wait on SMTP"""
+
+    def __init__(self, max_pending=1000):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, send, *args, **kwargs):
+        """Queue send(*args, **kwargs); False when the outbox is full"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((send, args, kwargs))
+            return True
+        except queue.Full:
+            print(f"Email outbox full, dropped {getattr(send, '__name__', send)}")
+            return False
+
+    def _ensure_worker(self):
+        # Threads don't survive a fork, so each worker process starts its own
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='avoi-email', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            send, args, kwargs = self._queue.get()
+            try:
+                if send(*args, **kwargs) is False:
+                    print(f"Queued email via {send.__name__} was not sent")
+            except Exception as e:
+                print(f"Queued email via {send.__name__} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until every queued email has been handled"""
+        self._queue.join()
+
+# Global email outbox instance
+email_outbox = EmailOutbox()
+
+
 
 def send_email(to_email, subject, html_content, text_content=None):
     """
@@ -0,0 +1,259 @@
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from html import escape
+from flask import Response, request, send_file
+from werkzeug.utils import safe_join
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; originals are served unresized without it
+    Image = None
+    ImageOps = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+SOURCE_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png', '.webp': 'webp'}
+
+PLACEHOLDER_URL = re.compile(r'^/api/placeholder/(\d+)/(\d+)')
+MAX_PLACEHOLDER_SIZE = 2000
+
+
+class ImageService:
+    """Resized/WebP derivatives of static images in a size-capped, content-addressed disk cache"""
+
+    def __init__(self):
+        self.source_root = None
+        self.cache_dir = None
+        self.max_bytes = 256 * 1024 * 1024
+        self.widths = (160, 320, 480, 640, 960, 1280)
+        self.quality = 80
+        self.cache_bytes = 0
+        self._versions = {}
+        self._manifest = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def init_app(self, app):
+        self.source_root = app.static_folder
+        self.cache_dir = app.config.get('IMAGE_CACHE_DIR')
+        self.max_bytes = app.config.get('IMAGE_CACHE_MAX_MB', 256) * 1024 * 1024
+        self.widths = tuple(sorted(app.config.get('IMAGE_WIDTHS', self.widths)))
+        self.quality = app.config.get('IMAGE_QUALITY', self.quality)
+        self._manifest = {}
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.cache_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+
+    def _record(self, path, full_path):
+        """Remember an image's version and pixel width so srcset needs no disk access"""
+        if full_path is None:
+            self._manifest[path] = None
+            return None
+        version = self.source_version(full_path)
+        width = None
+        if Image is not None:
+            try:
+                # Only the header is read; EXIF rotation may swap the axes
+                with Image.open(full_path) as image:
+                    width = image.width
+                    if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                        width = image.height
+            except OSError:
+                pass
+        self._manifest[path] = (version, width)
+        return self._manifest[path]
+
+    @property
+    def enabled(self):
+        return Image is not None and self.cache_dir is not None
+
+    def source_path(self, path):
+        """Absolute path of a servable source image, or None"""
+        if not self.source_root or os.path.splitext(path)[1].lower() not in SOURCE_FORMATS:
+            return None
+        full_path = safe_join(self.source_root, path)
+        if full_path is None or not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    def source_version(self, full_path):
+        """Content hash of the source, recomputed only when size or mtime change"""
+        stat = os.stat(full_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._versions.get(full_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        with open(full_path, 'rb') as source:
+            version = hashlib.sha256(source.read()).hexdigest()[:16]
+        self._versions[full_path] = (signature, version)
+        return version
+
+    def snap_width(self, width):
+        """Round up to a configured width so arbitrary sizes can't flood the cache"""
+        for allowed in self.widths:
+            if width <= allowed:
+                return allowed
+        return self.widths[-1]
+
+    def negotiate_format(self, full_path, requested):
+        if requested in OUTPUT_FORMATS:
+            return requested
+        if 'image/webp' in request.headers.get('Accept', ''):
+            return 'webp'
+        return SOURCE_FORMATS[os.path.splitext(full_path)[1].lower()]
+
+    def derivative(self, full_path, width, output_format):
+        """Path of the cached derivative, generating it on first request"""
+        version = self.source_version(full_path)
+        key = hashlib.sha256(f'{version}:{width}:{output_format}:{self.quality}'.encode()).hexdigest()[:32]
+        cached_path = os.path.join(self.cache_dir, f'{key}.{output_format}')
+
+        if os.path.exists(cached_path):
+            # Touching the file keeps mtime usable as the LRU clock
+            os.utime(cached_path)
+            return cached_path, key
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if not os.path.exists(cached_path):
+                self._render(full_path, cached_path, width, output_format)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return cached_path, key
+
+    def _render(self, full_path, cached_path, width, output_format):
+        pil_format, _ = OUTPUT_FORMATS[output_format]
+        with Image.open(full_path) as image:
+            image.draft('RGB', (width, width * 4))
+            image = ImageOps.exif_transpose(image)
+            if image.width > width:
+                image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            temp_path = f'{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            options = {'quality': self.quality} if pil_format in ('WEBP', 'JPEG') else {'optimize': True}
+            image.save(temp_path, pil_format, **options)
+        os.replace(temp_path, cached_path)
+
+        with self._lock:
+            self.cache_bytes += os.path.getsize(cached_path)
+            over_budget = self.cache_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used derivatives until the cache is 90% of its cap"""
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.cache_dir) if entry.is_file() and not entry.name.endswith('.tmp')
+        )
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self.cache_bytes = total
+
+    def serve(self, path, width=None, requested_format=None, version=None):
+        full_path = self.source_path(path)
+        if full_path is None:
+            return None
+
+        current_version = self.source_version(full_path)
+        entry = self._manifest.get(path)
+        if entry is None or entry[0] != current_version:
+            self._record(path, full_path)
+        # Only URLs pinned to the current content may be cached forever
+        cache_control = IMMUTABLE_CACHE_CONTROL if version == current_version else DEFAULT_CACHE_CONTROL
+
+        if not self.enabled or not width:
+            response = send_file(full_path, etag=current_version, conditional=True)
+        else:
+            output_format = self.negotiate_format(full_path, requested_format)
+            cached_path, key = self.derivative(full_path, self.snap_width(width), output_format)
+            response = send_file(cached_path, mimetype=OUTPUT_FORMATS[output_format][1], etag=key, conditional=True)
+            if requested_format not in OUTPUT_FORMATS:
+                response.vary.add('Accept')
+
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    def srcset(self, image_url):
+        """srcset for a stored image URL from the manifest; None for external or unknown images"""
+        if not image_url:
+            return None
+
+        placeholder = PLACEHOLDER_URL.match(image_url)
+        if placeholder:
+            width, height = int(placeholder.group(1)), int(placeholder.group(2))
+            return ', '.join(
+                f'/api/placeholder/{size}/{max(1, round(height * size / width))} {size}w'
+                for size in self.widths if size <= width
+            ) or None
+
+        if image_url.startswith(('http://', 'https://', '//')):
+            return None
+        path = image_url.lstrip('/')
+        if path in self._manifest:
+            entry = self._manifest[path]
+        else:
+            # First sight of this image; serve() refreshes the entry when the file changes
+            entry = self._record(path, self.source_path(path))
+        if entry is None:
+            return None
+        version, source_width = entry
+        if source_width is None:
+            return ', '.join(f'/api/images/{path}?w={size}&v={version} {size}w' for size in self.widths)
+        # Derivatives never upscale, so the original stands in for every wider width
+        candidates = [f'/api/images/{path}?w={size}&v={version} {size}w' for size in self.widths if size < source_width]
+        candidates.append(f'/api/images/{path}?v={version} {source_width}w')
+        return ', '.join(candidates)
+
+    def add_srcsets(self, product_data):
+        """Fill in srcset on a serialized product's images"""
+        for image in product_data.get('images', ()):
+            image['srcset'] = self.srcset(image['image_url'])
+        return product_data
+
+    def placeholder(self, width, height, text=None):
+        width = max(1, min(width, MAX_PLACEHOLDER_SIZE))
+        height = max(1, min(height, MAX_PLACEHOLDER_SIZE))
+        body, etag = _placeholder_svg(width, height, text or f'{width}×{height}')
+        response = Response(body, mimetype='image/svg+xml')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response.make_conditional(request)
+
+
+@lru_cache(maxsize=256)
+def _placeholder_svg(width, height, text):
+    font_size = max(10, min(width, height) // 8)
+    body = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<rect width="100%" height="100%" fill="#f3ede4"/>'
+        f'<text x="50%" y="50%" fill="#9a8c7a" font-family="sans-serif" font-size="{font_size}" '
+        f'text-anchor="middle" dominant-baseline="middle">{escape(text[:40])}</text>'
+        f'</svg>'
+    ).encode('utf-8')
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+# Global image service instance
+image_service = ImageService()
@@ -0,0 +1,194 @@
+import re
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import select
+from src.models.user import db
+from src.models.product import Product
+from src.services.shared_state import shared_counters
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # NumPy/SciPy are optional; ingredient search is unavailable without them
+    np = None
+    sparse = None
+
+# Shopper terms whose plain-word match would be wrong or incomplete. "Alcohol-free" means
+# no drying alcohols, so fatty alcohols like cetyl alcohol must not match.
+EXCLUSION_ALIASES = {
+    'fragrance': ('fragrance', 'parfum', 'perfume'),
+    'alcohol': ('alcohol', 'alcohol denat', 'denatured alcohol', 'ethanol', 'ethyl alcohol', 'sd alcohol',
+                'isopropyl alcohol'),
+}
+
+_PERCENTAGE = re.compile(r'\s*\d+(\.\d+)?\s*%')
+_PARENTHESES = re.compile(r'\([^)]*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_ingredient(name):
+    name = _PARENTHESES.sub(' ', _PERCENTAGE.sub(' ', name.lower()))
+    return _SPACES.sub(' ', name).strip(' .*')
+
+
+def parse_ingredients(text):
+    """Distinct normalized ingredient names in label order"""
+    if not text:
+        return ()
+    names = (normalize_ingredient(part) for part in re.split(r'[,;\n]', text))
+    return tuple(dict.fromkeys(name for name in names if name))
+
+
+def parse_terms(value):
+    """'no fragrance, no alcohol' -> ('fragrance', 'alcohol')"""
+    terms = (normalize_ingredient(re.sub(r'^(no|without|free of)\s+', '', part.strip().lower())) for part in value.split(','))
+    return tuple(term for term in terms if term)
+
+
+def term_matches(term, name):
+    aliases = EXCLUSION_ALIASES.get(term)
+    if aliases is not None:
+        return any(name == alias or name.startswith(alias + ' ') for alias in aliases)
+    return re.search(rf'\b{re.escape(term)}\b', name) is not None
+
+
+class IngredientIndexState:
+    """Immutable snapshot that queries read while a rebuild swaps in the next one"""
+
+    def __init__(self, matrix, product_ids, vocabulary):
+        self.matrix = matrix
+        self.product_ids = product_ids
+        self.rows = {product_id: row for row, product_id in enumerate(product_ids.tolist())}
+        self.vocabulary = vocabulary
+
+
+class IngredientIndex:
+    """TF-IDF ingredient vectors for active products in one L2-normalized sparse matrix.
+
+    Rows are products, columns distinct ingredients, so cosine similarity against
+    every product is a single sparse matrix-vector product. Parsed ingredient
+    lists are cached per product; when products_version moves only products
+    modified since the last sync are reloaded. If any ingredient list changed
+    the whole matrix is re-vectorized from the cache, since IDF weights and
+    the vocabulary are global; edits that leave ingredients alone skip it.
+    """
+
+    def __init__(self):
+        self.ttl = 60
+        self._ingredients = {}
+        self._state = None
+        self._watermark = None
+        self._synced_version = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('INGREDIENT_INDEX_TTL', self.ttl)
+
+    @property
+    def available(self):
+        return np is not None
+
+    def ensure_fresh(self):
+        """Build on first use, then pick up products modified since the last sync"""
+        version = shared_counters.get('products_version')
+        if self._state is not None and version == self._synced_version and time.monotonic() - self._synced_at < self.ttl:
+            return self._state
+        with self._lock:
+            if self._state is None or version != self._synced_version or time.monotonic() - self._synced_at >= self.ttl:
+                self._sync(version)
+        return self._state
+
+    def _sync(self, version):
+        query = select(Product.id, Product.ingredients, Product.is_active, Product.date_modified)
+        if self._watermark is not None:
+            # Overlap by a second so writes committed with an older timestamp aren't missed
+            query = query.where(Product.date_modified >= self._watermark - timedelta(seconds=1))
+        rows = db.session.execute(query).all()
+
+        changed = False
+        for product_id, ingredients, is_active, date_modified in rows:
+            parsed = parse_ingredients(ingredients) if is_active else None
+            if self._ingredients.get(product_id) != parsed:
+                changed = True
+                if parsed is None:
+                    self._ingredients.pop(product_id, None)
+                else:
+                    self._ingredients[product_id] = parsed
+            if date_modified is not None and (self._watermark is None or date_modified > self._watermark):
+                self._watermark = date_modified
+
+        if changed or self._state is None:
+            self._state = self._vectorize()
+        self._synced_version = version
+        self._synced_at = time.monotonic()
+
+    def _vectorize(self):
+        product_ids = np.fromiter(self._ingredients, dtype=np.int64, count=len(self._ingredients))
+        vocabulary = {}
+        row_index, column_index = [], []
+        for row, product_id in enumerate(product_ids.tolist()):
+            for name in self._ingredients[product_id]:
+                row_index.append(row)
+                column_index.append(vocabulary.setdefault(name, len(vocabulary)))
+
+        rows = np.array(row_index, dtype=np.int32)
+        columns = np.array(column_index, dtype=np.int32)
+        # Smoothed IDF: rare actives weigh more than water and glycerin
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        idf = np.log((1 + len(product_ids)) / (1 + document_frequency)) + 1
+        weights = idf[columns].astype(np.float32)
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(product_ids)))
+        weights /= norms[rows]
+
+        matrix = sparse.csr_matrix((weights, (rows, columns)), shape=(len(product_ids), len(vocabulary)))
+        return IngredientIndexState(matrix, product_ids, vocabulary)
+
+    def ingredients(self, product_id):
+        return self._ingredients.get(product_id, ())
+
+    def matching_columns(self, state, terms):
+        return [column for name, column in state.vocabulary.items() if any(term_matches(term, name) for term in terms)]
+
+    def excluded_rows(self, state, terms):
+        """Boolean mask of products containing any ingredient matched by the exclusion terms"""
+        columns = self.matching_columns(state, terms) if terms else []
+        if not columns:
+            return np.zeros(len(state.product_ids), dtype=bool)
+        return state.matrix[:, columns].getnnz(axis=1) > 0
+
+    def _top(self, state, scores, limit):
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((state.product_ids[candidates], -scores[candidates]))]
+        return [(int(state.product_ids[row]), float(scores[row])) for row in candidates]
+
+    def similar(self, product_id, limit=10, exclude=()):
+        """(product_id, cosine similarity) of the products whose ingredients best match this one's"""
+        state = self.ensure_fresh()
+        row = state.rows.get(product_id)
+        if row is None:
+            return []
+        scores = (state.matrix @ state.matrix[row].T).toarray().ravel()
+        scores[row] = 0
+        scores[self.excluded_rows(state, exclude)] = 0
+        return self._top(state, scores, limit)
+
+    def search(self, include=(), exclude=(), limit=20):
+        """Products ranked by how strongly they feature the included ingredients, minus exclusions"""
+        state = self.ensure_fresh()
+        excluded = self.excluded_rows(state, exclude)
+        if include:
+            query = np.zeros(state.matrix.shape[1], dtype=np.float32)
+            query[self.matching_columns(state, include)] = 1
+            scores = state.matrix @ query
+        else:
+            # Exclusions only: every remaining product qualifies equally
+            scores = np.ones(len(state.product_ids), dtype=np.float32)
+        scores[excluded] = 0
+        return self._top(state, scores, limit), int(np.count_nonzero(scores > 0))
+
+# Global ingredient index instance
+ingredient_index = IngredientIndex()
@@ -0,0 +1,369 @@
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from html import escape
+from sqlalchemy import bindparam, func, insert, select, text, update
+from src.models.user import db
+from src.models.product import (
+    STOCK_SQL, Inventory, InventoryMovement, Product, ProductVariant, refresh_product_price_range
+)
+from src.services.catalog_cache import catalog_cache
+from src.services.email_service import send_email
+
+FEED_FORMATS = ('csv', 'ndjson')
+FEED_CHUNK_SIZE = 1000
+# Per-row problems listed in a sync report; the counts cover every row
+MAX_REPORTED_ERRORS = 50
+SYNC_COUNTS = (
+    'unknown_skus', 'unchanged', 'quantity_updates', 'price_updates', 'reorder_level_updates',
+    'inventory_created', 'movements'
+)
+# Counts that mean a committed chunk changed what catalog responses show
+CATALOG_COUNTS = ('quantity_updates', 'price_updates', 'reorder_level_updates', 'inventory_created')
+
+
+class FeedError(ValueError):
+    """A feed that can't be read at all, e.g. a CSV without a sku column"""
+
+
+class FeedSyncAborted(Exception):
+    """A sync that stopped part way; .report counts the chunks committed before it stopped"""
+
+    def __init__(self, report):
+        super().__init__(report['aborted'])
+        self.report = report
+
+
+def read_feed(stream, fmt):
+    """Yield (line number, record) for each row of a CSV or NDJSON text stream, without reading ahead.
+
+    Records that aren't JSON objects come back as None so they can be counted as invalid.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames or 'sku' not in [name.strip().lower() for name in reader.fieldnames if name]:
+            raise FeedError('CSV feed needs a header row with a sku column')
+        for row in reader:
+            yield reader.line_num, {key.strip().lower(): value for key, value in row.items() if key}
+    elif fmt == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+    else:
+        raise FeedError(f"format must be one of {', '.join(FEED_FORMATS)}")
+
+
+def _feed_count(record, field):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f'{field} must be a whole number')
+    if number < 0:
+        raise ValueError(f'{field} cannot be negative')
+    return number
+
+
+def parse_feed_record(record):
+    """(sku, quantity, price, reorder_level) from a feed record; fields the feed leaves out are None"""
+    if record is None:
+        raise ValueError('not a JSON object')
+    sku = str(record.get('sku') or '').strip()
+    if not sku:
+        raise ValueError('sku is required')
+    price = record.get('price')
+    if price is not None and price != '':
+        try:
+            price = Decimal(str(price).strip()).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError('price must be a number')
+        if price <= 0:
+            raise ValueError('price must be positive')
+    else:
+        price = None
+    return sku, _feed_count(record, 'quantity'), price, _feed_count(record, 'reorder_level')
+
+
+class InventoryService:
+    """Low-stock report and reorder digest.
+
+    Inventory.is_low_stock is maintained by flush events whenever stock
+    changes, so neither the report nor the digest scans the catalog: both
+    read the rows in the ix_inventory_low_stock partial index.
+    """
+
+    def __init__(self):
+        self.alert_recipients = []
+
+    def init_app(self, app):
+        self.alert_recipients = [
+            address.strip() for address in app.config.get('LOW_STOCK_ALERT_EMAILS', '').split(',') if address.strip()
+        ]
+
+    def low_stock(self, limit=100, offset=0, new_only=False):
+        """Low-stock rows, most urgent (furthest below reorder level) first, plus the total count"""
+        in_stock = func.coalesce(Inventory.quantity_available, 0) - func.coalesce(Inventory.quantity_reserved, 0)
+        condition = [Inventory.is_low_stock == True]
+        if new_only:
+            condition.append(Inventory.low_stock_alerted_at.is_(None))
+
+        total = db.session.scalar(select(func.count()).select_from(Inventory).where(*condition))
+        rows = db.session.execute(
+            select(
+                Inventory.product_variant_id, ProductVariant.sku, ProductVariant.product_id, Product.name,
+                ProductVariant.variant_name, in_stock, Inventory.quantity_reserved, Inventory.reorder_level,
+                Inventory.low_stock_since, Inventory.low_stock_alerted_at
+            )
+            .join(ProductVariant, ProductVariant.id == Inventory.product_variant_id)
+            .join(Product, Product.id == ProductVariant.product_id)
+            .where(*condition)
+            .order_by(in_stock - func.coalesce(Inventory.reorder_level, 0), Inventory.product_variant_id)
+            .limit(limit).offset(offset)
+        ).all()
+        items = [{
+            'product_variant_id': variant_id,
+            'sku': sku,
+            'product_id': product_id,
+            'product_name': product_name,
+            'variant_name': variant_name,
+            'in_stock': available,
+            'quantity_reserved': reserved or 0,
+            'reorder_level': reorder_level or 0,
+            'reorder_quantity': max((reorder_level or 0) * 2 - available, 0),
+            'low_stock_since': since.isoformat() if since else None,
+            'alerted_at': alerted_at.isoformat() if alerted_at else None
+        } for (variant_id, sku, product_id, product_name, variant_name, available, reserved, reorder_level,
+               since, alerted_at) in rows]
+        return items, total
+
+    def send_digest(self, limit=500):
+        """Email the items that went low since the last digest; returns how many were reported"""
+        if not self.alert_recipients:
+            return 0
+        items, total = self.low_stock(limit=limit, new_only=True)
+        if not items:
+            return 0
+
+        subject = f'Low stock: {total} item{"s" if total != 1 else ""} at or below reorder level'
+        lines = [
+            f"{item['sku']}  {item['product_name']} - {item['variant_name']}: "
+            f"{item['in_stock']} left (reorder level {item['reorder_level']})"
+            for item in items
+        ]
+        if total > len(items):
+            lines.append(f'...and {total - len(items)} more in /admin/api/inventory/low-stock')
+        rows = ''.join(
+            f"<tr><td>{escape(item['sku'])}</td><td>{escape(item['product_name'])} - {escape(item['variant_name'])}</td>"
+            f"<td>{item['in_stock']}</td><td>{item['reorder_level']}</td><td>{item['reorder_quantity']}</td></tr>"
+            for item in items
+        )
+        html_content = (
+            f'<h2>{escape(subject)}</h2><table><tr><th>SKU</th><th>Product</th><th>In stock</th>'
+            f'<th>Reorder level</th><th>Suggested reorder</th></tr>{rows}</table>'
+        )
+        # send_email reports failure by returning False rather than raising
+        sent = [send_email(recipient, subject, html_content, '\n'.join(lines)) for recipient in self.alert_recipients]
+        if not any(sent):
+            raise RuntimeError(f'Low-stock digest could not be sent to {", ".join(self.alert_recipients)}')
+
+        # Marked only once a send succeeded, so a failed run reports the same items next time
+        db.session.execute(
+            update(Inventory)
+            .where(Inventory.product_variant_id.in_([item['product_variant_id'] for item in items]))
+            # Keep last_updated's onupdate from treating an alert as a stock change
+            .values(low_stock_alerted_at=datetime.utcnow(), last_updated=Inventory.last_updated)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return len(items)
+
+    def sync_feed(self, records, chunk_size=FEED_CHUNK_SIZE, dry_run=False, reference=None):
+        """Apply a supplier feed of (line number, record) pairs from read_feed(); returns a report of counts.
+
+        Rows are diffed against the database chunk_size SKUs at a time and only
+        changed values are written, each chunk in its own transaction, so memory
+        stays flat however long the feed is. `price` is the variant's full USD
+        price; quantity changes are mirrored into Inventory and logged as
+        InventoryMovement rows referencing `reference`.
+
+        If a chunk fails, FeedSyncAborted carries the report so far:
+        applied_through_line is the last feed line whose chunk was committed.
+        """
+        report = dict.fromkeys(('rows', 'invalid') + SYNC_COUNTS, 0)
+        report.update(dry_run=dry_run, chunks_applied=0, applied_through_line=0, errors=[])
+
+        def apply(chunk, last_line):
+            counts = self._sync_chunk(chunk, dry_run, reference)
+            for key in SYNC_COUNTS:
+                report[key] += counts[key]
+            report['errors'].extend(counts['errors'][:MAX_REPORTED_ERRORS - len(report['errors'])])
+            report['chunks_applied'] += 1
+            report['applied_through_line'] = last_line
+
+        chunk = {}
+        line_number = 0
+        try:
+            for line_number, record in records:
+                report['rows'] += 1
+                try:
+                    sku, quantity, price, reorder_level = parse_feed_record(record)
+                except ValueError as e:
+                    report['invalid'] += 1
+                    if len(report['errors']) < MAX_REPORTED_ERRORS:
+                        report['errors'].append({'line': line_number, 'error': str(e)})
+                    continue
+                # A SKU repeated within a chunk keeps its last row, as if the rows were applied in order
+                chunk[sku] = (line_number, quantity, price, reorder_level)
+                if len(chunk) >= chunk_size:
+                    apply(chunk, line_number)
+                    chunk = {}
+            if chunk:
+                apply(chunk, line_number)
+        except FeedError:
+            raise
+        except Exception as e:
+            # Earlier chunks are committed; the failed one rolled back on its own
+            report['aborted'] = str(e)
+            raise FeedSyncAborted(report) from e
+        finally:
+            # Chunks write behind the session's back, so cached catalog responses are
+            # invalidated here, once, even when a later chunk failed
+            if not dry_run and any(report[key] for key in CATALOG_COUNTS):
+                catalog_cache.bump_version()
+        return report
+
+    def _sync_chunk(self, chunk, dry_run, reference):
+        """Diff and write one chunk in one transaction; returns its counts once committed"""
+        now = datetime.utcnow()
+        counts = dict.fromkeys(SYNC_COUNTS, 0)
+        counts['errors'] = []
+        with db.engine.begin() as connection:
+            current = connection.execute(
+                select(
+                    ProductVariant.sku, ProductVariant.id, ProductVariant.product_id, ProductVariant.inventory_quantity,
+                    ProductVariant.price_adjustment, Product.base_price, Inventory.id, Inventory.quantity_available,
+                    Inventory.reorder_level
+                )
+                .join(Product, Product.id == ProductVariant.product_id)
+                .outerjoin(Inventory, Inventory.product_variant_id == ProductVariant.id)
+                .where(ProductVariant.sku.in_(list(chunk)))
+            ).all()
+
+            prices, quantities, reorder_levels, stock, new_inventory, movements = [], [], [], [], [], []
+            product_ids = set()
+            for (sku, variant_id, product_id, quantity, adjustment, base_price, inventory_id, available,
+                 reorder_level) in current:
+                if sku not in chunk:
+                    continue
+                line_number, feed_quantity, feed_price, feed_reorder_level = chunk.pop(sku)
+                changed = False
+
+                if feed_price is not None and feed_price - base_price != (adjustment or 0):
+                    prices.append({'b_id': variant_id, 'b_price_adjustment': feed_price - base_price})
+                    product_ids.add(product_id)
+                    counts['price_updates'] += 1
+                    changed = True
+
+                # Also repairs an Inventory row that drifted from its variant
+                quantity_changed = feed_quantity is not None and (
+                    feed_quantity != (quantity or 0) or feed_quantity != (available or 0)
+                )
+                if quantity_changed:
+                    if feed_quantity != (quantity or 0):
+                        quantities.append({'b_id': variant_id, 'b_quantity': feed_quantity})
+                    counts['quantity_updates'] += 1
+                    changed = True
+                stocked = feed_quantity if feed_quantity is not None else quantity or 0
+
+                if inventory_id is None:
+                    # Variants created without an Inventory row get one, as the catalog seeders do
+                    level = 10 if feed_reorder_level is None else feed_reorder_level
+                    new_inventory.append({
+                        'product_variant_id': variant_id, 'quantity_available': stocked, 'quantity_reserved': 0,
+                        'reorder_level': level, 'is_low_stock': stocked <= level,
+                        'low_stock_since': now if stocked <= level else None, 'last_updated': now
+                    })
+                    if stocked:
+                        movements.append({'variant_id': variant_id, 'quantity_change': stocked})
+                    counts['inventory_created'] += 1
+                    changed = True
+                else:
+                    reorder_changed = feed_reorder_level is not None and feed_reorder_level != reorder_level
+                    if reorder_changed:
+                        reorder_levels.append({'b_id': inventory_id, 'b_reorder_level': feed_reorder_level})
+                        counts['reorder_level_updates'] += 1
+                        changed = True
+                    if quantity_changed and feed_quantity != (available or 0):
+                        movements.append({
+                            'variant_id': variant_id, 'inventory_id': inventory_id,
+                            'quantity_change': feed_quantity - (available or 0)
+                        })
+                    if quantity_changed or reorder_changed:
+                        stock.append({
+                            'variant_id': variant_id, 'now': now,
+                            'quantity': feed_quantity if feed_quantity is not None else available or 0
+                        })
+                if not changed:
+                    counts['unchanged'] += 1
+
+            counts['unknown_skus'] += len(chunk)
+            for line_number, _, _, _ in chunk.values():
+                if len(counts['errors']) < MAX_REPORTED_ERRORS:
+                    counts['errors'].append({'line': line_number, 'error': 'unknown sku'})
+            counts['movements'] += len(movements)
+            if dry_run:
+                return counts
+
+            variants = ProductVariant.__table__
+            inventory = Inventory.__table__
+            if prices:
+                connection.execute(
+                    variants.update().where(variants.c.id == bindparam('b_id'))
+                    .values(price_adjustment=bindparam('b_price_adjustment')),
+                    prices
+                )
+                refresh_product_price_range(connection, product_ids)
+            if quantities:
+                connection.execute(
+                    variants.update().where(variants.c.id == bindparam('b_id'))
+                    .values(inventory_quantity=bindparam('b_quantity')),
+                    quantities
+                )
+            if reorder_levels:
+                connection.execute(
+                    inventory.update().where(inventory.c.id == bindparam('b_id'))
+                    .values(reorder_level=bindparam('b_reorder_level')),
+                    reorder_levels
+                )
+            if stock:
+                # Mirrors the quantity and re-evaluates the low-stock flag, as the flush event does for the ORM
+                connection.execute(text(STOCK_SQL), stock)
+            if new_inventory:
+                connection.execute(insert(Inventory), new_inventory)
+                created = dict(connection.execute(
+                    select(Inventory.product_variant_id, Inventory.id)
+                    .where(Inventory.product_variant_id.in_([row['product_variant_id'] for row in new_inventory]))
+                ).all())
+                for movement in movements:
+                    movement.setdefault('inventory_id', created.get(movement['variant_id']))
+            if movements:
+                connection.execute(insert(InventoryMovement), [{
+                    'inventory_id': movement['inventory_id'],
+                    'movement_type': 'restock' if movement['quantity_change'] > 0 else 'adjustment',
+                    'quantity_change': movement['quantity_change'],
+                    'reference_id': reference,
+                    'notes': 'Supplier feed sync',
+                    'timestamp': now
+                } for movement in movements])
+        return counts
+
+# Global inventory service instance
+inventory_service = InventoryService()
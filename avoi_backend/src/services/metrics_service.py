@@ -0,0 +1,220 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.services.shared_state import shared_counters
+
+# Seconds; shared by every histogram so the exposition stays small
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Per-endpoint histograms and counters with bounded label cardinality"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            snapshot = [(key, list(h.counts), h.total, h.count, h.buckets) for key, h in histograms]
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described and name in self.help:
+                kind, text = self.help[name]
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+            described.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+
+        for (name, labels), counts, total, count, buckets in snapshot:
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", _format_value(bound)),))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    return repr(float(value)) if not isinstance(value, int) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Adds time spent serializing response bodies to the request's metrics"""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            if has_request_context():
+                g.metrics_serialize_time = g.get('metrics_serialize_time', 0.0) + time.perf_counter() - start
+
+
+class MetricsService:
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.enabled = True
+        self.server_timing = False
+        self.token = None
+        self.public = False
+        self.registry.describe('avoi_http_requests_total', 'counter', 'HTTP requests by endpoint, method and status.')
+        self.registry.describe('avoi_http_request_duration_seconds', 'histogram', 'Total request latency.')
+        self.registry.describe('avoi_db_query_duration_seconds', 'histogram', 'Time spent in SQL per request.')
+        self.registry.describe('avoi_db_queries_per_request', 'histogram', 'SQL statements executed per request.')
+        self.registry.describe('avoi_serialization_duration_seconds', 'histogram', 'JSON serialization time per request.')
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.server_timing = app.config.get('METRICS_SERVER_TIMING', False)
+        self.token = app.config.get('METRICS_TOKEN')
+        self.public = app.config.get('METRICS_PUBLIC', False)
+        if not self.enabled:
+            return
+
+        app.json_provider_class = TimedJSONProvider
+        app.json = TimedJSONProvider(app)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_endpoint)
+
+    def before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_query_time = 0.0
+
+    def after_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+
+        duration = time.perf_counter() - start
+        query_time = g.get('metrics_query_time', 0.0)
+        queries = g.get('metrics_queries', 0)
+        serialize_time = g.get('metrics_serialize_time', 0.0)
+        # The rule name, never the raw path, keeps label cardinality fixed
+        endpoint = request.endpoint or 'unmatched'
+        if endpoint == 'metrics':
+            return response
+
+        self.record(endpoint, request.method, response.status_code, duration, query_time, queries, serialize_time)
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;desc="{queries} queries";dur={query_time * 1000:.2f}, '
+                f'serialize;dur={serialize_time * 1000:.2f}, '
+                f'total;dur={duration * 1000:.2f}'
+            )
+        return response
+
+    def record(self, endpoint, method, status, duration, query_time=0.0, queries=0, serialize_time=0.0):
+        """Count one request; also called by the ASGI app for routes Flask never sees"""
+        if not self.enabled:
+            return
+        labels = (('endpoint', endpoint),)
+        registry = self.registry
+        shared_counters.inc('requests')
+        registry.inc('avoi_http_requests_total', labels + (('method', method), ('status', str(status))))
+        registry.observe('avoi_http_request_duration_seconds', labels, duration)
+        registry.observe('avoi_db_query_duration_seconds', labels, query_time)
+        registry.observe('avoi_db_queries_per_request', labels, queries, QUERY_COUNT_BUCKETS)
+        registry.observe('avoi_serialization_duration_seconds', labels, serialize_time)
+
+    def metrics_endpoint(self):
+        if self.token:
+            if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {self.token}'):
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        elif not self.public:
+            # remote_addr can't tell a local scraper from a client behind a local proxy
+            return Response('Forbidden: set METRICS_TOKEN, or METRICS_PUBLIC=true\n', status=403, mimetype='text/plain')
+        return Response(self.registry.render() + self.render_shared(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def render_shared(self):
+        """Counters summed across every worker process, unlike the per-process registry"""
+        lines = ['# HELP avoi_shared_counter Counters shared by all worker processes.', '# TYPE avoi_shared_counter gauge']
+        for name, value in shared_counters.snapshot().items():
+            lines.append(f'avoi_shared_counter{_format_labels((("name", name),))} {value}')
+        return '\n'.join(lines) + '\n'
+
+# Global metrics service instance
+metrics_service = MetricsService()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_queries += 1
+        g.metrics_query_time += time.perf_counter() - started
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('metrics_query_start'):
+        connection.info['metrics_query_start'].pop()
@@ -0,0 +1,171 @@
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+
+class RequestProfile:
+    def __init__(self, profile_id, endpoint, method, path, reason):
+        self.id = profile_id
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.duration_ms = None
+        self.samples = {}
+        self.sample_count = 0
+
+    def add_sample(self, stack, max_stacks):
+        if stack in self.samples or len(self.samples) < max_stacks:
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+        else:
+            self.samples['[truncated]'] = self.samples.get('[truncated]', 0) + 1
+        self.sample_count += 1
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format, ready for flamegraph.pl or speedscope"""
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.samples.items()))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'path': self.path,
+            'reason': self.reason,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            'sample_count': self.sample_count,
+            'unique_stacks': len(self.samples)
+        }
+
+
+class ProfilerService:
+    """Samples the Python stacks of selected requests from a background thread"""
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.interval = 0.005
+        self.max_stacks = 5000
+        self.profiles = deque(maxlen=100)
+        self.serializer = None
+        self.token_max_age = 3600
+        self._active = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._root_prefix = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+    def init_app(self, app):
+        self.sample_rate = app.config.get('PROFILER_SAMPLE_RATE', self.sample_rate)
+        self.interval = app.config.get('PROFILER_INTERVAL_MS', 5) / 1000
+        self.profiles = deque(maxlen=app.config.get('PROFILER_MAX_PROFILES', 100))
+        self.serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='avoi-profiler')
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+
+    def generate_token(self, note=''):
+        """Signed token that forces profiling of any request carrying it"""
+        return self.serializer.dumps({'note': note})
+
+    def _token_is_valid(self, token):
+        try:
+            self.serializer.loads(token, max_age=self.token_max_age)
+            return True
+        except BadSignature:
+            return False
+
+    def before_request(self):
+        token = request.headers.get(PROFILE_HEADER)
+        if token and self._token_is_valid(token):
+            reason = 'header'
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            reason = 'sampled'
+        else:
+            return
+
+        profile = RequestProfile(next(self._ids), request.endpoint, request.method, request.path, reason)
+        g.profile = profile
+        g.profile_start = time.perf_counter()
+        with self._lock:
+            self._active[threading.get_ident()] = profile
+            self._ensure_sampler()
+        self._wakeup.set()
+
+    def teardown_request(self, exc):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+        # Only publish once the sampler can no longer touch it
+        profile.duration_ms = (time.perf_counter() - g.pop('profile_start')) * 1000
+        self.profiles.append(profile)
+
+    def _ensure_sampler(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='avoi-profiler', daemon=True)
+            self._thread.start()
+
+    def _frame_label(self, frame):
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(self._root_prefix):
+            filename = filename[len(self._root_prefix):]
+        else:
+            filename = os.path.basename(filename)
+        return f'{code.co_name} ({filename})'
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._frame_label(frame))
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    def _run(self):
+        while True:
+            # Sleep until a profiled request starts; costs nothing while idle
+            self._wakeup.wait()
+            # Sampling under the lock means a profile teardown has removed from
+            # _active is never written again, so published profiles are immutable
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, profile in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.add_sample(self._collapse(frame), self.max_stacks)
+                del frames
+            time.sleep(self.interval)
+
+    def get(self, profile_id):
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def merged(self, endpoint=None):
+        """Collapsed stacks summed across stored profiles, optionally for one endpoint"""
+        totals = {}
+        for profile in list(self.profiles):
+            if endpoint and profile.endpoint != endpoint:
+                continue
+            for stack, count in profile.samples.items():
+                totals[stack] = totals.get(stack, 0) + count
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(totals.items()))
+
+# Global profiler service instance
+profiler_service = ProfilerService()
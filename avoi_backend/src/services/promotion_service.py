@@ -0,0 +1,256 @@
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, or_, select, update
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.product import CategoryClosure
+from src.models.promotion import Promotion
+from src.services.shared_state import shared_counters
+
+
+class PromotionError(Exception):
+    """A coupon code that doesn't exist, has run out or doesn't apply to the cart"""
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+class CompiledPromotion:
+    """A promotion row flattened into sets and floats for evaluation"""
+
+    def __init__(self, promotion, category_descendants):
+        self.id = promotion.id
+        self.name = promotion.name
+        self.code = normalize_code(promotion.code) or None
+        self.kind = promotion.kind
+        self.value = float(promotion.value or 0)
+        self.buy_quantity = max(promotion.buy_quantity or 1, 1)
+        self.get_quantity = max(promotion.get_quantity or 1, 1)
+        self.product_ids = frozenset(promotion.product_ids or ())
+        self.category_ids = frozenset(
+            descendant for category_id in promotion.category_ids or () for descendant in category_descendants.get(category_id, (category_id,))
+        )
+        self.scoped = bool(self.product_ids or self.category_ids)
+        self.min_subtotal = float(promotion.min_subtotal) if promotion.min_subtotal is not None else None
+        self.currencies = frozenset(currency.upper() for currency in promotion.currencies or ())
+        self.nationalities = frozenset(nationality.lower() for nationality in promotion.nationalities or ())
+        self.starts_at = promotion.starts_at
+        self.ends_at = promotion.ends_at
+        self.usage_limit = promotion.usage_limit
+        self.usage_count = promotion.usage_count
+
+    def applies_to(self, line):
+        return not self.scoped or line.product_id in self.product_ids or line.category_id in self.category_ids
+
+    def rejection(self, now, subtotal, currency, nationality):
+        """Why the cart as a whole doesn't qualify, or None"""
+        if (self.starts_at and now < self.starts_at) or (self.ends_at and now >= self.ends_at):
+            return 'is not active'
+        if self.currencies and currency.upper() not in self.currencies:
+            return f'is not available for {currency} orders'
+        if self.nationalities and (nationality or '').lower() not in self.nationalities:
+            return 'is not available in your country'
+        if self.min_subtotal is not None and subtotal < self.min_subtotal:
+            return f'requires a subtotal of at least {self.min_subtotal:.2f} USD'
+        return None
+
+    def discount(self, lines):
+        """USD off the lines this promotion covers"""
+        eligible = [line for line in lines if self.applies_to(line)]
+        amount = sum(line.unit_price * line.quantity for line in eligible)
+        if self.kind == 'percentage':
+            return amount * self.value / 100
+        if self.kind == 'fixed':
+            return min(self.value, amount)
+        if self.kind == 'bogo':
+            # Most expensive units first; in each full group of buy + get units the cheapest get units are discounted
+            units = sorted((line.unit_price for line in eligible for _ in range(line.quantity)), reverse=True)
+            group = self.buy_quantity + self.get_quantity
+            discounted = sum(
+                sum(units[start + self.buy_quantity:start + group])
+                for start in range(0, len(units) - group + 1, group)
+            )
+            return discounted * (self.value or 100) / 100
+        return 0.0
+
+
+class PromotionPlan:
+    """Active promotions indexed so a cart only evaluates the rules that can touch it"""
+
+    def __init__(self, rules):
+        self.cart_wide = []
+        self.by_product = {}
+        self.by_category = {}
+        self.by_code = {}
+        for rule in rules:
+            if rule.code:
+                # Coupons only apply when their code is entered
+                self.by_code[rule.code] = rule
+            elif not rule.scoped:
+                self.cart_wide.append(rule)
+            else:
+                for product_id in rule.product_ids:
+                    self.by_product.setdefault(product_id, []).append(rule)
+                for category_id in rule.category_ids:
+                    self.by_category.setdefault(category_id, []).append(rule)
+
+    def candidates(self, lines):
+        rules = {rule.id: rule for rule in self.cart_wide}
+        for line in lines:
+            for rule in self.by_product.get(line.product_id, ()):
+                rules[rule.id] = rule
+            for rule in self.by_category.get(line.category_id, ()):
+                rules[rule.id] = rule
+        return [rules[rule_id] for rule_id in sorted(rules)]
+
+
+class PromotionService:
+    """Prices carts against automatic promotions and coupon codes.
+
+    Active promotions are compiled into a PromotionPlan, rebuilt when a
+    promotion or the category tree changes (promotions_version and
+    categories_version), not on stock or order writes. Coupon usage limits
+    are enforced by redeem(), a conditional UPDATE in the order's own
+    transaction, so concurrent checkouts can never push a code past its limit.
+    """
+
+    def __init__(self):
+        # Bounds staleness for writes made by processes that don't share the version counters
+        self.ttl = 60
+        self._plan = None
+        self._plan_key = None
+        self._compiled_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PROMOTION_PLAN_TTL', self.ttl)
+
+    def plan(self):
+        # Not catalog_version: every checkout's stock write bumps that
+        key = (shared_counters.get('promotions_version'), shared_counters.get('categories_version'))
+        if self._plan is not None and key == self._plan_key and time.monotonic() - self._compiled_at < self.ttl:
+            return self._plan
+        with self._lock:
+            if self._plan is None or key != self._plan_key or time.monotonic() - self._compiled_at >= self.ttl:
+                self._plan = self.compile()
+                self._plan_key = key
+                self._compiled_at = time.monotonic()
+        return self._plan
+
+    def compile(self):
+        promotions = db.session.scalars(
+            select(Promotion).where(
+                Promotion.is_active == True,
+                or_(Promotion.ends_at.is_(None), Promotion.ends_at > datetime.utcnow())
+            )
+        ).all()
+        category_ids = {category_id for promotion in promotions for category_id in promotion.category_ids or ()}
+        category_descendants = {}
+        if category_ids:
+            for ancestor_id, descendant_id in db.session.execute(
+                select(CategoryClosure.ancestor_id, CategoryClosure.descendant_id)
+                .where(CategoryClosure.ancestor_id.in_(category_ids))
+            ):
+                category_descendants.setdefault(ancestor_id, []).append(descendant_id)
+        return PromotionPlan(CompiledPromotion(promotion, category_descendants) for promotion in promotions)
+
+    def price(self, lines, currency='USD', nationality=None, exchange_rate=1.0, code=None):
+        """Discounts for cart lines (checkout_service.CartLine, USD prices), in the order currency.
+
+        Raises PromotionError when `code` is given but can't be used.
+        """
+        plan = self.plan()
+        now = datetime.utcnow()
+        subtotal = sum(line.unit_price * line.quantity for line in lines)
+        rules = [rule for rule in plan.candidates(lines) if rule.rejection(now, subtotal, currency, nationality) is None]
+
+        code = normalize_code(code)
+        if code:
+            coupon = plan.by_code.get(code)
+            if coupon is None:
+                raise PromotionError(f'Coupon code {code} is not valid')
+            reason = coupon.rejection(now, subtotal, currency, nationality)
+            if reason:
+                raise PromotionError(f'Coupon code {code} {reason}')
+            if coupon.usage_limit is not None and coupon.usage_count >= coupon.usage_limit:
+                raise PromotionError(f'Coupon code {code} has been fully redeemed')
+            if coupon.scoped and not any(coupon.applies_to(line) for line in lines):
+                raise PromotionError(f'Coupon code {code} does not apply to the items in your cart')
+            rules.append(coupon)
+
+        discounts = []
+        free_shipping = False
+        remaining = subtotal
+        for rule in rules:
+            if rule.kind == 'free_shipping':
+                if any(rule.applies_to(line) for line in lines):
+                    free_shipping = True
+                    discounts.append({'promotion_id': rule.id, 'name': rule.name, 'code': rule.code, 'kind': rule.kind, 'amount': 0.0})
+                continue
+            # Stacked promotions can't take the cart below zero
+            amount = min(rule.discount(lines), remaining)
+            if amount > 0:
+                remaining -= amount
+                discounts.append({
+                    'promotion_id': rule.id, 'name': rule.name, 'code': rule.code, 'kind': rule.kind,
+                    'amount': round(amount * exchange_rate, 2)
+                })
+
+        return {
+            'discounts': discounts,
+            'discount_total': round(sum(discount['amount'] for discount in discounts), 2),
+            'free_shipping': free_shipping,
+            'coupon_code': code or None
+        }
+
+    def redeem(self, session, code):
+        """Count one use of a coupon in the caller's transaction; False when its limit is already reached"""
+        result = session.execute(
+            update(Promotion)
+            .where(
+                Promotion.code == normalize_code(code),
+                or_(Promotion.usage_limit.is_(None), Promotion.usage_count < Promotion.usage_limit)
+            )
+            .values(usage_count=Promotion.usage_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+        # Compiled plans hold usage_count, so recompile once this commits
+        session.info['promotions_dirty'] = True
+        return True
+
+    def release(self, session, code):
+        """Give back a use of a coupon, e.g. when its order is cancelled"""
+        result = session.execute(
+            update(Promotion)
+            .where(Promotion.code == normalize_code(code), Promotion.usage_count > 0)
+            .values(usage_count=Promotion.usage_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            session.info['promotions_dirty'] = True
+
+# Global promotion service instance
+promotion_service = PromotionService()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_promotion_writes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Promotion):
+            session.info['promotions_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _recompile_on_commit(session):
+    if session.info.pop('promotions_dirty', False):
+        shared_counters.inc('promotions_version')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('promotions_dirty', None)
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import jsonify, request
+from src.services.metrics_service import metrics_service
+
+
+def client_ip():
+    return request.remote_addr or 'unknown'
+
+
+def json_email():
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    return str(email).strip().lower() if email else None
+
+
+class MemoryBackend:
+    """Per-process token buckets; fine for a single worker or tests"""
+
+    def __init__(self):
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated_at = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            return allowed, tokens
+
+    def purge(self, older_than):
+        with self._lock:
+            for key in [key for key, (_, updated_at) in self.buckets.items() if updated_at < older_than]:
+                del self.buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self.buckets.clear()
+
+
+class SQLiteBackend:
+    """Token buckets in a WAL-mode SQLite file shared by every worker process on the host"""
+
+    # Refill and take a token in one UPSERT; SET expressions all see the old row
+    HIT_SQL = '''
+        INSERT INTO rate_limit_buckets (key, tokens, allowed, updated_at)
+        VALUES (:key, :capacity - 1, 1, :now)
+        ON CONFLICT(key) DO UPDATE SET
+            allowed = MIN(:capacity, tokens + (:now - updated_at) * :rate) >= 1,
+            tokens = MIN(:capacity, tokens + (:now - updated_at) * :rate)
+                     - (MIN(:capacity, tokens + (:now - updated_at) * :rate) >= 1),
+            updated_at = :now
+        RETURNING allowed, tokens
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self._connect()
+        connection.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                allowed INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork so workers never share a handle
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def hit(self, key, capacity, rate, now):
+        row = self._connection().execute(
+            self.HIT_SQL, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        ).fetchone()
+        return bool(row[0]), row[1]
+
+    def purge(self, older_than):
+        self._connection().execute('DELETE FROM rate_limit_buckets WHERE updated_at < ?', (older_than,))
+
+    def reset(self):
+        self._connection().execute('DELETE FROM rate_limit_buckets')
+
+
+class RateLimitService:
+    def __init__(self):
+        self.enabled = True
+        self.backend = MemoryBackend()
+        self.max_tracked_keys = 1000
+        self.limited_keys = {}
+        self.checks = 0
+        self._lock = threading.Lock()
+        metrics_service.registry.describe(
+            'avoi_rate_limit_checks_total', 'counter', 'Rate limit checks by limit name and result.'
+        )
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        self.backend = self.create_backend(app.config.get('RATELIMIT_STORAGE_URL', 'memory://'))
+
+    def create_backend(self, url):
+        if url.startswith('sqlite:///'):
+            return SQLiteBackend(url[len('sqlite:///'):])
+        if url == 'memory://':
+            return MemoryBackend()
+        raise ValueError(f'Unsupported RATELIMIT_STORAGE_URL: {url}')
+
+    def hit(self, name, key, limit, period):
+        """Take one token from the bucket; returns (allowed, retry_after_seconds)"""
+        rate = limit / period
+        now = time.time()
+        allowed, tokens = self.backend.hit(f'{name}:{key}', limit, rate, now)
+
+        metrics_service.registry.inc(
+            'avoi_rate_limit_checks_total', (('limit', name), ('result', 'allowed' if allowed else 'limited'))
+        )
+
+        with self._lock:
+            self.checks += 1
+            purge = self.checks % 1000 == 0
+            if not allowed:
+                self._track(name, key)
+        if purge:
+            # A bucket idle for a day is full again, so dropping it changes nothing
+            self.backend.purge(now - 86400)
+
+        return allowed, 0 if allowed else max(1, int((1 - tokens) / rate + 0.999))
+
+    def _track(self, name, key):
+        tracked = self.limited_keys.get((name, key))
+        if tracked is None:
+            if len(self.limited_keys) >= self.max_tracked_keys:
+                del self.limited_keys[min(self.limited_keys, key=lambda item: self.limited_keys[item]['count'])]
+            tracked = self.limited_keys[(name, key)] = {'count': 0}
+        tracked['count'] += 1
+        tracked['last_limited'] = time.time()
+
+    def top_limited(self, limit=50):
+        with self._lock:
+            entries = [
+                {'limit': name, 'key': key, 'count': info['count'], 'last_limited': info['last_limited']}
+                for (name, key), info in self.limited_keys.items()
+            ]
+        entries.sort(key=lambda item: item['count'], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        self.backend.reset()
+        with self._lock:
+            self.limited_keys.clear()
+
+# Global rate limit service instance
+rate_limit_service = RateLimitService()
+
+
+def rate_limit(name, limit, period, key=client_ip):
+    """Token bucket of `limit` requests per `period` seconds for each value of key()"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if rate_limit_service.enabled:
+                value = key()
+                if value is not None:
+                    allowed, retry_after = rate_limit_service.hit(name, value, limit, period)
+                    if not allowed:
+                        response = jsonify({'error': 'Too many requests', 'retry_after': retry_after})
+                        response.status_code = 429
+                        response.headers['Retry-After'] = str(retry_after)
+                        return response
+            return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
@@ -0,0 +1,201 @@
+import threading
+import time
+from sqlalchemy import delete, event, insert, select, text
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.product import ProductRecommendation, ProductVariant
+from src.models.archive import ARCHIVE_BIND, ArchivedOrder, ArchivedOrderItem
+from src.services.shared_state import shared_counters
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # NumPy/SciPy are only needed to rebuild the matrix
+    np = None
+    sparse = None
+
+INSERT_CHUNK = 10000
+
+RECORD_PAIR_SQL = '''
+    INSERT INTO product_recommendation (product_id, recommended_product_id, score)
+    VALUES (:product_id, :recommended_product_id, 1)
+    ON CONFLICT (product_id, recommended_product_id) DO UPDATE SET score = product_recommendation.score + 1
+'''
+
+RELEASE_PAIR_SQL = '''
+    UPDATE product_recommendation SET score = score - 1
+    WHERE product_id = :product_id AND recommended_product_id = :recommended_product_id
+'''
+
+DROP_EMPTY_PAIR_SQL = '''
+    DELETE FROM product_recommendation
+    WHERE product_id = :product_id AND recommended_product_id = :recommended_product_id AND score <= 0
+'''
+
+
+def cooccurrence_top_k(order_ids, product_ids, k=None):
+    """Top-k co-purchased products per product from parallel order/product line arrays.
+
+    Returns (product, recommended product, shared order count) arrays, grouped by
+    product with the highest counts first; k=None keeps every pair.
+    """
+    if len(order_ids) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    products, product_index = np.unique(product_ids, return_inverse=True)
+    orders, order_index = np.unique(order_ids, return_inverse=True)
+    # Orders x products, 1 where the order contains the product however many lines it takes
+    baskets = sparse.csr_matrix(
+        (np.ones(len(order_index), dtype=np.int32), (order_index, product_index)),
+        shape=(len(orders), len(products))
+    )
+    baskets.data[:] = 1
+
+    counts = (baskets.T @ baskets).tocsr()
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+
+    rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    ranking = np.lexsort((counts.indices, -counts.data, rows))
+    rows, columns, scores = rows[ranking], counts.indices[ranking], counts.data[ranking]
+    rank_in_row = np.arange(len(rows)) - counts.indptr[rows]
+    keep = rank_in_row < k if k is not None else slice(None)
+    return products[rows[keep]], products[columns[keep]], scores[keep]
+
+
+class RecommendationService:
+    """'Frequently bought together' lists: top-K co-purchased products per product.
+
+    The table holds the shared order count of every co-purchased pair and lists
+    are cut to top_k when read, so a pair climbing past a list's last entry shows
+    up right away. rebuild() recomputes every count from all order lines with a
+    sparse matrix product; between rebuilds record_order() and release_order()
+    keep the counts exact.
+    """
+
+    def __init__(self):
+        self.top_k = 20
+        # Bounds staleness when the rebuild runs in a process that doesn't share the version counter
+        self.ttl = 300
+        self._neighbors = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.top_k = app.config.get('RECOMMENDATIONS_TOP_K', self.top_k)
+        self.ttl = app.config.get('RECOMMENDATIONS_CACHE_TTL', self.ttl)
+
+    @property
+    def version(self):
+        return shared_counters.get('recommendations_version')
+
+    def order_lines(self):
+        """(order_id, product_id) arrays for every line of a non-cancelled order, hot and archived"""
+        with db.engine.connect() as connection:
+            variants = np.array(connection.execute(
+                select(ProductVariant.id, ProductVariant.product_id).order_by(ProductVariant.id)
+            ).all(), dtype=np.int64).reshape(-1, 2)
+            hot = connection.execute(
+                select(OrderItem.order_id, OrderItem.product_variant_id)
+                .join(Order, Order.id == OrderItem.order_id)
+                .where(Order.order_status != 'cancelled')
+            ).all()
+        with db.engines[ARCHIVE_BIND].connect() as connection:
+            archived = connection.execute(
+                select(ArchivedOrderItem.order_id, ArchivedOrderItem.product_variant_id)
+                .join(ArchivedOrder, ArchivedOrder.id == ArchivedOrderItem.order_id)
+                .where(ArchivedOrder.order_status != 'cancelled')
+            ).all()
+
+        lines = np.array(hot + archived, dtype=np.int64).reshape(-1, 2)
+        # Variants -> products; lines for deleted variants are dropped
+        position = np.searchsorted(variants[:, 0], lines[:, 1]).clip(max=max(len(variants) - 1, 0))
+        known = variants[position, 0] == lines[:, 1] if len(variants) else np.zeros(len(lines), dtype=bool)
+        return lines[known, 0], variants[position[known], 1]
+
+    def rebuild(self):
+        """Recompute every pair's count; returns the number of rows stored"""
+        if np is None:
+            raise RuntimeError('Rebuilding recommendations needs: pip install numpy scipy')
+        order_ids, product_ids = self.order_lines()
+        # Untrimmed, so release_order() always finds the pairs a cancelled order was counted in
+        return self.store(*cooccurrence_top_k(order_ids, product_ids))
+
+    def store(self, products, recommended, scores):
+        """Replace every stored list with cooccurrence_top_k output"""
+        rows = [
+            {'product_id': product_id, 'recommended_product_id': recommended_id, 'score': score}
+            for product_id, recommended_id, score in zip(products.tolist(), recommended.tolist(), scores.tolist())
+        ]
+
+        table = ProductRecommendation.__table__
+        with db.engine.begin() as connection:
+            connection.execute(delete(table))
+            for start in range(0, len(rows), INSERT_CHUNK):
+                connection.execute(insert(table), rows[start:start + INSERT_CHUNK])
+        shared_counters.inc('recommendations_version')
+        return len(rows)
+
+    def record_order(self, session, product_ids):
+        """Count a new order's product pairs; call before the order's commit.
+
+        Every pair is counted with one executemany upsert, so concurrent
+        checkouts of the same pair can't collide on the primary key or lose
+        an increment.
+        """
+        pairs = self._pairs(product_ids)
+        if pairs:
+            session.execute(text(RECORD_PAIR_SQL), pairs)
+            session.info['recommendations_dirty'] = True
+
+    def release_order(self, session, product_ids):
+        """Take back the counts record_order added, e.g. when the order is cancelled.
+
+        Every pair of a live order is counted, by record_order() or by the
+        rebuild, so only pairs still stored are decremented and emptied ones dropped.
+        """
+        pairs = self._pairs(product_ids)
+        if pairs:
+            session.execute(text(RELEASE_PAIR_SQL), pairs)
+            session.execute(text(DROP_EMPTY_PAIR_SQL), pairs)
+            session.info['recommendations_dirty'] = True
+
+    def _pairs(self, product_ids):
+        product_ids = sorted(set(product_ids))
+        return [
+            {'product_id': product_id, 'recommended_product_id': other_id}
+            for product_id in product_ids for other_id in product_ids if other_id != product_id
+        ]
+
+    def recommendations(self, product_id):
+        """Top-K (product_id, score) pairs, best first; one dict lookup until the lists change"""
+        version = self.version
+        now = time.monotonic()
+        cached = self._neighbors.get(product_id)
+        if cached is not None and cached[0] == version and now - cached[1] < self.ttl:
+            return cached[2]
+
+        neighbors = tuple(db.session.execute(
+            select(ProductRecommendation.recommended_product_id, ProductRecommendation.score)
+            .where(ProductRecommendation.product_id == product_id)
+            .order_by(ProductRecommendation.score.desc(), ProductRecommendation.recommended_product_id)
+            .limit(self.top_k)
+        ).tuples())
+        with self._lock:
+            self._neighbors[product_id] = (version, now, neighbors)
+        return neighbors
+
+# Global recommendation service instance
+recommendation_service = RecommendationService()
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_on_commit(session):
+    if session.info.pop('recommendations_dirty', False):
+        shared_counters.inc('recommendations_version')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('recommendations_dirty', None)
@@ -0,0 +1,337 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.job import JobLease
+from src.services.metrics_service import metrics_service
+
+# Seconds; maintenance jobs run far longer than requests
+JOB_DURATION_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+# A crashed holder's lease lapses this long after its job's timeout
+LEASE_GRACE_SECONDS = 60
+
+# (low, high) per cron field: minute, hour, day of month, month, day of week (0 or 7 = Sunday)
+CRON_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+logger = logging.getLogger('avoi.scheduler')
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        span, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if span == '*':
+            start, end = low, high
+        elif '-' in span:
+            start, end = (int(value) for value in span.split('-', 1))
+        else:
+            start = int(span)
+            end = high if '/' in part else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f'invalid cron field {field!r}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class IntervalSchedule:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def first_run(self, now):
+        return now
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f'every {self.seconds}s'
+
+
+class CronSchedule:
+    """Five-field cron expression, evaluated in UTC"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'cron expression needs 5 fields: {expression!r}')
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        # Like cron: when both day fields are restricted, either one may match
+        if self.any_day:
+            return weekday
+        if self.any_weekday:
+            return day
+        return day or weekday
+
+    def first_run(self, now):
+        return self.next_after(now)
+
+    def next_after(self, moment):
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Four years so that a Feb 29 schedule still fires
+        limit = moment + timedelta(days=4 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'cron expression never fires: {self.expression!r}')
+
+    def __str__(self):
+        return self.expression
+
+
+class JobContext:
+    """Handed to each run; long jobs call check() between batches to honour the timeout"""
+
+    def __init__(self, job, deadline):
+        self.job = job
+        self.deadline = deadline
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def check(self):
+        if time.monotonic() > self.deadline:
+            raise JobTimeout(f'{self.job.name} exceeded {self.job.timeout}s')
+
+
+class Job:
+    def __init__(self, name, func, schedule, timeout, exclusive):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.timeout = timeout
+        # Exclusive jobs run in one process at a time under a DB lease; others run in every process
+        self.exclusive = exclusive
+        self.next_run = None
+        self.running = False
+
+
+class SchedulerService:
+    """Interval and cron jobs run on a background thread, coordinated across processes by DB leases"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.enabled = False
+        self.tick = 5
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._known_rows = set()
+        metrics_service.registry.describe('avoi_job_runs_total', 'counter', 'Scheduled job runs by job and status.')
+        metrics_service.registry.describe('avoi_job_duration_seconds', 'histogram', 'Scheduled job run time.')
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SCHEDULER_ENABLED', False)
+        self.tick = app.config.get('SCHEDULER_TICK_SECONDS', self.tick)
+        # Job runs go to whatever handlers the server configured, or to stderr when there are none
+        if not logger.hasHandlers():
+            logger.addHandler(logging.StreamHandler())
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+
+    @property
+    def owner(self):
+        # Computed on use so a forked worker never reuses its master's identity
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def job(self, every=None, cron=None, timeout=300, exclusive=True, name=None):
+        """Register a function as a job: @scheduler_service.job(every=3600) or (cron='0 3 * * *')"""
+        if (every is None) == (cron is None):
+            raise ValueError('a job needs exactly one of every= or cron=')
+        schedule = IntervalSchedule(every) if every is not None else CronSchedule(cron)
+
+        def decorator(func):
+            job_name = name or func.__name__
+            self.jobs[job_name] = Job(job_name, func, schedule, timeout, exclusive)
+            return func
+        return decorator
+
+    def start(self, app):
+        """Run due jobs on a daemon thread in this process, if SCHEDULER_ENABLED"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, args=(app,), name='avoi-scheduler', daemon=True)
+        self._thread.start()
+        logger.info('Scheduler started in %s with %d jobs', self.owner, len(self.jobs))
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self, app):
+        while not self._stop.is_set():
+            try:
+                self.run_pending(app)
+            except Exception:
+                logger.exception('Scheduler error')
+            self._stop.wait(self.tick)
+
+    def run_pending(self, app):
+        """Start every job that is due and not already running in this process"""
+        now = datetime.utcnow()
+        for job in self.jobs.values():
+            with self._lock:
+                if job.next_run is None:
+                    job.next_run = job.schedule.first_run(now)
+                if job.running or job.next_run > now:
+                    continue
+                job.running = True
+            threading.Thread(target=self.run_job, args=(app, job), name=f'job-{job.name}', daemon=True).start()
+
+    def run_job(self, app, job, force=False):
+        """Run one job now; returns its status, or None when another process holds or already ran it"""
+        job.running = True
+        now = datetime.utcnow()
+        try:
+            with app.app_context():
+                self.ensure_row(job.name)
+                if job.exclusive and not self.acquire(job, now, force):
+                    job.running = False
+                    return None
+        except Exception:
+            job.running = False
+            raise
+        if not job.exclusive:
+            job.next_run = job.schedule.next_after(now)
+
+        outcome = {}
+        started = time.monotonic()
+        worker = threading.Thread(target=self._execute, args=(app, job, now, started, outcome), daemon=True)
+        worker.start()
+        worker.join(job.timeout)
+        if worker.is_alive():
+            # Threads can't be killed; the run keeps its lease and is recorded once the thread exits
+            logger.warning('Job %s still running after %ss, holding its lease until it exits', job.name, job.timeout)
+            return 'timeout'
+        return outcome.get('status', 'failed')
+
+    def _execute(self, app, job, now, started, outcome):
+        try:
+            result = error = None
+            try:
+                with app.app_context():
+                    result = job.func(JobContext(job, started + job.timeout))
+                status = 'success'
+            except JobTimeout as e:
+                status, error = 'timeout', str(e)
+            except Exception as e:
+                logger.exception('Job %s failed', job.name)
+                status, error = 'failed', f'{type(e).__name__}: {e}'
+            duration = time.monotonic() - started
+            if status == 'success' and duration > job.timeout:
+                status, error = 'timeout', f'finished after {duration:.0f}s, past its {job.timeout}s timeout'
+            outcome['status'] = status
+            self.record(app, job, now, status, error, duration, result)
+        finally:
+            if job.exclusive:
+                self.release(app, job)
+            job.running = False
+
+    def record(self, app, job, now, status, error, duration, result):
+        """Metrics, log line and the lease row's last-run columns for a run that has ended"""
+        labels = (('job', job.name),)
+        metrics_service.registry.inc('avoi_job_runs_total', labels + (('status', status),))
+        metrics_service.registry.observe('avoi_job_duration_seconds', labels, duration, JOB_DURATION_BUCKETS)
+        logger.log(
+            logging.INFO if status == 'success' else logging.WARNING,
+            'Job %s %s in %.0f ms%s%s', job.name, status, duration * 1000,
+            f' ({result})' if result is not None else '', f': {error}' if error else ''
+        )
+
+        with app.app_context():
+            db.session.execute(update(JobLease).where(JobLease.name == job.name).values(
+                last_started_at=now,
+                last_finished_at=datetime.utcnow(),
+                last_status=status,
+                last_duration_ms=round(duration * 1000, 1),
+                last_error=error[:2000] if error else None,
+                run_count=JobLease.run_count + 1,
+                failure_count=JobLease.failure_count + (0 if status == 'success' else 1)
+            ))
+            db.session.commit()
+
+    def ensure_row(self, name):
+        if name in self._known_rows:
+            return
+        if db.session.get(JobLease, name) is None:
+            try:
+                db.session.execute(insert(JobLease).values(name=name, run_count=0, failure_count=0))
+                db.session.commit()
+            except IntegrityError:
+                # Another process created it first
+                db.session.rollback()
+        self._known_rows.add(name)
+
+    def acquire(self, job, now, force=False):
+        """Atomically take the lease if nobody holds it and the job is due"""
+        next_run = job.schedule.next_after(now)
+        criteria = [JobLease.name == job.name, or_(JobLease.lease_expires_at == None, JobLease.lease_expires_at < now)]
+        if not force:
+            criteria.append(or_(JobLease.next_run_at == None, JobLease.next_run_at <= now))
+        result = db.session.execute(update(JobLease).where(*criteria).values(
+            owner=self.owner,
+            lease_expires_at=now + timedelta(seconds=job.timeout + LEASE_GRACE_SECONDS),
+            next_run_at=next_run
+        ))
+        db.session.commit()
+
+        if result.rowcount == 1:
+            job.next_run = next_run
+            return True
+        # Someone else ran it or is running it; follow their schedule but don't poll faster than the tick
+        shared_next_run = db.session.scalar(select(JobLease.next_run_at).where(JobLease.name == job.name))
+        job.next_run = max(shared_next_run or next_run, now + timedelta(seconds=self.tick))
+        return False
+
+    def release(self, app, job):
+        with app.app_context():
+            db.session.execute(update(JobLease).where(
+                JobLease.name == job.name, JobLease.owner == self.owner
+            ).values(owner=None, lease_expires_at=None))
+            db.session.commit()
+
+    def status(self):
+        """Job definitions merged with their last recorded run"""
+        rows = {row.name: row for row in db.session.scalars(select(JobLease))}
+        jobs = []
+        for job in self.jobs.values():
+            row = rows.get(job.name)
+            jobs.append({
+                **(row.to_dict() if row else {'name': job.name}),
+                'schedule': str(job.schedule),
+                'timeout': job.timeout,
+                'exclusive': job.exclusive,
+                'running_here': job.running
+            })
+        return jobs
+
+# Global scheduler service instance
+scheduler_service = SchedulerService()
@@ -0,0 +1,152 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from sqlalchemy import select
+from src.models.user import db
+from src.models.product import Product
+from src.services.shared_state import shared_counters
+from src.services.suggest_service import normalize_text
+
+# Closest vocabulary words considered for each misspelled query word
+MAX_CORRECTIONS = 3
+
+
+def trigrams(word):
+    """Padded like pg_trgm, so word starts and ends weigh in: 'oil' -> '  o', ' oi', 'oil', 'il '"""
+    padded = f'  {word} '
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """Typo-tolerant matching of search words against product names and brands.
+
+    Distinct words of every active product's name and brand form a small
+    vocabulary with a trigram -> words inverted index. A query word that isn't
+    in the vocabulary is replaced by the vocabulary words sharing the most
+    trigrams with it (Jaccard similarity of the trigram sets, at least
+    `threshold`), so "retinal" finds "retinol" and "moisturiser" finds
+    "moisturizer". Products must match every query word that matched anything
+    and are ranked by mean similarity.
+
+    Postings are frozensets replaced on change, so lookups never see a
+    half-applied sync. Catalog writes are picked up incrementally through a
+    date_modified watermark, like the ingredient index.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.threshold = 0.3
+        self.limit = 500
+        self.ttl = 60
+        self._product_words = {}
+        self._postings = {}
+        self._trigram_words = {}
+        self._trigram_counts = {}
+        self._watermark = None
+        self._synced_version = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SEARCH_FUZZY_ENABLED', self.enabled)
+        self.threshold = app.config.get('SEARCH_FUZZY_THRESHOLD', self.threshold)
+        self.limit = app.config.get('SEARCH_FUZZY_LIMIT', self.limit)
+        self.ttl = app.config.get('SEARCH_INDEX_TTL', self.ttl)
+
+    def ensure_fresh(self):
+        version = shared_counters.get('products_version')
+        if self._synced_version is not None and version == self._synced_version and time.monotonic() - self._synced_at < self.ttl:
+            return
+        with self._lock:
+            if self._synced_version is None or version != self._synced_version or time.monotonic() - self._synced_at >= self.ttl:
+                self._sync(version)
+
+    def _sync(self, version):
+        query = select(Product.id, Product.name, Product.brand, Product.is_active, Product.date_modified)
+        if self._watermark is not None:
+            # Overlap by a second so writes committed with an older timestamp aren't missed
+            query = query.where(Product.date_modified >= self._watermark - timedelta(seconds=1))
+
+        added, removed = {}, {}
+        for product_id, name, brand, is_active, date_modified in db.session.execute(query):
+            words = frozenset(f'{normalize_text(name)} {normalize_text(brand)}'.split()) if is_active else frozenset()
+            old_words = self._product_words.get(product_id, frozenset())
+            for word in words - old_words:
+                added.setdefault(word, set()).add(product_id)
+            for word in old_words - words:
+                removed.setdefault(word, set()).add(product_id)
+            if words:
+                self._product_words[product_id] = words
+            else:
+                self._product_words.pop(product_id, None)
+            if date_modified is not None and (self._watermark is None or date_modified > self._watermark):
+                self._watermark = date_modified
+
+        for word in added.keys() | removed.keys():
+            postings = (self._postings.get(word, frozenset()) | added.get(word, set())) - removed.get(word, set())
+            if postings:
+                if word not in self._postings:
+                    self._add_word(word)
+                self._postings[word] = frozenset(postings)
+            else:
+                # Left in the trigram index; candidates without postings are skipped
+                self._postings.pop(word, None)
+        self._synced_version = version
+        self._synced_at = time.monotonic()
+
+    def _add_word(self, word):
+        grams = trigrams(word)
+        self._trigram_counts[word] = len(grams)
+        for gram in grams:
+            self._trigram_words[gram] = self._trigram_words.get(gram, frozenset()) | {word}
+
+    def similar_words(self, word):
+        """[(vocabulary word, similarity)], best first; the word itself when it is in the vocabulary"""
+        if word in self._postings:
+            return [(word, 1.0)]
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigram_words.get(gram, ()))
+        matches = []
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + self._trigram_counts[candidate] - count)
+            if similarity >= self.threshold and candidate in self._postings:
+                matches.append((candidate, similarity))
+        return heapq.nsmallest(MAX_CORRECTIONS, matches, key=lambda match: (-match[1], match[0]))
+
+    def search(self, text):
+        """(product ids best first, {misspelled word: correction}) for a free-text query"""
+        if not self.enabled:
+            return [], {}
+        self.ensure_fresh()
+
+        corrections = {}
+        word_scores = []
+        for word in dict.fromkeys(normalize_text(text).split()):
+            matches = self.similar_words(word)
+            if not matches:
+                # Nothing close enough; don't let one unknown word empty the results
+                continue
+            if matches[0][0] != word:
+                corrections[word] = matches[0][0]
+            scores = {}
+            for candidate, similarity in matches:
+                for product_id in self._postings.get(candidate, ()):
+                    if similarity > scores.get(product_id, 0.0):
+                        scores[product_id] = similarity
+            word_scores.append(scores)
+        if not word_scores:
+            return [], corrections
+
+        word_scores.sort(key=len)
+        common = set(word_scores[0]).intersection(*word_scores[1:])
+        ranked = heapq.nsmallest(
+            self.limit, common, key=lambda product_id: (-sum(scores[product_id] for scores in word_scores), product_id)
+        )
+        return ranked, corrections
+
+# Global search index instance
+search_index = TrigramIndex()
@@ -0,0 +1,46 @@
+import ctypes
+import multiprocessing
+
+# Counters every worker process reads and bumps; order fixes their slot in the segment
+SHARED_COUNTER_NAMES = (
+    'catalog_version',
+    'requests',
+    'catalog_cache_hits',
+    'catalog_cache_misses',
+    'exchange_rate_refreshes',
+    'recommendations_version',
+    'promotions_version',
+    'products_version',
+    'categories_version',
+)
+
+
+class SharedCounters:
+    """64-bit counters in an anonymous shared-memory segment.
+
+    Created at import time, so when the app is preloaded in a pre-fork master every
+    worker inherits the same pages and sees the others' increments. In a single
+    process it behaves like plain integers.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.slots = {name: index for index, name in enumerate(names)}
+        self.values = multiprocessing.RawArray(ctypes.c_longlong, len(names))
+        self.lock = multiprocessing.Lock()
+
+    def inc(self, name, amount=1):
+        index = self.slots[name]
+        with self.lock:
+            self.values[index] += amount
+            return self.values[index]
+
+    def get(self, name):
+        # Aligned 64-bit loads are atomic, so readers skip the lock
+        return self.values[self.slots[name]]
+
+    def snapshot(self):
+        return {name: self.values[index] for name, index in self.slots.items()}
+
+# Global shared counters instance
+shared_counters = SharedCounters(SHARED_COUNTER_NAMES)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """Strip literals and collapse IN lists so equivalent queries share a fingerprint"""
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    return normalized
+
+
+def parameter_shape(parameters, executemany):
+    """Types of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return f'{len(rows)} x {parameter_shape(rows[0], False) if rows else "()"}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if parameters:
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return '()'
+
+
+class QueryFingerprint:
+    def __init__(self, fingerprint, normalized, shape):
+        self.fingerprint = fingerprint
+        self.normalized_sql = normalized
+        self.parameter_shape = shape
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.routes = {}
+        self.plan = None
+        self.last_seen = None
+
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'normalized_sql': self.normalized_sql,
+            'parameter_shape': self.parameter_shape,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 2),
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else 0,
+            'max_ms': round(self.max_ms, 2),
+            'routes': dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+            'plan': self.plan,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None
+        }
+
+
+class SlowQueryService:
+    def __init__(self):
+        self.enabled = False
+        self.threshold_ms = 100.0
+        self.max_fingerprints = 500
+        self.fingerprints = {}
+        self.logger = logging.getLogger('avoi.slow_queries')
+        self.logger.propagate = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SLOW_QUERY_ENABLED', True)
+        self.threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', self.threshold_ms)
+        log_path = app.config.get('SLOW_QUERY_LOG')
+        if self.enabled and log_path and not self.logger.handlers:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            handler = RotatingFileHandler(log_path, maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8')
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+
+    def explain(self, dialect, cursor, statement, parameters):
+        """EXPLAIN QUERY PLAN on the same SQLite connection; None for other statements"""
+        if dialect != 'sqlite' or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        try:
+            plan_cursor = cursor.connection.cursor()
+            try:
+                rows = plan_cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+            finally:
+                plan_cursor.close()
+            return [row[-1] for row in rows]
+        except Exception as e:
+            return [f'EXPLAIN failed: {e}']
+
+    def record(self, dialect, cursor, statement, parameters, executemany, duration_ms):
+        normalized = normalize_sql(statement)
+        fingerprint = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+        shape = parameter_shape(parameters, executemany)
+        route = (request.endpoint or request.path) if has_request_context() else 'background'
+
+        with self._lock:
+            entry = self.fingerprints.get(fingerprint)
+            if entry is None:
+                if len(self.fingerprints) >= self.max_fingerprints:
+                    cheapest = min(self.fingerprints.values(), key=lambda item: item.total_ms)
+                    del self.fingerprints[cheapest.fingerprint]
+                entry = self.fingerprints[fingerprint] = QueryFingerprint(fingerprint, normalized, shape)
+            entry.count += 1
+            entry.total_ms += duration_ms
+            entry.max_ms = max(entry.max_ms, duration_ms)
+            entry.routes[route] = entry.routes.get(route, 0) + 1
+            entry.last_seen = datetime.utcnow()
+            needs_plan = entry.plan is None
+
+        # Plans are captured once per fingerprint so offenders don't pay twice
+        if needs_plan and not executemany:
+            entry.plan = self.explain(dialect, cursor, statement, parameters)
+
+        if self.logger.handlers:
+            self.logger.info(json.dumps({
+                'timestamp': entry.last_seen.isoformat(),
+                'fingerprint': fingerprint,
+                'duration_ms': round(duration_ms, 2),
+                'route': route,
+                'normalized_sql': normalized,
+                'parameter_shape': shape,
+                'plan': entry.plan
+            }))
+
+    def top(self, limit=50, order_by='total_ms'):
+        with self._lock:
+            entries = list(self.fingerprints.values())
+        entries.sort(key=lambda item: getattr(item, order_by), reverse=True)
+        return [entry.to_dict() for entry in entries[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self.fingerprints.clear()
+
+# Global slow query service instance
+slow_query_service = SlowQueryService()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_slow_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if slow_query_service.enabled and context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _check_slow_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_start', None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= slow_query_service.threshold_ms:
+        slow_query_service.record(conn.dialect.name, cursor, statement, parameters, executemany, duration_ms)
@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Vite emits fingerprinted build output into assets/ as name-<8 char hash>.ext;
+# files copied from public/ (e.g. hero-backdrop.jpg) keep their names and can change
+HASHED_ASSET_PATTERN = re.compile(r'^assets/[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'application/manifest+json',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+INDEX_CACHE_CONTROL = 'no-cache'
+
+# Preference order when the client accepts several encodings
+ENCODING_PREFERENCE = ('br', 'gzip')
+PRECOMPRESSED_SUFFIXES = {'.br': 'br', '.gz': 'gzip'}
+
+
+class StaticAsset:
+    def __init__(self, path, body, mimetype, last_modified, cache_control):
+        self.path = path
+        self.mimetype = mimetype
+        self.last_modified = last_modified
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': body}
+
+    def add_variant(self, encoding, body):
+        """Keep an encoded variant only if it actually saves bytes"""
+        if len(body) < len(self.variants['identity']):
+            self.variants[encoding] = body
+
+
+class StaticAssetService:
+    def __init__(self):
+        self.root = None
+        self.assets = {}
+        self.index = None
+        self.gzip_level = 9
+        self.brotli_quality = 11
+
+    def init_app(self, app):
+        """Build the asset manifest for the app's static folder"""
+        self.load(app.static_folder)
+
+    def precompress(self, root):
+        """Write .gz and .br siblings for compressible files; run once per build, not per worker"""
+        written = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                if os.path.splitext(filename)[1] in PRECOMPRESSED_SUFFIXES or not mimetype.startswith(COMPRESSIBLE_TYPES):
+                    continue
+
+                full_path = os.path.join(dirpath, filename)
+                with open(full_path, 'rb') as f:
+                    body = f.read()
+                for suffix, encoding in PRECOMPRESSED_SUFFIXES.items():
+                    if encoding == 'br' and brotli is None:
+                        continue
+                    if self._is_current(full_path + suffix, full_path):
+                        continue
+                    with open(full_path + suffix, 'wb') as f:
+                        f.write(self.compress(body, encoding))
+                    written += 1
+        return written
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    @staticmethod
+    def _is_current(variant_path, source_path):
+        return os.path.exists(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(source_path)
+
+    def load(self, root):
+        """Read every static file into memory once, with its build-time compressed variants"""
+        self.root = root
+        self.assets = {}
+        self.index = None
+
+        if not root or not os.path.isdir(root):
+            return
+
+        precompressed = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+                suffix = os.path.splitext(filename)[1]
+
+                if suffix in PRECOMPRESSED_SUFFIXES:
+                    precompressed.append((rel_path, suffix, full_path))
+                    continue
+
+                self.assets[rel_path] = self._load_asset(rel_path, full_path)
+
+        # Variants come from the build (flask static precompress or vite-plugin-compression);
+        # compressing here would repeat the work in every worker at startup
+        for rel_path, suffix, full_path in precompressed:
+            asset = self.assets.get(rel_path[:-len(suffix)])
+            if asset is None:
+                # A genuine archive, not a compressed sibling of another asset
+                self.assets[rel_path] = self._load_asset(rel_path, full_path)
+                continue
+
+            encoding = PRECOMPRESSED_SUFFIXES[suffix]
+            with open(full_path, 'rb') as f:
+                asset.add_variant(encoding, f.read())
+
+        self.index = self.assets.get('index.html')
+        if self.index:
+            self.index.cache_control = INDEX_CACHE_CONTROL
+
+    def _load_asset(self, rel_path, full_path):
+        with open(full_path, 'rb') as f:
+            body = f.read()
+
+        mimetype = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        mtime = os.path.getmtime(full_path)
+        last_modified = datetime.fromtimestamp(mtime, tz=timezone.utc)
+
+        if HASHED_ASSET_PATTERN.search(rel_path):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = DEFAULT_CACHE_CONTROL
+
+        return StaticAsset(rel_path, body, mimetype, last_modified, cache_control)
+
+    def choose_encoding(self, asset):
+        """Pick the best variant the client accepts"""
+        accepted = request.accept_encodings
+        for encoding in ENCODING_PREFERENCE:
+            if encoding in asset.variants and accepted[encoding] > 0:
+                return encoding
+        return 'identity'
+
+    def serve(self, path):
+        """Serve a static path from memory, falling back to index.html for SPA routes"""
+        asset = self.assets.get(path) or self.index
+        if asset is None:
+            return None
+        return self.make_response(asset)
+
+    def make_response(self, asset):
+        encoding = self.choose_encoding(asset)
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+
+        if encoding == 'identity':
+            response.set_etag(asset.etag)
+        else:
+            response.set_etag(f'{asset.etag}-{encoding}')
+            response.headers['Content-Encoding'] = encoding
+
+        response.headers['Cache-Control'] = asset.cache_control
+        response.last_modified = asset.last_modified
+        if len(asset.variants) > 1:
+            response.vary.add('Accept-Encoding')
+
+        return response.make_conditional(request)
+
+# Global static asset service instance
+static_service = StaticAssetService()
@@ -0,0 +1,309 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.product import Category, Product, ProductVariant
+from src.models.search import SearchQuery
+from src.services.shared_state import shared_counters
+
+MAX_SUGGESTIONS = 10
+# Only the first words of a long name get their own keys
+MAX_KEY_WORDS = 6
+# "se" matches "Serum Trio" ahead of an equally popular "Vitamin C Serum"
+LATER_WORD_FACTOR = 0.5
+# Cached results per snapshot; prefixes up to WARM_PREFIX_LENGTH, which match the most keys,
+# are filled at build time and kept when the cache is trimmed
+MAX_CACHED_PREFIXES = 20000
+WARM_PREFIX_LENGTH = 3
+# Above this many changed entries a sync re-sorts instead of inserting one by one
+INCREMENTAL_LIMIT = 2000
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_text(text):
+    """Lowercase, accents stripped, punctuation collapsed: 'Kòkó Naturals' -> 'koko naturals'"""
+    text = (text or '').lower()
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def entry_keys(entry, text):
+    """(key, later word, entry) for every word start, so 'ser' finds 'Vitamin C Serum'"""
+    words = text.split()[:MAX_KEY_WORDS]
+    return [(' '.join(words[start:]), start > 0, entry) for start in range(len(words))]
+
+
+class SuggestIndexState:
+    """Snapshot read by requests while a sync builds the next one"""
+
+    def __init__(self, pairs, entries, scores):
+        # Sorted (key, later word, entry); a prefix's matches are one contiguous slice
+        self.pairs = pairs
+        # entry -> (payload, normalized text)
+        self.entries = entries
+        self.scores = scores
+        self.results = {}
+
+    def lookup(self, prefix):
+        """Best entries whose key starts with prefix, memoized per snapshot"""
+        cached = self.results.get(prefix)
+        if cached is not None:
+            return cached
+
+        start = bisect.bisect_left(self.pairs, (prefix,))
+        end = bisect.bisect_left(self.pairs, (prefix + '\uffff',), start)
+        best = {}
+        for key, later, entry in self.pairs[start:end]:
+            score = self.scores[entry] * (LATER_WORD_FACTOR if later else 1.0)
+            if score > best.get(entry, 0.0):
+                best[entry] = score
+        cached = tuple(heapq.nsmallest(
+            MAX_SUGGESTIONS, best.items(), key=lambda item: (-item[1], self.entries[item[0]][1])
+        ))
+
+        if len(self.results) >= MAX_CACHED_PREFIXES:
+            self.results = {key: value for key, value in self.results.items() if len(key) <= WARM_PREFIX_LENGTH}
+        self.results[prefix] = cached
+        return cached
+
+
+class SuggestService:
+    """Search-as-you-type over product names, brands, categories and popular searches.
+
+    Every word start of every entry is a key in one sorted list, so a prefix is
+    two bisects and a slice. Entries are ranked by log-scaled popularity within
+    their kind: units sold for products, summed over a brand's or category's
+    products, and search counts for queries.
+
+    Product and category writes bump products_version; the next lookup reloads
+    only the products modified since the last sync and patches the affected keys into a
+    copy of the list. Sales and popular queries are reloaded every rebuild_seconds.
+    """
+
+    def __init__(self):
+        self.ttl = 60
+        self.rebuild_seconds = 900
+        self.min_query_count = 3
+        self.query_window_days = 30
+        self._state = None
+        self._products = {}
+        self._categories = {}
+        self._sales = {}
+        self._queries = {}
+        self._watermark = None
+        self._synced_version = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._pending_queries = Counter()
+        self._pending_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('SUGGEST_INDEX_TTL', self.ttl)
+        self.rebuild_seconds = app.config.get('SUGGEST_REBUILD_SECONDS', self.rebuild_seconds)
+        self.min_query_count = app.config.get('SUGGEST_MIN_QUERY_COUNT', self.min_query_count)
+        self.query_window_days = app.config.get('SUGGEST_QUERY_WINDOW_DAYS', self.query_window_days)
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        prefix = normalize_text(query)
+        if not prefix:
+            return []
+        state = self.ensure_fresh()
+        return [dict(state.entries[entry][0], score=round(score, 4)) for entry, score in state.lookup(prefix)[:limit]]
+
+    def ensure_fresh(self):
+        version = shared_counters.get('products_version')
+        now = time.monotonic()
+        if self._state is not None and version == self._synced_version and now - self._synced_at < self.ttl:
+            return self._state
+        with self._lock:
+            now = time.monotonic()
+            if self._state is None or now - self._built_at >= self.rebuild_seconds:
+                self._build(version)
+            elif version != self._synced_version or now - self._synced_at >= self.ttl:
+                self._sync(version)
+        return self._state
+
+    def _load_products(self, modified_since=None):
+        query = select(Product.id, Product.name, Product.brand, Product.category_id, Product.is_active, Product.date_modified)
+        if modified_since is not None:
+            # Overlap by a second so writes committed with an older timestamp aren't missed
+            query = query.where(Product.date_modified >= modified_since - timedelta(seconds=1))
+        loaded = {}
+        for product_id, name, brand, category_id, is_active, date_modified in db.session.execute(query):
+            loaded[product_id] = (name, brand, category_id, normalize_text(name), normalize_text(brand)) if is_active else None
+            if date_modified is not None and (self._watermark is None or date_modified > self._watermark):
+                self._watermark = date_modified
+        return loaded
+
+    def _load_categories(self):
+        return {
+            category_id: (name, slug)
+            for category_id, name, slug in db.session.execute(
+                select(Category.id, Category.name, Category.slug).where(Category.is_active == True)
+            )
+        }
+
+    def _load_sales(self):
+        # Hot orders only: recent sales are the better popularity signal
+        return dict(db.session.execute(
+            select(ProductVariant.product_id, func.sum(OrderItem.quantity))
+            .join(OrderItem, OrderItem.product_variant_id == ProductVariant.id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.order_status != 'cancelled')
+            .group_by(ProductVariant.product_id)
+        ).all())
+
+    def _load_queries(self):
+        cutoff = datetime.utcnow() - timedelta(days=self.query_window_days)
+        return dict(db.session.execute(
+            select(SearchQuery.query, SearchQuery.count)
+            .where(SearchQuery.last_searched_at >= cutoff, SearchQuery.count >= self.min_query_count)
+            .order_by(SearchQuery.count.desc()).limit(5000)
+        ).all())
+
+    def _entries(self):
+        """entry -> (payload, normalized text, weight) for the current products, brands and categories"""
+        entries = {}
+        brands = {}
+        category_weights = Counter()
+        for product_id, (name, brand, category_id, name_text, brand_text) in self._products.items():
+            weight = self._sales.get(product_id, 0) + 1
+            entries[('product', product_id)] = (
+                {'type': 'product', 'text': name, 'id': product_id, 'brand': brand}, name_text, weight
+            )
+            if brand_text:
+                display, brand_weight = brands.get(brand_text, (brand, 0))
+                brands[brand_text] = (display, brand_weight + weight)
+            category_weights[category_id] += weight
+
+        for brand_text, (display, weight) in brands.items():
+            entries[('brand', brand_text)] = ({'type': 'brand', 'text': display}, brand_text, weight)
+        for category_id, (name, slug) in self._categories.items():
+            entries[('category', category_id)] = (
+                {'type': 'category', 'text': name, 'id': category_id, 'slug': slug},
+                normalize_text(name), category_weights[category_id] + 1
+            )
+        return entries
+
+    def _scores(self, entries):
+        top = Counter()
+        for entry, (_, _, weight) in entries.items():
+            top[entry[0]] = max(top[entry[0]], weight)
+        return {entry: math.log1p(weight) / (math.log1p(top[entry[0]]) or 1.0) for entry, (_, _, weight) in entries.items()}
+
+    def _add_queries(self, entries, pairs):
+        """Popular searches that still lead somewhere in the catalog"""
+        for text, count in self._queries.items():
+            position = bisect.bisect_left(pairs, (text,))
+            if position < len(pairs) and pairs[position][0].startswith(text):
+                entries[('query', text)] = ({'type': 'query', 'text': text}, text, count)
+
+    def _build(self, version):
+        self._watermark = None
+        self._products = {
+            product_id: product for product_id, product in self._load_products().items() if product is not None
+        }
+        self._categories = self._load_categories()
+        self._sales = self._load_sales()
+        self._queries = self._load_queries()
+
+        entries = self._entries()
+        catalog_pairs = sorted(pair for entry, (_, text, _) in entries.items() for pair in entry_keys(entry, text))
+        self._add_queries(entries, catalog_pairs)
+        pairs = sorted(pair for entry, (_, text, _) in entries.items() for pair in entry_keys(entry, text))
+
+        state = SuggestIndexState(pairs, {entry: value[:2] for entry, value in entries.items()}, self._scores(entries))
+        # Warm the prefixes with the most matches so no request pays for a long scan
+        for prefix in sorted({key[:length] for key, _, _ in pairs for length in range(1, WARM_PREFIX_LENGTH + 1)}):
+            state.lookup(prefix)
+
+        self._state = state
+        self._synced_version = version
+        self._synced_at = self._built_at = time.monotonic()
+
+    def _sync(self, version):
+        changed_products = self._load_products(self._watermark)
+        for product_id, product in changed_products.items():
+            if product is None:
+                self._products.pop(product_id, None)
+            else:
+                self._products[product_id] = product
+        self._categories = self._load_categories()
+
+        old = self._state
+        entries = self._entries()
+        # Queries keep their place until the next full build
+        for entry, (payload, text) in old.entries.items():
+            if entry[0] == 'query':
+                entries[entry] = (payload, text, self._queries[entry[1]])
+        scores = self._scores(entries)
+
+        changed = {entry for entry in old.entries.keys() | entries.keys()
+                   if old.entries.get(entry) != (entries[entry][:2] if entry in entries else None)}
+        rescored = {entry for entry, score in scores.items() if old.scores.get(entry) != score}
+        if changed or rescored:
+            self._state = self._patch(old, entries, scores, changed, rescored)
+        self._synced_version = version
+        self._synced_at = time.monotonic()
+
+    def _patch(self, old, entries, scores, changed, rescored):
+        """Next snapshot with the changed entries' keys swapped in and stale cached prefixes dropped"""
+        removed = [pair for entry in changed if entry in old.entries for pair in entry_keys(entry, old.entries[entry][1])]
+        added = [pair for entry in changed if entry in entries for pair in entry_keys(entry, entries[entry][1])]
+        if len(removed) + len(added) > INCREMENTAL_LIMIT:
+            pairs = sorted(pair for entry, (_, text, _) in entries.items() for pair in entry_keys(entry, text))
+        else:
+            pairs = list(old.pairs)
+            for pair in removed:
+                del pairs[bisect.bisect_left(pairs, pair)]
+            for pair in added:
+                bisect.insort(pairs, pair)
+
+        state = SuggestIndexState(pairs, {entry: value[:2] for entry, value in entries.items()}, scores)
+        stale = removed + added + [
+            pair for entry in rescored - changed for pair in entry_keys(entry, entries[entry][1])
+        ]
+        if len(stale) < len(old.results):
+            stale_prefixes = {key[:length] for key, _, _ in stale for length in range(1, len(key) + 1)}
+            state.results = {prefix: result for prefix, result in old.results.items() if prefix not in stale_prefixes}
+        return state
+
+    def record_query(self, query):
+        """Count a catalog search; buffered in memory until flush_queries()"""
+        text = normalize_text(query)
+        if 2 <= len(text) <= 100:
+            with self._pending_lock:
+                self._pending_queries[text] += 1
+
+    def flush_queries(self):
+        """Add buffered search counts to the search_query table; returns the number of distinct queries"""
+        with self._pending_lock:
+            pending, self._pending_queries = self._pending_queries, Counter()
+        now = datetime.utcnow()
+        for text, count in pending.items():
+            values = {'count': SearchQuery.count + count, 'last_searched_at': now}
+            if db.session.execute(update(SearchQuery).where(SearchQuery.query == text).values(**values)).rowcount:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(SearchQuery(query=text, count=count, last_searched_at=now))
+            except IntegrityError:
+                # Another process inserted it first
+                db.session.execute(update(SearchQuery).where(SearchQuery.query == text).values(**values))
+        db.session.commit()
+        return len(pending)
+
+# Global suggest service instance
+suggest_service = SuggestService()
@@ -0,0 +1,55 @@
+"""Production WSGI entry point; see gunicorn.conf.py.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+"""
+import gc
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.commands import missing_columns
+from src.main import app
+from src.models.user import db
+from src.routes.admin import ADMIN_DASHBOARD_TEMPLATE, ADMIN_LOGIN_TEMPLATE, compile_template
+from src.services.currency_service import currency_service
+
+# Endpoints whose cached payloads are worth building before the first request
+WARM_PATHS = ('/api/products/categories', '/api/products', '/api/products/suggest?q=a')
+
+
+def check_schema(app):
+    """Refuse to start on a database older than the models instead of failing every request"""
+    with app.app_context():
+        missing = missing_columns()
+    if missing:
+        raise RuntimeError(
+            f"Database schema is out of date (missing {', '.join(missing[:5])}"
+            f"{' and more' if len(missing) > 5 else ''}); run: flask --app src.main db migrate"
+        )
+
+
+def warm_caches(app):
+    """Build read-only structures once so pre-forked workers share them copy-on-write"""
+    compile_template(app.jinja_env, ADMIN_LOGIN_TEMPLATE)
+    compile_template(app.jinja_env, ADMIN_DASHBOARD_TEMPLATE)
+    currency_service.get_exchange_rate('EUR')
+
+    client = app.test_client()
+    for path in WARM_PATHS:
+        response = client.get(path)
+        if response.status_code != 200:
+            print(f'Cache warm-up of {path} failed with {response.status_code}')
+
+    # Workers must open their own database connections
+    with app.app_context():
+        db.engine.dispose()
+
+
+check_schema(app)
+
+if app.config.get('PRELOAD_WARM_CACHES', True):
+    warm_caches(app)
+
+# Move everything allocated so far out of the collector's reach so its
+# bookkeeping writes don't un-share the pages forked workers inherit
+gc.freeze()
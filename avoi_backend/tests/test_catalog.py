@@ -0,0 +1,144 @@
+"""Catalog columns kept current by flush events: category closure, price ranges, ratings.
+
+    python -m pytest tests
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src.main import create_app
+from src.models.user import User, db
+from src.models.product import Category, CategoryClosure, Product, ProductVariant
+from src.models.review import Review
+from src.routes.product import category_descendant_ids
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+        'RATELIMIT_STORAGE_URL': f"sqlite:///{tmp_path / 'ratelimit.db'}",
+        'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+        'SLOW_QUERY_ENABLED': False,
+        'METRICS_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        # skincare > face > serums, and body at the top level
+        skincare = Category(name='Skincare', slug='skincare')
+        body = Category(name='Body', slug='body')
+        db.session.add_all([skincare, body])
+        db.session.flush()
+        face = Category(name='Face', slug='face', parent_category_id=skincare.id)
+        db.session.add(face)
+        db.session.flush()
+        db.session.add(Category(name='Serums', slug='serums', parent_category_id=face.id))
+        db.session.add(Product(name='Shea Butter', sku='SHEA-1', base_price=20, category_id=body.id))
+        db.session.add(User(
+            email='shopper@example.com', password_hash='x', first_name='Shopper', last_name='One',
+            nationality='nigerian', preferred_currency='USD', is_email_verified=True
+        ))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def category(slug):
+    return Category.query.filter_by(slug=slug).one()
+
+
+def ancestors(slug):
+    """{ancestor slug: depth} for a category, from the closure table"""
+    rows = db.session.query(Category.slug, CategoryClosure.depth).join(
+        CategoryClosure, CategoryClosure.ancestor_id == Category.id
+    ).filter(CategoryClosure.descendant_id == category(slug).id)
+    return dict(rows)
+
+
+def descendants(slug):
+    ids = db.session.scalars(category_descendant_ids(category(slug).id)).all()
+    return {category.slug for category in Category.query.filter(Category.id.in_(ids))}
+
+
+def test_closure_rows_follow_inserts_moves_and_deletes(app):
+    with app.app_context():
+        assert ancestors('serums') == {'serums': 0, 'face': 1, 'skincare': 2}
+
+        # Moving face carries its subtree under body
+        category('face').parent_category_id = category('body').id
+        db.session.commit()
+        assert ancestors('face') == {'face': 0, 'body': 1}
+        assert ancestors('serums') == {'serums': 0, 'face': 1, 'body': 2}
+        assert descendants('skincare') == {'skincare'}
+
+        with pytest.raises(ValueError):
+            category('face').parent_category_id = category('serums').id
+            db.session.flush()
+        db.session.rollback()
+
+        serums_id = category('serums').id
+        db.session.delete(category('serums'))
+        db.session.commit()
+        assert CategoryClosure.query.filter(
+            (CategoryClosure.ancestor_id == serums_id) | (CategoryClosure.descendant_id == serums_id)
+        ).count() == 0
+
+
+def test_an_inactive_category_hides_its_subtree(app):
+    with app.app_context():
+        assert descendants('skincare') == {'skincare', 'face', 'serums'}
+        category('face').is_active = False
+        db.session.commit()
+        assert descendants('skincare') == {'skincare'}
+        assert descendants('serums') == {'serums'}
+
+
+def test_price_range_follows_base_price_and_variant_edits(app):
+    with app.app_context():
+        product = Product.query.filter_by(sku='SHEA-1').one()
+        db.session.add_all([
+            ProductVariant(product_id=product.id, variant_name='100ml', sku='SHEA-1-100'),
+            ProductVariant(product_id=product.id, variant_name='250ml', sku='SHEA-1-250', price_adjustment=15),
+        ])
+        db.session.commit()
+        assert (float(product.min_price), float(product.max_price)) == (20, 35)
+
+        product.base_price = 30
+        db.session.commit()
+        assert (float(product.min_price), float(product.max_price)) == (30, 45)
+        assert sorted(float(variant.price) for variant in product.variants) == [30, 45]
+
+        large = ProductVariant.query.filter_by(sku='SHEA-1-250').one()
+        large.price_adjustment = 5
+        db.session.commit()
+        assert float(large.price) == 35 and float(product.max_price) == 35
+
+        db.session.delete(large)
+        db.session.commit()
+        assert (float(product.min_price), float(product.max_price)) == (30, 30)
+
+
+def test_ratings_count_approved_reviews_only(app):
+    with app.app_context():
+        product = Product.query.filter_by(sku='SHEA-1').one()
+        user_id = User.query.one().id
+        db.session.add(Review(product_id=product.id, user_id=user_id, rating=5))
+        db.session.add(Review(product_id=product.id, user_id=user_id, rating=2, is_approved=False))
+        db.session.commit()
+        assert (product.average_rating, product.review_count) == (5, 1)
+
+        pending = Review.query.filter_by(is_approved=False).one()
+        pending.is_approved = True
+        db.session.commit()
+        assert (product.average_rating, product.review_count) == (3.5, 2)
+
+        db.session.delete(pending)
+        db.session.delete(Review.query.filter_by(rating=5).one())
+        db.session.commit()
+        assert (product.average_rating, product.review_count) == (None, 0)
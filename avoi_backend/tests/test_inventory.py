@@ -0,0 +1,157 @@
+"""Low-stock flags through checkout, cancel and restock, and supplier feed syncs.
+
+    python -m pytest tests
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src.main import create_app
+from src.models.user import User, db
+from src.models.order import Address, CartItem
+from src.models.product import Category, Inventory, InventoryMovement, Product, ProductVariant
+from src.routes.auth import generate_token
+from src.services.inventory_service import FeedSyncAborted, inventory_service
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+        'RATELIMIT_STORAGE_URL': f"sqlite:///{tmp_path / 'ratelimit.db'}",
+        'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+        'SLOW_QUERY_ENABLED': False,
+        'METRICS_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Skincare', slug='skincare')
+        db.session.add(category)
+        db.session.flush()
+        product = Product(name='Shea Butter', sku='SHEA-1', base_price=20, category_id=category.id)
+        db.session.add(product)
+        db.session.flush()
+        for sku, quantity in (('SHEA-1-100', 12), ('SHEA-1-250', 50)):
+            variant = ProductVariant(product_id=product.id, variant_name=sku, sku=sku, inventory_quantity=quantity)
+            variant.inventory = Inventory(quantity_available=quantity, reorder_level=10)
+            db.session.add(variant)
+        # No Inventory row, as some imports leave it
+        db.session.add(ProductVariant(product_id=product.id, variant_name='500ml', sku='SHEA-1-500', inventory_quantity=0))
+
+        user = User(
+            email='shopper@example.com', password_hash='x', first_name='Shopper', last_name='One',
+            nationality='nigerian', preferred_currency='USD', is_email_verified=True
+        )
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Address(
+            user_id=user.id, address_type='shipping', street_address='1 Marina', city='Lagos',
+            state='Lagos', postal_code='100001', country='Nigeria'
+        ))
+        small = ProductVariant.query.filter_by(sku='SHEA-1-100').one()
+        db.session.add(CartItem(user_id=user.id, product_variant_id=small.id, quantity=3))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def stock(sku):
+    variant = ProductVariant.query.filter_by(sku=sku).one()
+    inventory = Inventory.query.filter_by(product_variant_id=variant.id).one_or_none()
+    return variant, inventory
+
+
+def test_low_stock_flag_follows_checkout_cancel_and_restock(app):
+    with app.app_context():
+        user = User.query.one()
+        token, address_id = generate_token(user.id), Address.query.one().id
+        assert not stock('SHEA-1-100')[1].is_low_stock
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post('/api/orders/', headers=headers, json={
+        'shipping_address_id': address_id, 'billing_address_id': address_id
+    })
+    assert response.status_code == 201
+    with app.app_context():
+        variant, inventory = stock('SHEA-1-100')
+        assert (variant.inventory_quantity, inventory.quantity_available) == (9, 9)
+        assert inventory.is_low_stock and inventory.low_stock_since is not None
+
+    assert client.post(f"/api/orders/{response.get_json()['order']['id']}/cancel", headers=headers).status_code == 200
+    with app.app_context():
+        inventory = stock('SHEA-1-100')[1]
+        assert inventory.quantity_available == 12
+        assert not inventory.is_low_stock and inventory.low_stock_since is None
+
+        variant = stock('SHEA-1-100')[0]
+        variant.inventory_quantity = 4
+        db.session.commit()
+        assert stock('SHEA-1-100')[1].is_low_stock
+        inventory_service.sync_feed([(2, {'sku': 'SHEA-1-100', 'quantity': '40'})])
+        db.session.expire_all()
+        inventory = stock('SHEA-1-100')[1]
+        assert inventory.quantity_available == 40 and not inventory.is_low_stock
+
+
+def test_sync_feed_applies_chunks_and_repairs_drift(app):
+    with app.app_context():
+        # Inventory drifted from its variant behind the flush events' back
+        Inventory.query.filter_by(product_variant_id=stock('SHEA-1-250')[0].id).update({'quantity_available': 7})
+        db.session.commit()
+
+        report = inventory_service.sync_feed([
+            (2, {'sku': 'SHEA-1-100', 'quantity': '5', 'price': '22.50'}),
+            (3, {'sku': 'NOPE', 'quantity': '1'}),
+            (4, {'sku': 'SHEA-1-250', 'quantity': '50'}),
+            (5, {'sku': 'SHEA-1-500', 'quantity': '3', 'reorder_level': '2'}),
+            (6, {'sku': 'SHEA-1-100', 'quantity': 'lots'}),
+        ], chunk_size=2, reference='feed-1')
+        assert report['rows'] == 5 and report['invalid'] == 1
+        assert report['chunks_applied'] == 2 and report['applied_through_line'] == 5
+        assert (report['unknown_skus'], report['quantity_updates'], report['price_updates']) == (1, 3, 1)
+        assert report['inventory_created'] == 1
+        assert {error['line'] for error in report['errors']} == {3, 6}
+
+        db.session.expire_all()
+        variant, inventory = stock('SHEA-1-100')
+        assert float(variant.price) == 22.5 and float(variant.product.max_price) == 22.5
+        assert inventory.quantity_available == 5 and inventory.is_low_stock
+        assert stock('SHEA-1-250')[1].quantity_available == 50
+        created = stock('SHEA-1-500')[1]
+        assert (created.quantity_available, created.reorder_level, created.is_low_stock) == (3, 2, False)
+        assert InventoryMovement.query.count() == 3
+
+        repeat = inventory_service.sync_feed([(2, {'sku': 'SHEA-1-250', 'quantity': '50'})])
+        assert repeat['unchanged'] == 1 and repeat['quantity_updates'] == 0
+
+
+def test_aborted_sync_reports_the_committed_chunks(app, monkeypatch):
+    with app.app_context():
+        sync_chunk = inventory_service._sync_chunk
+        calls = []
+
+        def failing_second_chunk(chunk, dry_run, reference):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise RuntimeError('database is locked')
+            return sync_chunk(chunk, dry_run, reference)
+
+        monkeypatch.setattr(inventory_service, '_sync_chunk', failing_second_chunk)
+        with pytest.raises(FeedSyncAborted) as aborted:
+            inventory_service.sync_feed([
+                (2, {'sku': 'SHEA-1-100', 'quantity': '30'}),
+                (3, {'sku': 'SHEA-1-250', 'quantity': '31'}),
+            ], chunk_size=1)
+        report = aborted.value.report
+        assert report['aborted'] == 'database is locked'
+        assert (report['chunks_applied'], report['applied_through_line'], report['quantity_updates']) == (1, 2, 1)
+        db.session.expire_all()
+        assert stock('SHEA-1-100')[1].quantity_available == 30
+        assert stock('SHEA-1-250')[1].quantity_available == 50
@@ -0,0 +1,159 @@
+"""Coupon usage limits under concurrent checkouts.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src.main import create_app
+from src.models.user import User, db
+from src.models.order import Address, CartItem
+from src.models.product import Category, Product, ProductVariant
+from src.models.promotion import Promotion
+from src.routes.auth import generate_token
+from src.services.promotion_service import promotion_service
+from src.services.shared_state import shared_counters
+
+CHECKOUTS = 6
+USAGE_LIMIT = 3
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+        'RATELIMIT_STORAGE_URL': f"sqlite:///{tmp_path / 'ratelimit.db'}",
+        'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+        'SLOW_QUERY_ENABLED': False,
+        'METRICS_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Skincare', slug='skincare')
+        db.session.add(category)
+        db.session.flush()
+        product = Product(name='Shea Butter', sku='SHEA-1', base_price=20, category_id=category.id)
+        db.session.add(product)
+        db.session.flush()
+        variant = ProductVariant(product_id=product.id, variant_name='100ml', sku='SHEA-1-100', inventory_quantity=100)
+        db.session.add(Promotion(name='Launch', code='LAUNCH', kind='percentage', value=10, usage_limit=USAGE_LIMIT))
+        db.session.add(variant)
+        db.session.flush()
+
+        for index in range(CHECKOUTS):
+            user = User(
+                email=f'shopper{index}@example.com', password_hash='x', first_name='Shopper', last_name=str(index),
+                nationality='nigerian', preferred_currency='USD', is_email_verified=True
+            )
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Address(
+                user_id=user.id, address_type='shipping', street_address='1 Marina', city='Lagos',
+                state='Lagos', postal_code='100001', country='Nigeria'
+            ))
+            db.session.add(CartItem(user_id=user.id, product_variant_id=variant.id, quantity=1))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def checkout_requests(app):
+    with app.app_context():
+        return [
+            (generate_token(user.id), Address.query.filter_by(user_id=user.id).first().id)
+            for user in User.query.order_by(User.id)
+        ]
+
+
+def test_concurrent_checkouts_never_exceed_usage_limit(app):
+    requests = checkout_requests(app)
+    version = shared_counters.get('promotions_version')
+    barrier = threading.Barrier(len(requests))
+    responses = [None] * len(requests)
+
+    def checkout(index, token, address_id):
+        client = app.test_client()
+        barrier.wait()
+        responses[index] = client.post('/api/orders/', headers={'Authorization': f'Bearer {token}'}, json={
+            'shipping_address_id': address_id, 'billing_address_id': address_id, 'coupon_code': 'launch'
+        })
+
+    threads = [threading.Thread(target=checkout, args=(index, *request)) for index, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    statuses = sorted(response.status_code for response in responses)
+    # Losers either lose the conditional UPDATE (409) or see the recompiled plan first (400)
+    assert statuses.count(201) == USAGE_LIMIT
+    assert all(status in (400, 409) for status in statuses if status != 201), statuses
+    assert all('fully redeemed' in response.get_json()['error'] for response in responses if response.status_code != 201)
+    with app.app_context():
+        assert Promotion.query.filter_by(code='LAUNCH').one().usage_count == USAGE_LIMIT
+    assert shared_counters.get('promotions_version') >= version + USAGE_LIMIT
+
+
+def test_cancelling_an_order_gives_the_coupon_back(app):
+    token, address_id = checkout_requests(app)[0]
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    order = client.post('/api/orders/', headers=headers, json={
+        'shipping_address_id': address_id, 'billing_address_id': address_id, 'coupon_code': 'LAUNCH'
+    }).get_json()['order']
+
+    version = shared_counters.get('promotions_version')
+    assert client.post(f"/api/orders/{order['id']}/cancel", headers=headers).status_code == 200
+    with app.app_context():
+        assert Promotion.query.filter_by(code='LAUNCH').one().usage_count == 0
+    assert shared_counters.get('promotions_version') > version
+
+
+def test_orders_without_a_coupon_keep_the_compiled_plan(app):
+    token, address_id = checkout_requests(app)[0]
+    with app.app_context():
+        plan = promotion_service.plan()
+    response = app.test_client().post('/api/orders/', headers={'Authorization': f'Bearer {token}'}, json={
+        'shipping_address_id': address_id, 'billing_address_id': address_id
+    })
+    assert response.status_code == 201
+    with app.app_context():
+        assert promotion_service.plan() is plan
+        category = Category.query.first()
+        category.name = 'Face care'
+        db.session.commit()
+        assert promotion_service.plan() is not plan
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'value': -10}, 'value must be a number of at least 0'),
+    ({'value': 'ten'}, 'value must be a number of at least 0'),
+    ({'value': 150}, 'value is a percentage and can be at most 100'),
+    ({'min_subtotal': '20'}, 'min_subtotal must be a number of at least 0'),
+    ({'usage_limit': -1}, 'usage_limit must be a whole number of at least 0'),
+    ({'usage_limit': 2.5}, 'usage_limit must be a whole number of at least 0'),
+    ({'buy_quantity': 0}, 'buy_quantity must be a whole number of at least 1'),
+    ({'product_ids': ['1']}, 'product_ids must be a list of ids'),
+])
+def test_admin_rejects_invalid_promotion_fields(app, body, error):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    response = client.post('/admin/api/promotions', json={'name': 'Bad', 'kind': 'percentage', 'value': 10, **body})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+    with app.app_context():
+        promotion_id = Promotion.query.filter_by(code='LAUNCH').one().id
+    response = client.put(f'/admin/api/promotions/{promotion_id}', json=body)
+    assert response.status_code == 400
+    with app.app_context():
+        assert float(Promotion.query.filter_by(code='LAUNCH').one().value) == 10
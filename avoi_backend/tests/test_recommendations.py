@@ -0,0 +1,69 @@
+"""Incremental "frequently bought together" counts.
+
+    python -m pytest tests
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src.main import create_app
+from src.models.user import db
+from src.models.product import Category, Product, ProductRecommendation
+from src.services.recommendation_service import recommendation_service
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+        'RATELIMIT_STORAGE_URL': f"sqlite:///{tmp_path / 'ratelimit.db'}",
+        'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+        'SLOW_QUERY_ENABLED': False,
+        'METRICS_ENABLED': False,
+        'RECOMMENDATIONS_TOP_K': 1,
+    })
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Skincare', slug='skincare')
+        db.session.add(category)
+        db.session.flush()
+        for sku in ('A', 'B', 'C'):
+            db.session.add(Product(name=sku, sku=sku, base_price=10, category_id=category.id))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    recommendation_service.top_k = 20
+
+
+def record(*skus, release=False):
+    ids = [Product.query.filter_by(sku=sku).one().id for sku in skus]
+    (recommendation_service.release_order if release else recommendation_service.record_order)(db.session, ids)
+    db.session.commit()
+
+
+def test_a_rising_pair_overtakes_a_full_list(app):
+    with app.app_context():
+        a, c = (Product.query.filter_by(sku=sku).one().id for sku in ('A', 'C'))
+        record('A', 'B')
+        assert [score for _, score in recommendation_service.recommendations(a)] == [1]
+        record('A', 'C')
+        record('A', 'C')
+        assert recommendation_service.recommendations(a) == ((c, 2),)
+        # Counts past the top-K cut are kept, not dropped
+        assert db.session.get(ProductRecommendation, (a, Product.query.filter_by(sku='B').one().id)).score == 1
+
+
+def test_releasing_an_order_takes_back_exactly_its_pairs(app):
+    with app.app_context():
+        record('A', 'B', 'C')
+        record('A', 'B')
+        record('A', 'B', 'C', release=True)
+        rows = {(row.product_id, row.recommended_product_id): row.score for row in ProductRecommendation.query}
+        assert sorted(rows.values()) == [1, 1]
+        assert all(score > 0 for score in rows.values())
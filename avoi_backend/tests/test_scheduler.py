@@ -0,0 +1,66 @@
+"""Job leases around runs that outlive their timeout.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src.main import create_app
+from src.models.user import db
+from src.models.job import JobLease
+from src.services.scheduler_service import SchedulerService
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+        'RATELIMIT_STORAGE_URL': f"sqlite:///{tmp_path / 'ratelimit.db'}",
+        'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+        'SLOW_QUERY_ENABLED': False,
+        'METRICS_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_a_timed_out_job_keeps_its_lease_until_the_thread_exits(app):
+    scheduler = SchedulerService()
+    release = threading.Event()
+    finished = threading.Event()
+
+    @scheduler.job(every=3600, timeout=0.1)
+    def stuck(context):
+        release.wait(5)
+        finished.set()
+
+    job = scheduler.jobs['stuck']
+    assert scheduler.run_job(app, job) == 'timeout'
+    with app.app_context():
+        lease = db.session.get(JobLease, 'stuck')
+        assert lease.owner == scheduler.owner and lease.lease_expires_at is not None
+        assert lease.last_finished_at is None and lease.run_count == 0
+    assert job.running
+
+    release.set()
+    finished.wait(5)
+    for _ in range(50):
+        if not job.running:
+            break
+        time.sleep(0.05)
+    assert not job.running
+    with app.app_context():
+        lease = db.session.get(JobLease, 'stuck')
+        assert lease.owner is None and lease.lease_expires_at is None
+        assert lease.last_status == 'timeout' and lease.last_finished_at is not None and lease.run_count == 1
@@ -18,13 +18,13 @@ export const API_ENDPOINTS = {
   
   // Cart endpoints
   CART: `${API_BASE_URL}/api/cart/`,
-  CART_ADD: `${API_BASE_URL}/api/cart/add`,
-  CART_UPDATE: (itemId) => `${API_BASE_URL}/api/cart/update/${itemId}`,
-  CART_REMOVE: (itemId) => `${API_BASE_URL}/api/cart/remove/${itemId}`,
+  CART_ADD: `${API_BASE_URL}/api/cart/items`, // POST
+  CART_UPDATE: (itemId) => `${API_BASE_URL}/api/cart/items/${itemId}`, // PUT
+  CART_REMOVE: (itemId) => `${API_BASE_URL}/api/cart/items/${itemId}`, // DELETE
   
   // Order endpoints
   ORDERS: `${API_BASE_URL}/api/orders/`,
-  ORDER_CREATE: `${API_BASE_URL}/api/orders/create`,
+  ORDER_CREATE: `${API_BASE_URL}/api/orders/`, // POST
   ORDER_DETAIL: (id) => `${API_BASE_URL}/api/orders/${id}`,
 };
 